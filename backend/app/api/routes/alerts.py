@@ -1,7 +1,9 @@
 """
 Alerts API Routes
 """
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from app.models.alert import AlertAcknowledge, AlertResolve
 from app.services.firestore_service import get_firestore_service
 from app.services.alert_service import get_alert_service
@@ -12,21 +14,64 @@ logger = get_logger(__name__)
 
 
 @router.get("/active")
-async def get_active_alerts(limit: int = 50):
+async def get_active_alerts(
+    limit: int = Query(default=50, ge=1, le=1000),
+    order: str = Query(default="recent", pattern="^(recent|priority)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    since_cursor: Optional[str] = None
+):
     """
     Get active alerts.
 
     Args:
         limit: Maximum number of alerts to return
+        order: "recent" (newest first) or "priority" (P1 first)
+        since: Only alerts created at or after this time (ISO 8601)
+        until: Only alerts created at or before this time (ISO 8601)
+        cursor: Return alerts older than this cursor (order=recent)
+        since_cursor: Return only alerts newer than this cursor (order=recent)
 
     Returns:
-        List of active alerts
+        List of active alerts with next_cursor, latest_cursor and has_more
+    """
+    if cursor and since_cursor:
+        raise HTTPException(status_code=400, detail="cursor and since_cursor are mutually exclusive")
+
+    db = get_firestore_service()
+    try:
+        page = await db.get_alert_page(
+            limit=limit, order=order, since=since, until=until, cursor=cursor, since_cursor=since_cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "count": len(page["alerts"])}
+
+
+@router.get("/history")
+async def get_alert_history(limit: int = 50):
+    """
+    Get recently closed (resolved / false positive) alerts.
+
+    Args:
+        limit: Maximum number of alerts to return
+
+    Returns:
+        List of closed alerts, most recently closed first
     """
     db = get_firestore_service()
-    alerts = await db.get_active_alerts(limit=limit)
+    alerts = await db.get_alert_history(limit=limit)
     return {"alerts": alerts, "count": len(alerts)}
 
 
+@router.get("/stats")
+async def get_alert_stats():
+    """Get alert counts per status and priority."""
+    db = get_firestore_service()
+    return db.get_alert_stats()
+
+
 @router.post("/{alert_id}/acknowledge")
 async def acknowledge_alert(alert_id: str, data: AlertAcknowledge):
     """
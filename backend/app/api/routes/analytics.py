@@ -1,9 +1,13 @@
 """
 Analytics API Routes
 """
-from fastapi import APIRouter
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from app.services.metrics_service import get_metrics_service
 from app.services.firestore_service import get_firestore_service
+from app.services.threat_processor import get_threat_processor
+from app.services.reputation_service import get_reputation_service
 from app.utils.logger import get_logger
 
 router = APIRouter()
@@ -57,6 +61,82 @@ async def get_risk_timeline():
     return {"timeline": timeline}
 
 
+@router.get("/ai-budget")
+async def get_ai_budget():
+    """
+    Get AI budget allocation statistics.
+
+    Returns:
+        Token bucket state, granted/denied counts (event pipeline and
+        /api/ai/analyze) and the share of pipeline events per final
+        severity that received a Gemini call
+    """
+    processor = get_threat_processor()
+
+    return processor.budget.get_stats()
+
+
+@router.get("/top-sources")
+async def get_top_sources(limit: int = Query(default=10, ge=1, le=500)):
+    """
+    Get the worst sources by reputation.
+
+    Args:
+        limit: Number of sources to return
+
+    Returns:
+        Sources ordered by decayed reputation score, with event counts
+    """
+    reputation = get_reputation_service()
+
+    return {
+        "sources": reputation.top_sources(limit),
+        "stats": reputation.get_stats()
+    }
+
+
+@router.get("/aggregate")
+async def aggregate_threats(
+    group_by: str = "severity",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    severity: Optional[str] = None,
+    threat_type: Optional[str] = None,
+    country: Optional[str] = None,
+    zone: Optional[str] = None,
+    limit: int = Query(default=1000, ge=1, le=100000)
+):
+    """
+    Aggregate threat history.
+
+    Args:
+        group_by: Comma-separated dimensions: minute, hour, day, severity,
+            threat_type, country, zone (empty = one overall group)
+        since: Only threats at or after this time (ISO 8601)
+        until: Only threats at or before this time (ISO 8601)
+        severity: Filter by severity
+        threat_type: Filter by threat type
+        country: Filter by source country code
+        zone: Filter by source zone
+        limit: Maximum number of groups to return
+
+    Returns:
+        Groups with count, avg/max risk score and avg confidence, e.g.
+        group_by=hour,severity,country for an hourly breakdown
+    """
+    db = get_firestore_service()
+    try:
+        return await db.aggregate_threats(
+            [name.strip() for name in group_by.split(",") if name.strip()],
+            since=since,
+            until=until,
+            filters={"severity": severity, "threat_type": threat_type, "country": country, "zone": zone},
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/summary")
 async def get_analytics_summary():
     """
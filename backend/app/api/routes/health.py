@@ -4,6 +4,11 @@ Health Check Endpoints
 from fastapi import APIRouter
 from datetime import datetime
 from app.config import settings
+from app.services.firestore_service import get_firestore_service
+from app.services.geo_service import get_geo_service
+from app.services.snapshot_service import get_snapshot_service
+from app.services.threat_intel_service import get_threat_intel_service
+from app.utils.executors import get_executor_stats
 
 router = APIRouter()
 
@@ -24,7 +29,12 @@ async def health_check():
             "kafka": "configured" if settings.confluent_bootstrap_servers else "not_configured",
             "gemini": "configured" if settings.google_cloud_project else "not_configured",
             "firestore": "configured" if settings.google_cloud_project else "not_configured"
-        }
+        },
+        "executors": get_executor_stats(),
+        "geoip": get_geo_service().get_stats(),
+        "threat_intel": get_threat_intel_service().get_stats(),
+        "storage": get_firestore_service().get_storage_stats(),
+        "snapshot": get_snapshot_service().get_stats() if settings.snapshot_enabled else None
     }
 
 
@@ -1,9 +1,11 @@
 """
 Threats API Routes
 """
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from app.services.firestore_service import get_firestore_service
+from app.services.threat_log import to_millis
 from app.utils.logger import get_logger
 
 router = APIRouter()
@@ -12,24 +14,119 @@ logger = get_logger(__name__)
 
 @router.get("/recent")
 async def get_recent_threats(
-    limit: int = 50,
-    severity: Optional[str] = None
+    limit: int = Query(default=50, ge=1, le=1000),
+    severity: Optional[str] = None,
+    threat_type: Optional[str] = None,
+    source_ip: Optional[str] = None,
+    country: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    since_cursor: Optional[str] = None
 ):
     """
     Get recent threats.
 
+    Filters can be combined. Page backwards with `cursor` (the previous
+    response's next_cursor); poll for new threats only with `since_cursor`
+    (the previous response's latest_cursor).
+
     Args:
         limit: Maximum number of threats to return
         severity: Filter by severity (CRITICAL, HIGH, MEDIUM, LOW, INFO)
+        threat_type: Filter by threat type (e.g. BRUTE_FORCE)
+        source_ip: Filter by source IP address
+        country: Filter by source country code (e.g. CN)
+        since: Only threats at or after this time (ISO 8601)
+        until: Only threats at or before this time (ISO 8601)
+        cursor: Return threats older than this cursor
+        since_cursor: Return only threats newer than this cursor
 
     Returns:
-        List of recent threats
+        List of recent threats with next_cursor, latest_cursor and has_more
     """
+    if cursor and since_cursor:
+        raise HTTPException(status_code=400, detail="cursor and since_cursor are mutually exclusive")
+
     db = get_firestore_service()
-    threats = await db.get_recent_threats(limit=limit, severity=severity)
+    try:
+        page = await db.get_threat_page(
+            limit=limit,
+            severity=severity,
+            threat_type=threat_type,
+            source_ip=source_ip,
+            country=country,
+            since=since,
+            until=until,
+            cursor=cursor,
+            since_cursor=since_cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**page, "count": len(page["threats"])}
+
+
+@router.get("/range")
+async def get_threats_between(
+    start: datetime,
+    end: datetime,
+    severity: Optional[str] = None,
+    threat_type: Optional[str] = None,
+    source_ip: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = Query(default=1000, ge=1, le=10000)
+):
+    """
+    Get threats in a time range.
+
+    Args:
+        start: Range start (ISO 8601)
+        end: Range end (ISO 8601, inclusive)
+        severity: Filter by severity
+        threat_type: Filter by threat type
+        source_ip: Filter by source IP address
+        country: Filter by source country code
+        limit: Maximum number of threats to return
+
+    Returns:
+        Threats in the range, oldest first
+    """
+    if to_millis(end) < to_millis(start):  # Naive and tz-aware bounds do not compare directly
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    db = get_firestore_service()
+    threats = await db.get_threats_between(
+        start,
+        end,
+        filters={"severity": severity, "threat_type": threat_type, "source_ip": source_ip, "country": country},
+        limit=limit
+    )
     return {"threats": threats, "count": len(threats)}
 
 
+@router.get("/search")
+async def search_threats(q: str = Query(min_length=1), limit: int = Query(default=50, ge=1, le=1000)):
+    """
+    Full-text search over threat descriptions, analysis, signals and MITRE IDs.
+
+    Terms are AND-ed; use OR between alternatives, -term to exclude and
+    term* for a prefix, e.g. "brute force -internal OR t1110*".
+
+    Args:
+        q: Search query
+        limit: Maximum number of threats to return
+
+    Returns:
+        Matching threats, newest first
+    """
+    db = get_firestore_service()
+    try:
+        threats = await db.search_threats(q, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"threats": threats, "count": len(threats), "query": q}
+
+
 @router.get("/{threat_id}")
 async def get_threat(threat_id: str):
     """
@@ -32,6 +32,7 @@ class Settings(BaseSettings):
     kafka_consumer_group: str = Field(default="threatstream-processor-group")
     kafka_auto_offset_reset: str = Field(default="latest")
     kafka_enable_auto_commit: bool = Field(default=False)
+    kafka_poll_workers: int = Field(default=1)  # Dedicated threads for consumer polling
 
     # Google Cloud
     google_cloud_project: str = Field(default="")
@@ -43,6 +44,33 @@ class Settings(BaseSettings):
     gemini_temperature: float = Field(default=0.1)
     gemini_max_tokens: int = Field(default=2048)
     gemini_rate_limit: int = Field(default=60)
+    gemini_executor_workers: int = Field(default=8)  # Dedicated threads for blocking Vertex AI calls
+    gemini_use_async_client: bool = Field(default=True)  # Prefer generate_content_async when available
+    gemini_streaming_enabled: bool = Field(default=True)  # Stream responses and emit provisional classifications
+
+    # Mock Gemini model (offline load testing - never enable in production)
+    gemini_mock_enabled: bool = Field(default=False)
+    gemini_mock_latency_ms: float = Field(default=800.0)  # Median latency
+    gemini_mock_latency_distribution: str = Field(default="lognormal")  # fixed, uniform, lognormal
+    gemini_mock_latency_jitter: float = Field(default=0.5)  # Uniform spread / lognormal sigma
+    gemini_mock_error_rate: float = Field(default=0.0)  # Fraction of calls failing with 429
+    gemini_mock_timeout_rate: float = Field(default=0.0)  # Fraction of calls hanging until timeout
+    gemini_mock_timeout_ms: float = Field(default=30000.0)
+    gemini_prompt_token_budget: int = Field(default=512)  # Max estimated tokens for the event section
+    gemini_prompt_max_string_chars: int = Field(default=256)
+    gemini_prompt_max_list_items: int = Field(default=5)
+
+    # Analysis Cache (persisted across restarts; empty path = memory only)
+    analysis_cache_path: str = Field(default="data/analysis_cache.sqlite3")
+    analysis_cache_ttl_seconds: int = Field(default=3600)
+    analysis_cache_max_entries: int = Field(default=5000)
+    analysis_cache_compact_every: int = Field(default=500)  # Writes between expired-row compactions
+
+    # Similarity-based reuse of analyses for near-duplicate events
+    similarity_reuse_enabled: bool = Field(default=True)
+    similarity_threshold: float = Field(default=0.92)  # Cosine similarity required to reuse
+    similarity_index_size: int = Field(default=2048)  # Recent analyses kept in the index
+    similarity_dimensions: int = Field(default=512)  # Hashed feature vector width
 
     # Firestore Collections
     firestore_database: str = Field(default="(default)")
@@ -51,6 +79,20 @@ class Settings(BaseSettings):
     firestore_collection_analytics: str = Field(default="analytics")
     firestore_collection_playbooks: str = Field(default="playbooks")
 
+    # Storage backend ("memory", "firestore" or "local"; the in-memory store stays in front as a read cache)
+    storage_backend: str = Field(default="memory")
+    firestore_emulator_host: str = Field(default="")  # e.g. localhost:8080 for the local emulator
+    firestore_batch_size: int = Field(default=500)  # Writes per batched commit (Firestore max 500)
+    firestore_flush_interval: float = Field(default=1.0)  # Seconds between flushes of partial batches
+    firestore_max_pending: int = Field(default=50000)  # Queued writes kept while Firestore is unreachable
+
+    # Local segmented threat log (STORAGE_BACKEND=local)
+    threat_log_dir: str = Field(default="data/threat_log")
+    threat_log_segment_bytes: int = Field(default=64 * 1024 * 1024)  # Roll the active segment at this size
+    threat_log_max_bytes: int = Field(default=1024 * 1024 * 1024)  # Delete oldest segments beyond this total
+    threat_log_retention_hours: float = Field(default=168.0)  # Delete segments older than this (0 = keep)
+    threat_log_fsync: bool = Field(default=False)  # fsync every append (segments are always fsynced on roll)
+
     # CORS
     cors_origins: str = Field(default="http://localhost:3000")
 
@@ -66,6 +108,50 @@ class Settings(BaseSettings):
     threat_batch_size: int = Field(default=100)
     threat_processing_interval: float = Field(default=0.1)
     ai_analysis_threshold: str = Field(default="MEDIUM")
+    ai_analyze_max_threats: int = Field(default=10, ge=1)  # Threats analyzed per /api/ai/analyze request
+
+    # Fallback Rule Engine (empty path = bundled app/rules/fallback_rules.yaml)
+    fallback_rules_path: str = Field(default="")
+    fallback_rules_check_interval: float = Field(default=5.0)  # Seconds between file change checks
+
+    # GeoIP range database (empty path = bundled app/data/geoip_ranges.csv)
+    geoip_database_path: str = Field(default="")
+    geoip_cache_dir: str = Field(default="data/geoip")  # Compiled .npy tables, memory-mapped; empty = in-memory
+    geoip_check_interval: float = Field(default=30.0)  # Seconds between database file change checks; 0 = never reload
+    geo_cache_size: int = Field(default=10000)  # IPs with cached enrichment results (LRU); 0 = disabled
+    ip_prefixes_path: str = Field(default="")  # IPv4/IPv6 prefix labels for the radix trie; empty = bundled app/data/ip_prefixes.txt
+
+    # Threat-intel blocklist feeds (empty dir = bundled app/data/threat_intel)
+    threat_intel_feed_dir: str = Field(default="")
+    threat_intel_check_interval: float = Field(default=60.0)  # Seconds between feed directory scans
+    threat_intel_bloom_enabled: bool = Field(default=False)  # Bloom prefilter for exact entries (worth it with many feeds)
+    threat_intel_bloom_error_rate: float = Field(default=0.01)
+
+    # In-memory threat store
+    threat_store_capacity: int = Field(default=1000)  # Most recent threats kept (ring buffer)
+    alert_active_capacity: int = Field(default=5000)  # Open alerts kept; oldest lowest-priority dropped beyond this
+    alert_history_capacity: int = Field(default=1000)  # Resolved / false-positive alerts kept
+    threat_search_enabled: bool = Field(default=True)  # Inverted index over cached threat text for /api/threats/search
+
+    # Columnar threat table for analytics aggregations
+    threat_table_capacity: int = Field(default=1000000)  # Rows kept; the oldest chunk is dropped beyond this
+    threat_table_chunk_rows: int = Field(default=65536)  # Column growth step
+
+    # Warm-restart snapshots of in-memory state (metrics, threats, alerts, playbook runs)
+    snapshot_enabled: bool = Field(default=True)
+    snapshot_path: str = Field(default="data/snapshot/state.pkl")
+    snapshot_interval: float = Field(default=60.0)  # Seconds between snapshots; 0 = only at shutdown
+    snapshot_max_age_hours: float = Field(default=24.0)  # Ignore older snapshots at startup (0 = no limit)
+
+    # Per-source reputation (decayed threat history, fifth risk score component)
+    reputation_capacity: int = Field(default=100000)  # Tracked sources; weakest of a random sample is evicted when full
+    reputation_half_life_seconds: float = Field(default=3600.0)
+    reputation_saturation: float = Field(default=50.0)  # Decayed score giving ~63% of the maximum risk points
+
+    # Adaptive AI budget (Gemini calls per minute, spent on the riskiest events)
+    ai_budget_per_minute: int = Field(default=60)
+    ai_budget_burst: int = Field(default=0)  # Bucket capacity; 0 = per_minute / 4
+    ai_budget_min_risk: float = Field(default=0.1)  # Never spend quota below this preliminary risk
 
     # Risk Index Publishing
     risk_change_threshold: int = Field(default=1)  # Minimum change to publish
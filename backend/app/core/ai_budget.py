@@ -0,0 +1,166 @@
+"""
+Adaptive AI Budget Allocator
+Spends the per-minute Gemini quota on the events with the highest preliminary risk
+"""
+import threading
+import time
+from typing import Any, Dict, List, Set
+from app.config import settings
+from app.core.rule_engine import get_rule_engine
+from app.models.threat import SeverityLevel
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rule-based severity weight used for preliminary risk (0-1)
+SEVERITY_WEIGHTS = {
+    SeverityLevel.CRITICAL: 1.0,
+    SeverityLevel.HIGH: 0.75,
+    SeverityLevel.MEDIUM: 0.5,
+    SeverityLevel.LOW: 0.25,
+    SeverityLevel.INFO: 0.05,
+}
+
+# Highest geo risk_multiplier (see get_country_risk_multiplier)
+MAX_RISK_MULTIPLIER = 1.8
+
+
+class AIBudgetAllocator:
+    """
+    Token-bucket allocator for Gemini calls.
+
+    The bucket refills at AI_BUDGET_PER_MINUTE / 60 tokens per second up to
+    a burst capacity. Each event gets a preliminary risk of rule-based
+    severity x geo risk_multiplier. Batches are ranked and only the top
+    slice that fits the bucket goes to Gemini; single events are admitted
+    against a threshold that rises as the bucket drains, so the remaining
+    quota is kept for the riskiest traffic.
+    """
+
+    def __init__(self, per_minute: int = None, burst: int = None, min_risk: float = None):
+        self.per_minute = per_minute or settings.ai_budget_per_minute
+        self.capacity = float(burst or settings.ai_budget_burst or max(1, self.per_minute // 4))
+        self.min_risk = settings.ai_budget_min_risk if min_risk is None else min_risk
+        self.refill_rate = self.per_minute / 60.0
+
+        self.rule_engine = get_rule_engine()
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+        self.granted = 0
+        self.denied = 0
+        self.refunded = 0
+        # severity -> [ai_analyzed, total]
+        self._outcomes: Dict[str, List[int]] = {level.value: [0, 0] for level in SeverityLevel}
+
+    def preliminary_risk(self, event: Dict[str, Any], geo_info: Dict) -> float:
+        """
+        Estimate an event's risk before AI analysis.
+
+        Args:
+            event: Raw security event data
+            geo_info: Geo enrichment (uses risk_multiplier)
+
+        Returns:
+            Risk in [0, 1]: rule-based severity weight x normalized geo multiplier
+        """
+        severity = self.rule_engine.evaluate(event).severity
+        multiplier = geo_info.get("risk_multiplier", 1.0)
+        return min(1.0, SEVERITY_WEIGHTS.get(severity, 0.5) * multiplier / MAX_RISK_MULTIPLIER)
+
+    def admit(self, risk: float) -> bool:
+        """
+        Decide whether a single event gets a Gemini call.
+
+        Args:
+            risk: Preliminary risk from preliminary_risk()
+
+        Returns:
+            True if a token was reserved for this event
+        """
+        with self._lock:
+            self._refill()
+            fill = self._tokens / self.capacity
+            threshold = self.min_risk + (1.0 - fill) * (1.0 - self.min_risk) * 0.9
+
+            if self._tokens >= 1.0 and risk >= threshold:
+                self._tokens -= 1.0
+                self.granted += 1
+                return True
+
+            self.denied += 1
+            return False
+
+    def allocate(self, risks: List[float]) -> Set[int]:
+        """
+        Pick which events of a queued batch get Gemini calls.
+
+        Args:
+            risks: Preliminary risk per queued event
+
+        Returns:
+            Indices of the events to send to Gemini (highest risk first)
+        """
+        with self._lock:
+            self._refill()
+            ranked = sorted(range(len(risks)), key=lambda i: risks[i], reverse=True)
+            available = int(self._tokens)
+
+            selected = set()
+            for i in ranked:
+                if len(selected) >= available or risks[i] < self.min_risk:
+                    break
+                selected.add(i)
+
+            self._tokens -= len(selected)
+            self.granted += len(selected)
+            self.denied += len(risks) - len(selected)
+            return selected
+
+    def refund(self):
+        """Return a token when an admitted event was served without a model call."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1.0)
+            self.refunded += 1
+
+    def record_outcome(self, severity: SeverityLevel, ai_analyzed: bool):
+        """Record the final severity of an event and whether it had AI analysis."""
+        counts = self._outcomes[severity.value]
+        counts[1] += 1
+        if ai_analyzed:
+            counts[0] += 1
+
+    def get_stats(self) -> Dict:
+        """Get budget usage and AI coverage by final severity."""
+        with self._lock:
+            self._refill()
+            tokens = self._tokens
+
+        high_ai = sum(self._outcomes[level][0] for level in ("CRITICAL", "HIGH"))
+        high_total = sum(self._outcomes[level][1] for level in ("CRITICAL", "HIGH"))
+
+        return {
+            "per_minute": self.per_minute,
+            "burst_capacity": self.capacity,
+            "tokens_available": round(tokens, 2),
+            "min_risk": self.min_risk,
+            "granted": self.granted,
+            "denied": self.denied,
+            "refunded": self.refunded,
+            "critical_high_ai_share": round(high_ai / high_total, 3) if high_total else None,
+            "ai_coverage_by_severity": {
+                level: {
+                    "ai_analyzed": ai,
+                    "total": total,
+                    "share": round(ai / total, 3) if total else None,
+                }
+                for level, (ai, total) in self._outcomes.items()
+            },
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
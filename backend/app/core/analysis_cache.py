@@ -0,0 +1,211 @@
+"""
+Persistent Analysis Cache
+Memory-fronted, SQLite-backed cache of Gemini analyses keyed by event signature
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import settings
+from app.utils.executors import get_executor
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Event fields that change on every delivery and never affect the analysis
+VOLATILE_FIELDS = ("event_id", "timestamp", "metadata")
+
+
+def event_signature(event: Dict[str, Any]) -> str:
+    """
+    Compute the exact-match signature of an event.
+
+    Args:
+        event: Raw security event data
+
+    Returns:
+        Hex digest over the canonical JSON of the non-volatile fields
+    """
+    stable = {k: v for k, v in event.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(stable, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of analysis results.
+
+    Tier 1 is a bounded in-memory LRU. Tier 2 is a local SQLite file that
+    survives restarts. The database is opened lazily on first use and rows
+    are only read on a memory miss, so startup cost is constant and the
+    warm set is pulled in as traffic asks for it. Expired rows are deleted
+    by periodic compaction. All disk I/O runs on a single dedicated thread.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.path = settings.analysis_cache_path if path is None else path
+        self.ttl_seconds = ttl_seconds or settings.analysis_cache_ttl_seconds
+        self.max_entries = max_entries or settings.analysis_cache_max_entries
+        self.compact_every = max(1, settings.analysis_cache_compact_every)
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._io = get_executor("analysis-cache", 1) if self.path else None
+        self._writes_since_compaction = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.compacted_rows = 0
+
+    async def get(self, signature: str) -> Optional[Dict]:
+        """Get a cached analysis by signature."""
+        now = time.time()
+
+        entry = self._memory.get(signature)
+        if entry is not None:
+            expires_at, analysis = entry
+            if expires_at > now:
+                self._memory.move_to_end(signature)
+                self.memory_hits += 1
+                return analysis
+            del self._memory[signature]
+
+        if self._io is not None:
+            try:
+                row = await asyncio.wrap_future(self._io.submit(self._disk_get, signature, now))
+            except Exception as e:
+                logger.error(f"Analysis cache read failed: {e}")
+                row = None
+
+            if row is not None:
+                expires_at, analysis = row
+                self._remember(signature, expires_at, analysis)
+                self.disk_hits += 1
+                return analysis
+
+        self.misses += 1
+        return None
+
+    def put(self, signature: str, event_type: str, analysis: Dict):
+        """Cache an analysis. The disk write happens in the background."""
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(signature, expires_at, analysis)
+        self.writes += 1
+
+        if self._io is None:
+            return
+
+        future = self._io.submit(self._disk_put, signature, event_type, expires_at, analysis)
+        future.add_done_callback(self._log_write_failure)
+
+        self._writes_since_compaction += 1
+        if self._writes_since_compaction >= self.compact_every:
+            self._writes_since_compaction = 0
+            self._io.submit(self._disk_compact).add_done_callback(self._log_write_failure)
+
+    def close(self):
+        """Flush pending writes and close the database."""
+        if self._io is None:
+            return
+        try:
+            self._io.submit(self._disk_close).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Failed to close analysis cache: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "path": self.path or None,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "compacted_rows": self.compacted_rows,
+        }
+
+    def _remember(self, signature: str, expires_at: float, analysis: Dict):
+        """Insert into the in-memory LRU tier."""
+        self._memory[signature] = (expires_at, analysis)
+        self._memory.move_to_end(signature)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _log_write_failure(future):
+        """Log background I/O failures."""
+        error = future.exception()
+        if error:
+            logger.error(f"Analysis cache write failed: {error}")
+
+    # Disk tier - only ever called on the dedicated cache thread
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                " signature TEXT PRIMARY KEY,"
+                " event_type TEXT,"
+                " expires_at REAL NOT NULL,"
+                " analysis TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_expires ON analysis_cache (expires_at)"
+            )
+            self._conn.commit()
+            logger.info(f"Analysis cache opened: {self.path}")
+            self._disk_compact()
+        return self._conn
+
+    def _disk_get(self, signature: str, now: float) -> Optional[Tuple[float, Dict]]:
+        row = self._connection().execute(
+            "SELECT expires_at, analysis FROM analysis_cache WHERE signature = ? AND expires_at > ?",
+            (signature, now)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_put(self, signature: str, event_type: str, expires_at: float, analysis: Dict):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO analysis_cache (signature, event_type, expires_at, analysis) VALUES (?, ?, ?, ?)",
+            (signature, event_type, expires_at, json.dumps(analysis, separators=(",", ":"), default=str))
+        )
+        conn.commit()
+
+    def _disk_compact(self):
+        conn = self._connection()
+        cursor = conn.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        if cursor.rowcount:
+            self.compacted_rows += cursor.rowcount
+            logger.info(f"Analysis cache compaction removed {cursor.rowcount} expired entries")
+
+    def _disk_close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -2,17 +2,28 @@
 AI Threat Analyzer using Google Vertex AI (Gemini)
 """
 import json
+import re
+import time
 import asyncio
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 import vertexai
 from vertexai.generative_models import GenerativeModel, GenerationConfig
 from app.config import settings
-from app.models.threat import GeminiAnalysis, SeverityLevel, ThreatType
+from app.core.analysis_cache import AnalysisCache, event_signature
+from app.core.mock_llm import MockGenerativeModel
+from app.core.prompt_builder import CompactPromptBuilder
+from app.core.rule_engine import get_rule_engine
+from app.core.similarity_index import SimilarityIndex
+from app.core.stream_parser import StreamingAnalysisParser
+from app.models.threat import GeminiAnalysis, ProvisionalClassification, SeverityLevel, ThreatType
+from app.utils.executors import get_executor
 from app.utils.logger import get_logger
 from app.utils.mitre_mapping import get_mitre_info
 
 logger = get_logger(__name__)
 
+ProvisionalCallback = Callable[[ProvisionalClassification], Awaitable[None]]
+
 
 class GeminiThreatAnalyzer:
     """
@@ -30,17 +41,48 @@ class GeminiThreatAnalyzer:
         self.location = settings.gcp_region
         self.model_name = settings.gemini_model
 
+        self._use_async = False
+
+        # Streaming (time to provisional classification vs. full completion)
+        self._stream_stats = {
+            "streams": 0,
+            "provisional_emitted": 0,
+            "provisional_ms_total": 0.0,
+            "complete_ms_total": 0.0,
+        }
+
         # Rate limiting
         self._semaphore = asyncio.Semaphore(settings.gemini_rate_limit)
         self._request_count = 0
 
+        # Persistent cache of Gemini results (survives restarts)
+        self.analysis_cache = AnalysisCache()
+
+        # Nearest-neighbor reuse for near-duplicate events
+        self.similarity_index = SimilarityIndex() if settings.similarity_reuse_enabled else None
+
+        # Compiled fallback rules used whenever AI is unavailable
+        self.rule_engine = get_rule_engine()
+
+        # Compact, token-budgeted prompts
+        self.prompt_builder = CompactPromptBuilder()
+
+        # Dedicated pool for blocking SDK calls - never shared with Kafka polling
+        self._executor = get_executor("gemini", settings.gemini_executor_workers)
+
         # Initialize Vertex AI
         try:
-            if self.project_id and self.project_id != "your-project-id":
+            if settings.gemini_mock_enabled:
+                # Offline stand-in with configurable latency/error profiles
+                self.model = MockGenerativeModel()
+                self.model_name = f"mock:{self.model_name}"
+                self._use_async = settings.gemini_use_async_client
+            elif self.project_id and self.project_id != "your-project-id":
                 logger.info(f"Initializing Vertex AI with project={self.project_id}, location={self.location}, model={self.model_name}")
                 vertexai.init(project=self.project_id, location=self.location)
                 logger.info(f"vertexai.init() succeeded")
                 self.model = GenerativeModel(self.model_name)
+                self._use_async = settings.gemini_use_async_client and hasattr(self.model, "generate_content_async")
                 logger.info(f"✅ Vertex AI initialized successfully: {self.model_name} in {self.location}")
             else:
                 self.model = None
@@ -51,59 +93,71 @@ class GeminiThreatAnalyzer:
             logger.warning("Falling back to rule-based analysis")
 
     def _build_analysis_prompt(self, event: Dict[str, Any]) -> str:
-        """Build the analysis prompt for Gemini."""
-        return f"""You are an expert cybersecurity threat analyst for a Security Operations Center (SOC).
-Analyze the following security event and provide a detailed threat assessment.
-
-SECURITY EVENT:
-```json
-{json.dumps(event, indent=2, default=str)}
-```
-
-Provide your analysis in the following JSON format:
-{{
-    "severity": "CRITICAL|HIGH|MEDIUM|LOW|INFO",
-    "threat_type": "BRUTE_FORCE|SQL_INJECTION|DDOS_ATTACK|RANSOMWARE|PORT_SCAN|MALWARE|DATA_EXFILTRATION|AUTHENTICATION|FIREWALL_EVENT|API_REQUEST|LOGIN_ATTEMPT|NORMAL_TRAFFIC",
-    "confidence": 0.0-1.0,
-    "description": "Brief one-line description of the threat",
-    "contextual_analysis": "Detailed analysis explaining the threat context, attack patterns, and potential impact",
-    "contributing_signals": ["Signal 1", "Signal 2", "Signal 3"],
-    "recommended_actions": ["Action 1", "Action 2", "Action 3"],
-    "mitre_attack_id": "T1110|T1190|T1498|T1486|etc or null if not applicable"
-}}
-
-SEVERITY GUIDELINES:
-- CRITICAL: Active breach, data exfiltration, ransomware execution, successful exploitation
-- HIGH: Active attacks (brute force, SQL injection), port scans from known bad actors, malware detected
-- MEDIUM: Suspicious activity, multiple failed authentication, unusual traffic patterns
-- LOW: Minor anomalies, single failed auth, informational events
-- INFO: Normal traffic, routine operations, baseline activity
-
-IMPORTANT:
-- Be precise with severity - don't over-classify
-- Include specific IOCs in contributing_signals
-- Provide actionable recommendations
-- Map to MITRE ATT&CK when applicable
-
-Respond ONLY with the JSON, no markdown formatting."""
-
-    async def analyze(self, event: Dict[str, Any]) -> GeminiAnalysis:
+        """Build the token-budgeted analysis prompt for Gemini."""
+        prompt, tokens = self.prompt_builder.build(event)
+        logger.debug(f"Built analysis prompt for {event.get('event_type', 'unknown')}: ~{tokens} tokens")
+        return prompt
+
+    async def analyze(
+        self,
+        event: Dict[str, Any],
+        on_provisional: Optional[ProvisionalCallback] = None,
+        allow_model: bool = True
+    ) -> GeminiAnalysis:
+        """
+        Analyze a security event using Vertex AI Gemini (see analyze_with_usage).
+
+        Returns:
+            GeminiAnalysis with complete threat intelligence
+        """
+        analysis, _ = await self.analyze_with_usage(event, on_provisional=on_provisional, allow_model=allow_model)
+        return analysis
+
+    async def analyze_with_usage(
+        self,
+        event: Dict[str, Any],
+        on_provisional: Optional[ProvisionalCallback] = None,
+        allow_model: bool = True
+    ) -> Tuple[GeminiAnalysis, bool]:
         """
         Analyze a security event using Vertex AI Gemini.
 
         Args:
             event: Raw security event data
+            on_provisional: Optional coroutine called with the early
+                severity/threat_type/confidence while the rest of a
+                streamed response is still generating
+            allow_model: False when the AI budget denied this event; cached
+                and similar analyses are still reused, but no model call
+                is made
 
         Returns:
-            GeminiAnalysis with complete threat intelligence
+            (GeminiAnalysis with complete threat intelligence, whether a
+            model request was made - failed requests count)
         """
         # Check if this is a normal/healthy flow simulation - skip AI analysis
         metadata = event.get("metadata", {})
         if metadata.get("scenario") == "normal":
-            return self._fallback_analysis(event, force_normal=True)
+            return self._fallback_analysis(event, force_normal=True), False
 
         if not self.model:
-            return self._fallback_analysis(event)
+            return self._fallback_analysis(event), False
+
+        # Identical events (ignoring id/timestamp) reuse the earlier analysis
+        signature = event_signature(event)
+        cached = await self.analysis_cache.get(signature)
+        if cached is not None:
+            return GeminiAnalysis(**{**cached, "audit_ref": "VERTEX-AI-GEMINI-CACHE"}), False
+
+        # Near-duplicate events (other usernames, ports, sizes) reuse a similar analysis
+        vector = None
+        if self.similarity_index is not None:
+            similar, similarity, vector = self.similarity_index.find(event)
+            if similar is not None:
+                return self._reuse_similar_analysis(event, similar, similarity), False
+
+        if not allow_model:
+            return self._fallback_analysis(event, audit_ref="FALLBACK-BUDGET"), False
 
         async with self._semaphore:
             try:
@@ -118,19 +172,17 @@ Respond ONLY with the JSON, no markdown formatting."""
                 )
 
                 # Generate content using Vertex AI
-                # Note: Vertex AI's generate_content is not async, so we run it in executor
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self.model.generate_content(
-                        prompt,
-                        generation_config=generation_config
-                    )
+                started = time.perf_counter()
+                if on_provisional is not None and settings.gemini_streaming_enabled:
+                    response_text = await self._generate_streaming(prompt, generation_config, on_provisional)
+                else:
+                    response = await self._generate(prompt, generation_config)
+                    response_text = response.text
+                self.prompt_builder.record_latency(
+                    event.get("event_type", "unknown"),
+                    (time.perf_counter() - started) * 1000
                 )
 
-                # Extract the response text
-                response_text = response.text
-
                 # Handle markdown code blocks
                 if "```json" in response_text:
                     response_text = response_text.split("```json")[1].split("```")[0]
@@ -146,7 +198,7 @@ Respond ONLY with the JSON, no markdown formatting."""
                     mitre_info = get_mitre_info(mitre_id)
                     mitre_name = mitre_info.get("technique_name") if mitre_info else None
 
-                return GeminiAnalysis(
+                analysis = GeminiAnalysis(
                     severity=SeverityLevel(analysis_dict["severity"]),
                     threat_type=ThreatType(analysis_dict["threat_type"]),
                     confidence=float(analysis_dict["confidence"]),
@@ -159,16 +211,147 @@ Respond ONLY with the JSON, no markdown formatting."""
                     audit_ref="VERTEX-AI-GEMINI"
                 )
 
+                analysis_data = analysis.model_dump(mode="json")
+                self.analysis_cache.put(signature, event.get("event_type", "unknown"), analysis_data)
+                if self.similarity_index is not None:
+                    self.similarity_index.add(event, {**analysis_data, "source_ip": event.get("source_ip")}, vector)
+                return analysis, True
+
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse AI response: {e}")
                 logger.error(f"Response text: {response_text if 'response_text' in locals() else 'N/A'}")
-                return self._fallback_analysis(event)
+                return self._fallback_analysis(event), True
 
             except Exception as e:
                 logger.error(f"Vertex AI analysis error: {e}")
-                return self._fallback_analysis(event)
+                return self._fallback_analysis(event), True
+
+    async def _generate(self, prompt: str, generation_config: GenerationConfig):
+        """
+        Call the model without touching the default executor.
 
-    def _fallback_analysis(self, event: Dict[str, Any], force_normal: bool = False) -> GeminiAnalysis:
+        Uses the SDK's native async client when available; otherwise the
+        blocking generate_content runs on the dedicated Gemini pool.
+        """
+        if self._use_async:
+            return await self.model.generate_content_async(
+                prompt,
+                generation_config=generation_config
+            )
+
+        return await asyncio.wrap_future(
+            self._executor.submit(
+                self.model.generate_content,
+                prompt,
+                generation_config=generation_config
+            )
+        )
+
+    async def _generate_streaming(
+        self,
+        prompt: str,
+        generation_config: GenerationConfig,
+        on_provisional: ProvisionalCallback
+    ) -> str:
+        """
+        Stream a completion, emitting the provisional classification as soon as it parses.
+
+        Returns:
+            The full response text
+        """
+        parser = StreamingAnalysisParser()
+        started = time.perf_counter()
+        self._stream_stats["streams"] += 1
+
+        async for chunk in self._stream_chunks(prompt, generation_config):
+            provisional = parser.feed(chunk)
+            if provisional is not None:
+                self._stream_stats["provisional_emitted"] += 1
+                self._stream_stats["provisional_ms_total"] += (time.perf_counter() - started) * 1000
+                try:
+                    await on_provisional(provisional)
+                except Exception as e:
+                    logger.error(f"Provisional classification handler failed: {e}")
+
+        self._stream_stats["complete_ms_total"] += (time.perf_counter() - started) * 1000
+        return parser.text
+
+    async def _stream_chunks(self, prompt: str, generation_config: GenerationConfig) -> AsyncIterator[str]:
+        """Yield response text chunks from the model."""
+        if self._use_async:
+            responses = await self.model.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                stream=True
+            )
+            async for response in responses:
+                yield response.text
+            return
+
+        # Blocking stream on the dedicated pool, handed to the loop chunk by chunk
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def pump():
+            try:
+                for response in self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    stream=True
+                ):
+                    loop.call_soon_threadsafe(queue.put_nowait, response.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        self._executor.submit(pump)
+
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _reuse_similar_analysis(self, event: Dict[str, Any], stored: Dict, similarity: float) -> GeminiAnalysis:
+        """Adapt a stored analysis of a near-duplicate event to this event."""
+        stored_ip = stored.get("source_ip")
+        source_ip = event.get("source_ip")
+
+        # The stored texts name the earlier event's source; point them at this one.
+        # Whole-address matches only, so 10.0.0.1 does not rewrite 10.0.0.12
+        stored_ip_re = None
+        if stored_ip and source_ip and stored_ip != source_ip:
+            stored_ip_re = re.compile(rf"(?<![\w.:]){re.escape(stored_ip)}(?![\w:]|\.\w)")
+
+        def adapt(text: str) -> str:
+            return stored_ip_re.sub(source_ip, text) if stored_ip_re else text
+
+        signals = [adapt(signal) for signal in stored["contributing_signals"]]
+        signals.append(f"Matched prior AI analysis (similarity {similarity:.2f})")
+
+        return GeminiAnalysis(
+            severity=SeverityLevel(stored["severity"]),
+            threat_type=ThreatType(stored["threat_type"]),
+            confidence=round(min(1.0, float(stored["confidence"]) * similarity), 3),
+            description=adapt(stored["description"]),
+            contextual_analysis=adapt(stored["contextual_analysis"]),
+            contributing_signals=signals,
+            recommended_actions=[adapt(action) for action in stored["recommended_actions"]],
+            mitre_attack_id=stored.get("mitre_attack_id"),
+            mitre_attack_name=stored.get("mitre_attack_name"),
+            audit_ref="VERTEX-AI-GEMINI-SIMILAR"
+        )
+
+    def _fallback_analysis(
+        self,
+        event: Dict[str, Any],
+        force_normal: bool = False,
+        audit_ref: str = "FALLBACK-ENGINE"
+    ) -> GeminiAnalysis:
         """Provide rule-based fallback analysis when AI is unavailable."""
         event_type = event.get("event_type", "unknown").lower()
 
@@ -187,54 +370,26 @@ Respond ONLY with the JSON, no markdown formatting."""
                 audit_ref="HEALTHY-FLOW"
             )
 
-        # Simple rule-based severity mapping
-        severity_map = {
-            "brute_force": SeverityLevel.CRITICAL,
-            "sql_injection": SeverityLevel.CRITICAL,
-            "ddos": SeverityLevel.CRITICAL,
-            "ransomware": SeverityLevel.CRITICAL,
-            "malware": SeverityLevel.CRITICAL,
-            "port_scan": SeverityLevel.HIGH,
-            "authentication": SeverityLevel.MEDIUM,
-            "login_attempt": SeverityLevel.INFO,
-            "api_request": SeverityLevel.INFO,
-            "firewall_event": SeverityLevel.INFO,
-            "normal_traffic": SeverityLevel.INFO,
-            "data_access": SeverityLevel.INFO,
-            "network_traffic": SeverityLevel.INFO,
-        }
-
-        # Map event types to threat types
-        threat_type_map = {
-            "brute_force": ThreatType.BRUTE_FORCE,
-            "sql_injection": ThreatType.SQL_INJECTION,
-            "ddos": ThreatType.DDOS_ATTACK,
-            "ransomware": ThreatType.RANSOMWARE,
-            "malware": ThreatType.MALWARE,
-            "port_scan": ThreatType.PORT_SCAN,
-            "authentication": ThreatType.AUTHENTICATION,
-            "login_attempt": ThreatType.AUTHENTICATION,
-            "api_request": ThreatType.API_REQUEST,
-            "firewall_event": ThreatType.FIREWALL_EVENT,
-            "normal_traffic": ThreatType.NORMAL_TRAFFIC,
-            "data_access": ThreatType.API_REQUEST,
-            "network_traffic": ThreatType.NETWORK_ANOMALY,
-        }
+        # Declarative rules (app/rules/fallback_rules.yaml), hot-reloaded
+        match = self.rule_engine.evaluate(event)
+        template_vars = {"event_type": event_type, "label": event_type.replace("_", " ")}
 
-        severity = severity_map.get(event_type, SeverityLevel.MEDIUM)
-        threat_type = threat_type_map.get(event_type, ThreatType.AUTHENTICATION)
+        mitre_name = None
+        if match.mitre_attack_id:
+            mitre_info = get_mitre_info(match.mitre_attack_id)
+            mitre_name = mitre_info.get("technique_name") if mitre_info else None
 
         return GeminiAnalysis(
-            severity=severity,
-            threat_type=threat_type,
-            confidence=0.5,
-            description=f"Event detected: {event_type}",
-            contextual_analysis="Fallback analysis - AI engine temporarily unavailable",
-            contributing_signals=[event.get("source_ip", "unknown")],
-            recommended_actions=["Review event manually", "Check related events"],
-            mitre_attack_id=None,
-            mitre_attack_name=None,
-            audit_ref="FALLBACK-ENGINE"
+            severity=match.severity,
+            threat_type=match.threat_type,
+            confidence=match.confidence,
+            description=match.description.format(**template_vars),
+            contextual_analysis=match.contextual_analysis.format(**template_vars),
+            contributing_signals=[event.get("source_ip", "unknown"), f"rule:{match.rule_id}"],
+            recommended_actions=list(match.recommended_actions),
+            mitre_attack_id=match.mitre_attack_id,
+            mitre_attack_name=mitre_name,
+            audit_ref=audit_ref
         )
 
     def get_metrics(self) -> Dict:
@@ -243,7 +398,39 @@ Respond ONLY with the JSON, no markdown formatting."""
             "model": self.model_name,
             "requests_processed": self._request_count,
             "rate_limit": settings.gemini_rate_limit,
-            "provider": "Vertex AI",
+            "provider": "Mock" if settings.gemini_mock_enabled else "Vertex AI",
             "project_id": self.project_id,
-            "location": self.location
+            "location": self.location,
+            "async_client": self._use_async,
+            "executor": self._executor.get_stats(),
+            "prompts": self.prompt_builder.get_stats(),
+            "cache": self.analysis_cache.get_stats(),
+            "similarity": self.similarity_index.get_stats() if self.similarity_index else None,
+            "streaming": self._get_stream_stats(),
+            "fallback_rules": self.rule_engine.get_stats(),
+            "mock": self.model.get_stats() if isinstance(self.model, MockGenerativeModel) else None
         }
+
+    def _get_stream_stats(self) -> Dict:
+        """Summarize streaming latency statistics."""
+        streams = self._stream_stats["streams"]
+        emitted = self._stream_stats["provisional_emitted"]
+        return {
+            "enabled": settings.gemini_streaming_enabled,
+            "streams": streams,
+            "provisional_emitted": emitted,
+            "avg_provisional_ms": round(self._stream_stats["provisional_ms_total"] / emitted, 1) if emitted else None,
+            "avg_complete_ms": round(self._stream_stats["complete_ms_total"] / streams, 1) if streams else None,
+        }
+
+
+# Global instance
+_gemini_analyzer = None
+
+
+def get_gemini_analyzer() -> GeminiThreatAnalyzer:
+    """Get the global GeminiThreatAnalyzer instance."""
+    global _gemini_analyzer
+    if _gemini_analyzer is None:
+        _gemini_analyzer = GeminiThreatAnalyzer()
+    return _gemini_analyzer
@@ -4,9 +4,10 @@ Consumes security events from Confluent Cloud
 """
 import json
 import asyncio
-from typing import Callable, List
+from typing import Callable, Dict, List
 from confluent_kafka import Consumer, KafkaError
 from app.config import settings
+from app.utils.executors import get_executor
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -19,7 +20,14 @@ class ThreatStreamConsumer:
         self.topic = topic
         self.group_id = group_id
         self._handlers: List[Callable] = []
+        self._batch_handlers: List[Callable] = []
         self._running = False
+        self.batch_size = max(1, settings.threat_batch_size)
+        self.batches_consumed = 0
+        self.messages_consumed = 0
+
+        # Dedicated polling pool - AI analysis bursts cannot starve it
+        self._poll_executor = get_executor("kafka-poll", settings.kafka_poll_workers)
 
         # Initialize consumer
         config = settings.kafka_config
@@ -38,6 +46,10 @@ class ThreatStreamConsumer:
         """Add a message handler."""
         self._handlers.append(handler)
 
+    def add_batch_handler(self, handler: Callable):
+        """Add a handler that receives each consumed batch as a list of events."""
+        self._batch_handlers.append(handler)
+
     async def start(self):
         """Start consuming messages."""
         if not self.consumer:
@@ -49,33 +61,45 @@ class ThreatStreamConsumer:
 
         while self._running:
             try:
-                # Poll for messages
-                msg = await asyncio.to_thread(self.consumer.poll, 1.0)
+                # Drain up to THREAT_BATCH_SIZE messages per round trip
+                messages = await asyncio.wrap_future(
+                    self._poll_executor.submit(self.consumer.consume, self.batch_size, 1.0)
+                )
+
+                batch = []
+                for msg in messages:
+                    if msg.error():
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            logger.error(f"Consumer error: {msg.error()}")
+                        continue
+
+                    # Deserialize message
+                    try:
+                        batch.append(json.loads(msg.value().decode('utf-8')))
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Failed to decode message: {e}")
 
-                if msg is None:
+                if not batch:
                     continue
 
-                if msg.error():
-                    if msg.error().code() == KafkaError._PARTITION_EOF:
-                        continue
-                    else:
-                        logger.error(f"Consumer error: {msg.error()}")
-                        continue
+                self.batches_consumed += 1
+                self.messages_consumed += len(batch)
 
-                # Deserialize message
-                try:
-                    event_data = json.loads(msg.value().decode('utf-8'))
+                # Batch handlers see the whole batch (e.g. to rank it for AI budget)
+                for handler in self._batch_handlers:
+                    try:
+                        await handler(batch)
+                    except Exception as e:
+                        logger.error(f"Batch handler error: {e}")
 
-                    # Process with all handlers
+                # Process with all per-event handlers
+                for event_data in batch:
                     for handler in self._handlers:
                         try:
                             await handler(event_data)
                         except Exception as e:
                             logger.error(f"Handler error: {e}")
 
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to decode message: {e}")
-
             except Exception as e:
                 logger.error(f"Consumer loop error: {e}")
                 await asyncio.sleep(1)
@@ -86,3 +110,15 @@ class ThreatStreamConsumer:
         if self.consumer:
             self.consumer.close()
         logger.info("Kafka consumer stopped")
+
+    def get_metrics(self) -> Dict:
+        """Get consumer metrics for monitoring."""
+        return {
+            "topic": self.topic,
+            "group_id": self.group_id,
+            "running": self._running,
+            "batch_size": self.batch_size,
+            "batches_consumed": self.batches_consumed,
+            "messages_consumed": self.messages_consumed,
+            "poll_executor": self._poll_executor.get_stats()
+        }
@@ -0,0 +1,190 @@
+"""
+Mock Gemini Model for Offline Load Testing
+Stand-in for vertexai GenerativeModel with configurable latency and failures
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_EVENT_TYPE = re.compile(r'"event_type"\s*:\s*"([^"]+)"')
+
+# Deterministic canned responses per event_type: (severity, threat_type, confidence, mitre_id)
+MOCK_PROFILES = {
+    "brute_force": ("CRITICAL", "BRUTE_FORCE", 0.93, "T1110"),
+    "sql_injection": ("CRITICAL", "SQL_INJECTION", 0.91, "T1190"),
+    "ddos": ("CRITICAL", "DDOS_ATTACK", 0.9, "T1498"),
+    "ransomware": ("CRITICAL", "RANSOMWARE", 0.95, "T1486"),
+    "malware": ("HIGH", "MALWARE", 0.88, "T1204"),
+    "port_scan": ("HIGH", "PORT_SCAN", 0.85, "T1046"),
+    "data_exfiltration": ("CRITICAL", "DATA_EXFILTRATION", 0.87, "T1041"),
+    "authentication": ("MEDIUM", "AUTHENTICATION", 0.7, None),
+    "login_attempt": ("LOW", "LOGIN_ATTEMPT", 0.65, None),
+    "api_request": ("INFO", "API_REQUEST", 0.8, None),
+    "firewall_event": ("INFO", "FIREWALL_EVENT", 0.8, None),
+    "normal_traffic": ("INFO", "NORMAL_TRAFFIC", 0.95, None),
+}
+DEFAULT_PROFILE = ("MEDIUM", "AUTHENTICATION", 0.6, None)
+
+
+class MockResourceExhausted(Exception):
+    """Injected quota error, shaped like google.api_core's 429 ResourceExhausted."""
+    code = 429
+
+
+class MockResponse:
+    """Minimal stand-in for a GenerationResponse (only .text is used)."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class MockGenerativeModel:
+    """
+    Local implementation of the GenerativeModel surface used by GeminiThreatAnalyzer.
+
+    Supports generate_content and generate_content_async, both with
+    stream=True. Latency follows a fixed, uniform or lognormal
+    distribution; a configurable fraction of calls fail with a 429 or
+    hang until a timeout. Responses are deterministic JSON per event_type.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = None,
+        distribution: str = None,
+        jitter: float = None,
+        error_rate: float = None,
+        timeout_rate: float = None,
+        timeout_ms: float = None,
+        stream_chunks: int = 8,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = settings.gemini_mock_latency_ms if latency_ms is None else latency_ms
+        self.distribution = distribution or settings.gemini_mock_latency_distribution
+        self.jitter = settings.gemini_mock_latency_jitter if jitter is None else jitter
+        self.error_rate = settings.gemini_mock_error_rate if error_rate is None else error_rate
+        self.timeout_rate = settings.gemini_mock_timeout_rate if timeout_rate is None else timeout_rate
+        self.timeout_ms = settings.gemini_mock_timeout_ms if timeout_ms is None else timeout_ms
+        self.stream_chunks = max(1, stream_chunks)
+        self._random = random.Random(seed)
+
+        self.calls = 0
+        self.errors_429 = 0
+        self.timeouts = 0
+
+        logger.info(
+            f"🧪 Mock Gemini model active: {self.distribution} latency ~{self.latency_ms}ms, "
+            f"429 rate={self.error_rate}, timeout rate={self.timeout_rate}"
+        )
+
+    # Public GenerativeModel surface
+
+    def generate_content(self, prompt: str, generation_config: Any = None, stream: bool = False):
+        """Blocking generation."""
+        delay, failure = self._plan_call()
+        if not stream:
+            time.sleep(delay)
+            self._raise(failure)
+            return MockResponse(self.render(prompt))
+        return self._stream_blocking(prompt, delay, failure)
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None, stream: bool = False):
+        """Async generation."""
+        delay, failure = self._plan_call()
+        if not stream:
+            await asyncio.sleep(delay)
+            self._raise(failure)
+            return MockResponse(self.render(prompt))
+        return self._stream_async(prompt, delay, failure)
+
+    # Helpers
+
+    def render(self, prompt: str) -> str:
+        """Deterministic JSON analysis for the event_type found in the prompt."""
+        match = _EVENT_TYPE.search(prompt)
+        event_type = match.group(1).lower() if match else "unknown"
+        severity, threat_type, confidence, mitre_id = MOCK_PROFILES.get(event_type, DEFAULT_PROFILE)
+        label = event_type.replace("_", " ")
+
+        return json.dumps({
+            "severity": severity,
+            "threat_type": threat_type,
+            "confidence": confidence,
+            "description": f"Mock analysis: {label} activity",
+            "contextual_analysis": f"Deterministic mock assessment for {label} events used for offline testing.",
+            "contributing_signals": [f"event_type={event_type}", "mock-model"],
+            "recommended_actions": ["Review event", "Correlate with related activity"],
+            "mitre_attack_id": mitre_id,
+        })
+
+    def get_stats(self) -> Dict:
+        """Get injected-behavior counters."""
+        return {
+            "calls": self.calls,
+            "errors_429": self.errors_429,
+            "timeouts": self.timeouts,
+            "latency_ms": self.latency_ms,
+            "distribution": self.distribution,
+        }
+
+    def _plan_call(self):
+        """Pick the latency and failure mode for one call."""
+        self.calls += 1
+        roll = self._random.random()
+        if roll < self.error_rate:
+            self.errors_429 += 1
+            return self._sample_latency() * 0.1, "429"
+        if roll < self.error_rate + self.timeout_rate:
+            self.timeouts += 1
+            return self.timeout_ms / 1000.0, "timeout"
+        return self._sample_latency(), None
+
+    def _sample_latency(self) -> float:
+        """Sample a latency in seconds from the configured distribution."""
+        base = max(0.0, self.latency_ms)
+        if self.distribution == "fixed":
+            value = base
+        elif self.distribution == "uniform":
+            value = self._random.uniform(base * (1 - self.jitter), base * (1 + self.jitter))
+        else:
+            # lognormal with the configured median and sigma=jitter
+            value = base * self._random.lognormvariate(0.0, self.jitter)
+        return max(0.0, value) / 1000.0
+
+    @staticmethod
+    def _raise(failure: Optional[str]):
+        if failure == "429":
+            raise MockResourceExhausted("429 Resource exhausted (mock quota)")
+        if failure == "timeout":
+            raise TimeoutError("Mock Gemini call timed out")
+
+    def _chunks(self, text: str) -> List[str]:
+        size = max(1, -(-len(text) // self.stream_chunks))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _stream_blocking(self, prompt: str, delay: float, failure: Optional[str]) -> Iterator[MockResponse]:
+        if failure:
+            time.sleep(delay)
+            self._raise(failure)
+        chunks = self._chunks(self.render(prompt))
+        step = delay / len(chunks)
+        for chunk in chunks:
+            time.sleep(step)
+            yield MockResponse(chunk)
+
+    async def _stream_async(self, prompt: str, delay: float, failure: Optional[str]):
+        if failure:
+            await asyncio.sleep(delay)
+            self._raise(failure)
+        chunks = self._chunks(self.render(prompt))
+        step = delay / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(step)
+            yield MockResponse(chunk)
@@ -0,0 +1,296 @@
+"""
+Token-Budgeted Prompt Builder
+Compacts security events so Gemini prompts stay within a fixed token budget
+"""
+import json
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rough chars-per-token ratio for English/JSON text on Gemini tokenizers
+CHARS_PER_TOKEN = 4
+
+# Fields that are always kept, in this order, when the budget is tight
+PRIORITY_FIELDS = [
+    "event_type",
+    "source_ip",
+    "destination_ip",
+    "destination_port",
+    "protocol",
+    "severity",
+    "description",
+    "timestamp",
+    "event_id",
+]
+
+# Fields dropped first when the event does not fit
+LOW_PRIORITY_FIELDS = ["metadata"]
+
+MAX_DEPTH = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a prompt fragment."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def summarize_threats(threats: List[Dict[str, Any]], top_n: int = 5) -> Dict[str, Any]:
+    """
+    Summarize a list of threats into a small aggregate.
+
+    Used instead of embedding every submitted threat into the prompt.
+
+    Args:
+        threats: Threat dictionaries (frontend or backend shape)
+        top_n: Number of top sources/types to keep
+
+    Returns:
+        Aggregate counts by severity, type and source
+    """
+    severities = Counter(t.get("severity", "UNKNOWN") for t in threats)
+    types = Counter(t.get("threat_type", t.get("type", "UNKNOWN")) for t in threats)
+    sources = Counter(t.get("sourceIp", t.get("source_ip", "unknown")) for t in threats)
+    timestamps = sorted(str(t["timestamp"]) for t in threats if t.get("timestamp"))
+
+    summary = {
+        "threat_count": len(threats),
+        "severity_counts": dict(severities),
+        "top_types": dict(types.most_common(top_n)),
+        "top_sources": dict(sources.most_common(top_n)),
+        "unique_sources": len(sources),
+    }
+    if timestamps:
+        summary["first_seen"] = timestamps[0]
+        summary["last_seen"] = timestamps[-1]
+
+    return summary
+
+
+class CompactPromptBuilder:
+    """
+    Builds Gemini analysis prompts under a configurable token budget.
+
+    The event is pruned (empty values dropped), long strings truncated and
+    list-valued payloads summarized, then serialized without whitespace. If
+    it still does not fit, limits are tightened and low-priority fields are
+    dropped until the event section fits the budget.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = None,
+        max_string_chars: int = None,
+        max_list_items: int = None
+    ):
+        self.token_budget = token_budget or settings.gemini_prompt_token_budget
+        self.max_string_chars = max_string_chars or settings.gemini_prompt_max_string_chars
+        self.max_list_items = max_list_items or settings.gemini_prompt_max_list_items
+
+        self._template_tokens = estimate_tokens(self._render(""))
+
+        # Per event_type prompt statistics
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def build(self, event: Dict[str, Any]) -> Tuple[str, int]:
+        """
+        Build the analysis prompt for an event.
+
+        Args:
+            event: Raw security event data
+
+        Returns:
+            Tuple of (prompt, estimated_tokens)
+        """
+        event_json, truncated = self._fit_event(event)
+        prompt = self._render(event_json)
+        tokens = estimate_tokens(prompt)
+
+        self._record(str(event.get("event_type", "unknown")).lower(), tokens, truncated)
+        return prompt, tokens
+
+    def record_latency(self, event_type: str, latency_ms: float):
+        """Record model latency for the event type of a built prompt."""
+        stats = self._stats.get(str(event_type).lower())
+        if stats is not None:
+            stats["latency_ms_total"] += latency_ms
+            stats["latency_samples"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prompt size and latency statistics per event type."""
+        per_type = {}
+        for event_type, stats in self._stats.items():
+            prompts = stats["prompts"]
+            samples = stats["latency_samples"]
+            per_type[event_type] = {
+                "prompts": int(prompts),
+                "avg_tokens": round(stats["tokens_total"] / prompts, 1),
+                "max_tokens": int(stats["tokens_max"]),
+                "total_tokens": int(stats["tokens_total"]),
+                "truncated": int(stats["truncated"]),
+                "avg_latency_ms": round(stats["latency_ms_total"] / samples, 1) if samples else None,
+            }
+
+        return {
+            "token_budget": self.token_budget,
+            "template_tokens": self._template_tokens,
+            "by_event_type": per_type,
+        }
+
+    def _fit_event(self, event: Dict[str, Any]) -> Tuple[str, bool]:
+        """Compact an event until its JSON fits the token budget."""
+        max_chars = self.max_string_chars
+        max_items = self.max_list_items
+        dropped: List[str] = []
+
+        compacted = self._compact_event(event, max_chars, max_items, dropped)
+        event_json = self._dumps(compacted)
+        truncated = False
+
+        while estimate_tokens(event_json) > self.token_budget:
+            truncated = True
+
+            # Tighten limits first, then shed fields from least to most important
+            if max_chars > 32 or max_items > 1:
+                max_chars = max(32, max_chars // 2)
+                max_items = max(1, max_items // 2)
+            else:
+                candidate = self._next_field_to_drop(compacted, dropped)
+                if candidate is None:
+                    break
+                dropped.append(candidate)
+
+            compacted = self._compact_event(event, max_chars, max_items, dropped)
+            event_json = self._dumps(compacted)
+
+        return event_json, truncated
+
+    def _compact_event(self, event: Dict[str, Any], max_chars: int, max_items: int, dropped: List[str]) -> Dict:
+        """Compact an event, keeping priority fields first."""
+        ordered = {}
+        for key in PRIORITY_FIELDS:
+            if key in event and key not in dropped:
+                ordered[key] = event[key]
+        for key, value in event.items():
+            if key not in ordered and key not in dropped:
+                ordered[key] = value
+
+        return self._compact(ordered, max_chars, max_items, 0) or {}
+
+    def _next_field_to_drop(self, compacted: Dict, dropped: List[str]) -> Any:
+        """Pick the next field to drop: low-priority fields, then the largest non-priority field."""
+        for key in LOW_PRIORITY_FIELDS:
+            if key in compacted and key not in dropped:
+                return key
+
+        candidates = [k for k in compacted if k not in PRIORITY_FIELDS and k not in dropped]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda k: len(self._dumps(compacted[k])))
+
+    def _compact(self, value: Any, max_chars: int, max_items: int, depth: int) -> Any:
+        """Recursively prune, truncate and summarize a value."""
+        if value is None:
+            return None
+
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                return None
+            if len(value) > max_chars:
+                return f"{value[:max_chars]}…(+{len(value) - max_chars} chars)"
+            return value
+
+        if isinstance(value, (bool, int, float)):
+            return value
+
+        if depth >= MAX_DEPTH:
+            return f"<{type(value).__name__}>"
+
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                compacted = self._compact(item, max_chars, max_items, depth + 1)
+                if compacted is not None:
+                    result[str(key)] = compacted
+            return result or None
+
+        if isinstance(value, (list, tuple, set)):
+            items = list(value)
+            if not items:
+                return None
+            if len(items) <= max_items:
+                return [self._compact(item, max_chars, max_items, depth + 1) for item in items]
+            return self._summarize_list(items, max_chars, max_items, depth)
+
+        return self._compact(str(value), max_chars, max_items, depth)
+
+    def _summarize_list(self, items: List[Any], max_chars: int, max_items: int, depth: int) -> Dict:
+        """Summarize a long list as count, sample and numeric range."""
+        summary = {
+            "count": len(items),
+            "sample": [self._compact(item, max_chars, max_items, depth + 1) for item in items[:max_items]],
+        }
+
+        numbers = [item for item in items if isinstance(item, (int, float)) and not isinstance(item, bool)]
+        if numbers:
+            summary["min"] = min(numbers)
+            summary["max"] = max(numbers)
+        else:
+            summary["unique"] = len({json.dumps(item, sort_keys=True, default=str) for item in items})
+
+        return summary
+
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        """Serialize without whitespace."""
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    def _record(self, event_type: str, tokens: int, truncated: bool):
+        """Record prompt statistics for an event type."""
+        stats = self._stats.get(event_type)
+        if stats is None:
+            stats = {
+                "prompts": 0,
+                "tokens_total": 0,
+                "tokens_max": 0,
+                "truncated": 0,
+                "latency_ms_total": 0.0,
+                "latency_samples": 0,
+            }
+            self._stats[event_type] = stats
+
+        stats["prompts"] += 1
+        stats["tokens_total"] += tokens
+        stats["tokens_max"] = max(stats["tokens_max"], tokens)
+        if truncated:
+            stats["truncated"] += 1
+
+    @staticmethod
+    def _render(event_json: str) -> str:
+        """Render the full analysis prompt around the compacted event."""
+        return f"""You are an expert cybersecurity threat analyst for a Security Operations Center (SOC).
+Analyze the following security event and provide a detailed threat assessment.
+
+SECURITY EVENT (compacted JSON; long lists are summarized as count/sample):
+{event_json}
+
+Respond with JSON in this format:
+{{"severity":"CRITICAL|HIGH|MEDIUM|LOW|INFO","threat_type":"BRUTE_FORCE|SQL_INJECTION|DDOS_ATTACK|RANSOMWARE|PORT_SCAN|MALWARE|DATA_EXFILTRATION|AUTHENTICATION|FIREWALL_EVENT|API_REQUEST|LOGIN_ATTEMPT|NORMAL_TRAFFIC","confidence":0.0-1.0,"description":"Brief one-line description of the threat","contextual_analysis":"Detailed analysis explaining the threat context, attack patterns, and potential impact","contributing_signals":["Signal 1","Signal 2","Signal 3"],"recommended_actions":["Action 1","Action 2","Action 3"],"mitre_attack_id":"T1110|T1190|T1498|T1486|etc or null if not applicable"}}
+
+SEVERITY GUIDELINES:
+- CRITICAL: Active breach, data exfiltration, ransomware execution, successful exploitation
+- HIGH: Active attacks (brute force, SQL injection), port scans from known bad actors, malware detected
+- MEDIUM: Suspicious activity, multiple failed authentication, unusual traffic patterns
+- LOW: Minor anomalies, single failed auth, informational events
+- INFO: Normal traffic, routine operations, baseline activity
+
+IMPORTANT:
+- Be precise with severity - don't over-classify
+- Include specific IOCs in contributing_signals
+- Provide actionable recommendations
+- Map to MITRE ATT&CK when applicable
+
+Respond ONLY with the JSON, no markdown formatting."""
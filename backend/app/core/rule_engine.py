@@ -0,0 +1,345 @@
+"""
+Fallback Rule Engine
+Declarative rules over event fields compiled into an event_type-indexed matcher
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import yaml
+from app.config import settings
+from app.models.threat import SeverityLevel, ThreatType
+from app.utils.executors import get_executor
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rules", "fallback_rules.yaml")
+
+WILDCARD = "*"
+
+_MISSING = object()
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class RuleMatch:
+    """Outcome of evaluating an event against the rule set."""
+
+    __slots__ = (
+        "rule_id", "severity", "threat_type", "confidence", "description",
+        "contextual_analysis", "recommended_actions", "mitre_attack_id"
+    )
+
+    def __init__(self, rule_id: str, outcome: Dict[str, Any]):
+        self.rule_id = rule_id
+        self.severity: SeverityLevel = outcome["severity"]
+        self.threat_type: ThreatType = outcome["threat_type"]
+        self.confidence: float = outcome["confidence"]
+        self.description: str = outcome["description"]
+        self.contextual_analysis: str = outcome["contextual_analysis"]
+        self.recommended_actions: List[str] = outcome["recommended_actions"]
+        self.mitre_attack_id: Optional[str] = outcome.get("mitre_attack_id")
+
+
+class CompiledRuleSet:
+    """Immutable compiled rules: event_type -> ordered (rule_id, predicates, outcome)."""
+
+    def __init__(self, index: Dict[str, List[Tuple]], wildcard: List[Tuple], defaults: Dict[str, Any], rule_count: int):
+        self.index = index
+        self.wildcard = wildcard
+        self.defaults = defaults
+        self.rule_count = rule_count
+
+
+def _compile_getter(path: str) -> Callable[[Dict[str, Any]], Any]:
+    """Compile a dotted field path into a fast accessor."""
+    keys = tuple(path.split("."))
+
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda event: event.get(key, _MISSING)
+
+    if len(keys) == 2:
+        outer, inner = keys
+
+        def get2(event):
+            value = event.get(outer)
+            return value.get(inner, _MISSING) if isinstance(value, dict) else _MISSING
+        return get2
+
+    def get_path(event):
+        value = event
+        for key in keys:
+            if not isinstance(value, dict):
+                return _MISSING
+            value = value.get(key, _MISSING)
+            if value is _MISSING:
+                return _MISSING
+        return value
+    return get_path
+
+
+def _compile_condition(condition: Dict[str, Any]) -> Predicate:
+    """Compile one {field, op, value} condition into a predicate."""
+    get = _compile_getter(condition["field"])
+    op = condition.get("op", "eq")
+    expected = condition.get("value")
+
+    def numeric(compare):
+        def predicate(event):
+            value = get(event)
+            return isinstance(value, (int, float)) and not isinstance(value, bool) and compare(value)
+        return predicate
+
+    if op == "exists":
+        return lambda event: (get(event) is not _MISSING) == bool(expected if expected is not None else True)
+    if op == "eq":
+        return lambda event: get(event) == expected
+    if op == "ne":
+        return lambda event: get(event) != expected
+    if op == "gt":
+        return numeric(lambda v: v > expected)
+    if op == "gte":
+        return numeric(lambda v: v >= expected)
+    if op == "lt":
+        return numeric(lambda v: v < expected)
+    if op == "lte":
+        return numeric(lambda v: v <= expected)
+    if op in ("in", "not_in"):
+        members = frozenset(expected or [])
+        if op == "in":
+            return lambda event: _hashable(get(event)) in members
+        return lambda event: _hashable(get(event)) not in members
+    if op == "contains":
+        def contains(event):
+            value = get(event)
+            if isinstance(value, str):
+                return isinstance(expected, str) and expected in value
+            if isinstance(value, (list, tuple, set, dict)):
+                return expected in value
+            return False
+        return contains
+    if op == "regex":
+        pattern = re.compile(expected)
+
+        def matches(event):
+            value = get(event)
+            return isinstance(value, str) and pattern.search(value) is not None
+        return matches
+    if op in ("len_gte", "len_lte"):
+        def length(event):
+            value = get(event)
+            if not hasattr(value, "__len__") or value is _MISSING:
+                return False
+            return len(value) >= expected if op == "len_gte" else len(value) <= expected
+        return length
+
+    raise ValueError(f"Unknown condition op: {op}")
+
+
+def _hashable(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+
+
+def _compile_outcome(rule: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve a rule's outcome against the defaults and validate enum values."""
+    merged = {**defaults, **{k: v for k, v in rule.items() if k not in ("id", "event_type", "when")}}
+
+    # Templates may only reference {event_type} and {label}
+    for field in ("description", "contextual_analysis"):
+        merged[field].format(event_type="", label="")
+    return {
+        "severity": SeverityLevel(merged["severity"]),
+        "threat_type": ThreatType(merged["threat_type"]),
+        "confidence": float(merged["confidence"]),
+        "description": merged["description"],
+        "contextual_analysis": merged["contextual_analysis"],
+        "recommended_actions": list(merged["recommended_actions"]),
+        "mitre_attack_id": merged.get("mitre_attack_id"),
+    }
+
+
+def compile_rules(document: Dict[str, Any]) -> CompiledRuleSet:
+    """
+    Compile a rules document into an indexed matcher.
+
+    Args:
+        document: Parsed rules file with "defaults" and "rules"
+
+    Returns:
+        CompiledRuleSet dispatching by event_type, then ordered predicates
+
+    Raises:
+        ValueError: If a rule is malformed
+    """
+    defaults = {
+        "severity": "MEDIUM",
+        "threat_type": "AUTHENTICATION",
+        "confidence": 0.5,
+        "description": "Event detected: {event_type}",
+        "contextual_analysis": "Fallback analysis - AI engine temporarily unavailable",
+        "recommended_actions": ["Review event manually", "Check related events"],
+        **(document.get("defaults") or {}),
+    }
+
+    index: Dict[str, List[Tuple]] = {}
+    wildcard: List[Tuple] = []
+    rules = document.get("rules") or []
+
+    for position, rule in enumerate(rules):
+        rule_id = rule.get("id", f"rule-{position}")
+        try:
+            predicates = tuple(_compile_condition(c) for c in rule.get("when") or [])
+            compiled = (rule_id, predicates, _compile_outcome(rule, defaults))
+        except (KeyError, TypeError, ValueError, re.error) as e:
+            raise ValueError(f"Invalid rule '{rule_id}': {e}") from e
+
+        event_types = rule.get("event_type", WILDCARD)
+        if isinstance(event_types, str):
+            event_types = [event_types]
+        for event_type in event_types:
+            event_type = str(event_type).lower()
+            if event_type == WILDCARD:
+                wildcard.append(compiled)
+            else:
+                index.setdefault(event_type, []).append(compiled)
+
+    # Type-specific rules first, then wildcards, resolved once at compile time
+    merged_index = {event_type: entries + wildcard for event_type, entries in index.items()}
+
+    return CompiledRuleSet(merged_index, wildcard, _compile_outcome({}, defaults), len(rules))
+
+
+class RuleEngine:
+    """
+    Hot-reloadable fallback rule engine.
+
+    Matching is a dict lookup on event_type followed by the ordered
+    predicates of that type's rules. A background watcher checks the rules
+    file every FALLBACK_RULES_CHECK_INTERVAL seconds and compiles changes
+    on the "rules" executor, so evaluation never touches the filesystem; a
+    successful reload swaps the compiled set atomically, and a broken file
+    keeps the previous rules in service.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: Optional[float] = None):
+        self.path = path or settings.fallback_rules_path or DEFAULT_RULES_PATH
+        self.check_interval = settings.fallback_rules_check_interval if check_interval is None else check_interval
+
+        self._lock = threading.Lock()
+        self._mtime = 0.0
+        self._rules = compile_rules({})
+        self._running = False
+
+        self.evaluations = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Load and compile the rules file, swapping it in on success.
+
+        Returns:
+            True if new rules were installed
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+                with open(self.path, "r", encoding="utf-8") as f:
+                    if self.path.endswith(".json"):
+                        document = json.load(f)
+                    else:
+                        document = yaml.safe_load(f) or {}
+
+                compiled = compile_rules(document)
+            except Exception as e:
+                self.reload_errors += 1
+                logger.error(f"❌ Failed to load fallback rules from {self.path}: {e}")
+                return False
+
+            self._rules = compiled
+            self._mtime = mtime
+            self.reloads += 1
+            logger.info(f"Loaded {compiled.rule_count} fallback rules from {self.path}")
+            return True
+
+    def maybe_reload(self) -> bool:
+        """
+        Reload the rules file if it changed (blocking; see watch()).
+
+        Returns:
+            True if new rules were installed
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        return mtime != self._mtime and self.reload()
+
+    async def watch(self):
+        """Background task: reload the rules file off the event loop whenever it changes."""
+        if self.check_interval <= 0:
+            return
+        self._running = True
+        loop = asyncio.get_running_loop()
+        while self._running:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await loop.run_in_executor(get_executor("rules", 1), self.maybe_reload)
+            except Exception as e:
+                logger.error(f"Fallback rules watcher error: {e}")
+
+    def stop(self):
+        """Stop the watcher loop."""
+        self._running = False
+
+    def evaluate(self, event: Dict[str, Any]) -> RuleMatch:
+        """
+        Evaluate an event against the rules.
+
+        Args:
+            event: Raw security event data
+
+        Returns:
+            RuleMatch for the first matching rule, or the defaults
+        """
+        rules = self._rules
+        self.evaluations += 1
+
+        event_type = str(event.get("event_type", "unknown")).lower()
+        for rule_id, predicates, outcome in rules.index.get(event_type, rules.wildcard):
+            for predicate in predicates:
+                if not predicate(event):
+                    break
+            else:
+                return RuleMatch(rule_id, outcome)
+
+        return RuleMatch("default", rules.defaults)
+
+    def get_stats(self) -> Dict:
+        """Get rule engine statistics."""
+        return {
+            "path": self.path,
+            "rules": self._rules.rule_count,
+            "event_types": len(self._rules.index),
+            "evaluations": self.evaluations,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+# Global instance
+_rule_engine = None
+
+
+def get_rule_engine() -> RuleEngine:
+    """Get the global RuleEngine instance."""
+    global _rule_engine
+    if _rule_engine is None:
+        _rule_engine = RuleEngine()
+    return _rule_engine
@@ -0,0 +1,212 @@
+"""
+Similarity Index for Analysis Reuse
+Hashed feature embeddings of events and nearest-neighbor lookup over recent Gemini analyses
+"""
+import math
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bounds of the similarity histogram buckets
+SIMILARITY_BUCKETS = [0.5, 0.7, 0.8, 0.9, 0.95, 0.99, 1.0]
+
+# Payload values longer than this are hashed by prefix only
+MAX_VALUE_CHARS = 64
+
+
+class EventEmbedder:
+    """
+    Embeds security events as L2-normalized hashed feature vectors.
+
+    Features cover event_type, protocol, destination port (exact and
+    class), source /16, and payload keys and values. Numbers are bucketed
+    on a log2 scale so that "150 attempts" and "160 attempts" collide,
+    which is what lets near-duplicate events match.
+    """
+
+    def __init__(self, dimensions: int = None):
+        self.dimensions = dimensions or settings.similarity_dimensions
+
+    def embed(self, event: Dict[str, Any]) -> np.ndarray:
+        """
+        Embed an event.
+
+        Args:
+            event: Raw security event data
+
+        Returns:
+            float32 vector of unit length
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+
+        for feature, weight in self._features(event):
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimensions] += sign * weight
+
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def _features(self, event: Dict[str, Any]) -> List[Tuple[str, float]]:
+        """Extract weighted string features from an event."""
+        features = [(f"type={str(event.get('event_type', 'unknown')).lower()}", 3.0)]
+
+        protocol = event.get("protocol")
+        if protocol:
+            features.append((f"proto={str(protocol).upper()}", 1.0))
+
+        port = event.get("destination_port")
+        if isinstance(port, int):
+            features.append((f"dport={port}", 1.0))
+            features.append((f"dport_class={self._port_class(port)}", 1.0))
+
+        source_ip = str(event.get("source_ip", ""))
+        octets = source_ip.split(".")
+        if len(octets) == 4:
+            features.append((f"src16={octets[0]}.{octets[1]}", 0.5))
+
+        payload = event.get("payload")
+        if isinstance(payload, dict):
+            self._payload_features(payload, "p", features, depth=0)
+
+        return features
+
+    def _payload_features(self, payload: Dict, prefix: str, features: List[Tuple[str, float]], depth: int):
+        """Extract key and value features from a payload dict."""
+        for key, value in payload.items():
+            path = f"{prefix}.{key}"
+            features.append((f"key={path}", 1.0))
+
+            if isinstance(value, bool):
+                features.append((f"{path}={value}", 1.0))
+            elif isinstance(value, (int, float)):
+                features.append((f"{path}~{self._magnitude(value)}", 1.0))
+            elif isinstance(value, str):
+                features.append((f"{path}={value[:MAX_VALUE_CHARS].lower()}", 0.5))
+            elif isinstance(value, (list, tuple)):
+                features.append((f"{path}#len~{self._magnitude(len(value))}", 1.0))
+                for item in value[:5]:
+                    if isinstance(item, (str, int, float)):
+                        features.append((f"{path}[]={str(item)[:MAX_VALUE_CHARS].lower()}", 0.25))
+            elif isinstance(value, dict) and depth < 2:
+                self._payload_features(value, path, features, depth + 1)
+
+    @staticmethod
+    def _magnitude(value: float) -> int:
+        """Log2 bucket of a number."""
+        value = abs(value)
+        return int(math.log2(value)) + 1 if value >= 1 else 0
+
+    @staticmethod
+    def _port_class(port: int) -> str:
+        if port < 1024:
+            return "well_known"
+        if port < 49152:
+            return "registered"
+        return "ephemeral"
+
+
+class SimilarityIndex:
+    """
+    Fixed-capacity nearest-neighbor index over recent analyses.
+
+    Embeddings live in a preallocated NumPy matrix used as a ring buffer;
+    a query is one matrix-vector product restricted to the same event
+    type, so it is exact (no approximation) and costs O(capacity x dims).
+    """
+
+    def __init__(self, capacity: int = None, dimensions: int = None, threshold: float = None):
+        self.embedder = EventEmbedder(dimensions)
+        self.capacity = capacity or settings.similarity_index_size
+        self.threshold = threshold if threshold is not None else settings.similarity_threshold
+
+        self._vectors = np.zeros((self.capacity, self.embedder.dimensions), dtype=np.float32)
+        self._types = np.full(self.capacity, -1, dtype=np.int32)
+        self._analyses: List[Optional[Dict]] = [None] * self.capacity
+        self._type_codes: Dict[str, int] = {}
+        self._next = 0
+        self._size = 0
+
+        self.queries = 0
+        self.reuses = 0
+        self._histogram = [0] * len(SIMILARITY_BUCKETS)
+
+    def add(self, event: Dict[str, Any], analysis: Dict, vector: np.ndarray = None):
+        """Index an event and its analysis, overwriting the oldest entry when full."""
+        if vector is None:
+            vector = self.embedder.embed(event)
+
+        slot = self._next
+        self._vectors[slot] = vector
+        self._types[slot] = self._type_code(event)
+        self._analyses[slot] = analysis
+
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def find(self, event: Dict[str, Any]) -> Tuple[Optional[Dict], float, np.ndarray]:
+        """
+        Find the most similar indexed analysis of the same event type.
+
+        Args:
+            event: Raw security event data
+
+        Returns:
+            Tuple of (analysis or None if below threshold, best similarity, event vector)
+        """
+        vector = self.embedder.embed(event)
+        self.queries += 1
+
+        code = self._type_codes.get(str(event.get("event_type", "unknown")).lower())
+        if code is None or self._size == 0:
+            self._record_similarity(0.0)
+            return None, 0.0, vector
+
+        scores = self._vectors[:self._size] @ vector
+        scores[self._types[:self._size] != code] = -1.0
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        self._record_similarity(similarity)
+
+        if similarity >= self.threshold:
+            self.reuses += 1
+            return self._analyses[best], similarity, vector
+        return None, similarity, vector
+
+    def get_stats(self) -> Dict:
+        """Get reuse rate and the distribution of best-match similarities."""
+        distribution = {}
+        lower = 0.0
+        for upper, count in zip(SIMILARITY_BUCKETS, self._histogram):
+            distribution[f"{lower:.2f}-{upper:.2f}"] = count
+            lower = upper
+
+        return {
+            "indexed": self._size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "queries": self.queries,
+            "reuses": self.reuses,
+            "reuse_rate": round(self.reuses / self.queries, 3) if self.queries else 0.0,
+            "similarity_distribution": distribution,
+        }
+
+    def _type_code(self, event: Dict[str, Any]) -> int:
+        event_type = str(event.get("event_type", "unknown")).lower()
+        code = self._type_codes.get(event_type)
+        if code is None:
+            code = len(self._type_codes)
+            self._type_codes[event_type] = code
+        return code
+
+    def _record_similarity(self, similarity: float):
+        for i, upper in enumerate(SIMILARITY_BUCKETS):
+            if similarity <= upper or i == len(SIMILARITY_BUCKETS) - 1:
+                self._histogram[i] += 1
+                return
@@ -0,0 +1,78 @@
+"""
+Incremental Parser for Streaming Gemini Responses
+Extracts the leading classification fields before the completion finishes
+"""
+import re
+from typing import Optional
+from app.models.threat import ProvisionalClassification, SeverityLevel, ThreatType
+
+# Complete scalar fields only: strings must be closed, numbers must be followed by , or }
+_SEVERITY = re.compile(r'"severity"\s*:\s*"([A-Z_]+)"')
+_THREAT_TYPE = re.compile(r'"threat_type"\s*:\s*"([A-Z_]+)"')
+_CONFIDENCE = re.compile(r'"confidence"\s*:\s*([0-9]*\.?[0-9]+)\s*[,}]')
+
+
+class StreamingAnalysisParser:
+    """
+    Accumulates streamed response text and detects the classification early.
+
+    Severity, threat_type and confidence are the first fields the prompt
+    asks for, so they typically arrive in the first chunk or two while
+    contextual_analysis is still being generated.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._buffer = ""
+        self._severity: Optional[SeverityLevel] = None
+        self._threat_type: Optional[ThreatType] = None
+        self._confidence: Optional[float] = None
+        self._emitted = False
+
+    def feed(self, text: str) -> Optional[ProvisionalClassification]:
+        """
+        Add a chunk of streamed text.
+
+        Args:
+            text: Next response chunk
+
+        Returns:
+            The provisional classification the first time all three
+            fields are available, otherwise None
+        """
+        if not text:
+            return None
+        self._chunks.append(text)
+
+        if self._emitted:
+            return None
+
+        # Fields are near the start; stop scanning once they are found
+        self._buffer += text
+        if self._severity is None:
+            match = _SEVERITY.search(self._buffer)
+            if match and match.group(1) in SeverityLevel.__members__:
+                self._severity = SeverityLevel(match.group(1))
+        if self._threat_type is None:
+            match = _THREAT_TYPE.search(self._buffer)
+            if match and match.group(1) in ThreatType.__members__:
+                self._threat_type = ThreatType(match.group(1))
+        if self._confidence is None:
+            match = _CONFIDENCE.search(self._buffer)
+            if match:
+                self._confidence = min(1.0, max(0.0, float(match.group(1))))
+
+        if self._severity and self._threat_type and self._confidence is not None:
+            self._emitted = True
+            self._buffer = ""
+            return ProvisionalClassification(
+                severity=self._severity,
+                threat_type=self._threat_type,
+                confidence=self._confidence
+            )
+        return None
+
+    @property
+    def text(self) -> str:
+        """Full response text received so far."""
+        return "".join(self._chunks)
@@ -3,6 +3,7 @@ ThreatStream Backend - Main Application
 Real-time AI-powered cybersecurity threat detection platform
 """
 import asyncio
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
@@ -15,8 +16,17 @@ from app.api.routes import health, threats, alerts, analytics, playbooks
 from app.api.websocket.manager import get_connection_manager
 from app.api.websocket.handlers import WebSocketHandler
 from app.services.threat_processor import get_threat_processor
+from app.core.gemini_analyzer import get_gemini_analyzer
+from app.core.prompt_builder import summarize_threats
+from app.core.rule_engine import get_rule_engine
 from app.services.metrics_service import get_metrics_service
+from app.services.geo_service import get_geo_service
+from app.services.threat_intel_service import get_threat_intel_service
+from app.services.firestore_service import get_firestore_service
+from app.services.playbook_service import get_playbook_service
+from app.services.snapshot_service import get_snapshot_service
 from app.core.kafka_producer import get_producer
+from app.utils.executors import shutdown_executors
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -42,6 +52,21 @@ async def lifespan(app: FastAPI):
     threat_processor = get_threat_processor()
     metrics_service = get_metrics_service()
 
+    # Restore the last snapshot before durable storage fills in anything newer
+    snapshots = get_snapshot_service()
+    if settings.snapshot_enabled:
+        snapshots.register("metrics", metrics_service)
+        snapshots.register("storage", get_firestore_service())
+        snapshots.register("playbooks", get_playbook_service())
+        await snapshots.restore()
+
+    # Start the storage write-behind and warm the read cache
+    await get_firestore_service().start()
+
+    # Load threat-intel feeds before the first event is enriched
+    threat_intel = get_threat_intel_service()
+    await threat_intel.reload()
+
     # Initialize Kafka consumer (if credentials are configured)
     kafka_consumer = None
     consumer_task = None
@@ -56,8 +81,8 @@ async def lifespan(app: FastAPI):
                 group_id=settings.kafka_consumer_group
             )
 
-            # Register threat processor as event handler
-            kafka_consumer.add_handler(threat_processor.process_event)
+            # Register threat processor as batch handler (ranks each batch for the AI budget)
+            kafka_consumer.add_batch_handler(threat_processor.process_batch)
 
             # Start consumer in background
             consumer_task = asyncio.create_task(kafka_consumer.start())
@@ -75,6 +100,12 @@ async def lifespan(app: FastAPI):
     heartbeat_task = asyncio.create_task(ws_manager.heartbeat_loop())
     metrics_task = asyncio.create_task(metrics_service.start_aggregation())
     risk_index_task = asyncio.create_task(metrics_service.start_risk_index_publisher())
+    threat_intel_task = asyncio.create_task(threat_intel.watch())
+    rule_engine = get_rule_engine()
+    rule_engine_task = asyncio.create_task(rule_engine.watch())
+    geo = get_geo_service()
+    geo_task = asyncio.create_task(geo.watch())
+    snapshot_task = asyncio.create_task(snapshots.run()) if settings.snapshot_enabled else None
 
     logger.info("✅ ThreatStream Backend started successfully")
     logger.info(f"📡 Kafka: {settings.kafka_raw_topic if settings.confluent_bootstrap_servers else 'Not configured'}")
@@ -92,6 +123,15 @@ async def lifespan(app: FastAPI):
     heartbeat_task.cancel()
     metrics_task.cancel()
     risk_index_task.cancel()
+    threat_intel.stop()
+    threat_intel_task.cancel()
+    rule_engine.stop()
+    rule_engine_task.cancel()
+    geo.stop()
+    geo_task.cancel()
+    if snapshot_task:
+        snapshots.stop()
+        snapshot_task.cancel()
 
     # Stop Kafka consumer if running
     if consumer_task:
@@ -101,6 +141,19 @@ async def lifespan(app: FastAPI):
     if kafka_consumer:
         kafka_consumer.stop()
 
+    # Final snapshot for the next start
+    if settings.snapshot_enabled:
+        await snapshots.save()
+
+    # Flush buffered Firestore writes
+    await get_firestore_service().close()
+
+    # Persist the analysis cache before its I/O thread goes away
+    get_gemini_analyzer().analysis_cache.close()
+
+    # Release dedicated thread pools (Gemini, Kafka polling)
+    shutdown_executors()
+
     logger.info("👋 ThreatStream Backend shutdown complete")
 
 
@@ -181,11 +234,78 @@ async def websocket_endpoint(websocket: WebSocket):
         ws_manager.disconnect(websocket)
 
 
+def _threat_to_event(threat: dict, related: dict) -> dict:
+    """Map a submitted threat (frontend or backend shape) to an analyzer event."""
+    return {
+        "event_id": threat.get("id", "unknown"),
+        "event_type": threat.get("threat_type", threat.get("type", "unknown")),
+        "source_ip": threat.get("sourceIp", threat.get("source_ip", "unknown")),
+        "destination_ip": threat.get("destination_ip", "10.0.0.1"),
+        "severity": threat.get("severity", "MEDIUM"),
+        "description": threat.get("description", "Security event detected"),
+        "timestamp": threat.get("timestamp", ""),
+        "metadata": {
+            "related_threats": related,
+            "threat_count": related["threat_count"]
+        }
+    }
+
+
+def _format_analysis(analysis) -> dict:
+    """Format a GeminiAnalysis the way the frontend expects."""
+    return {
+        "explanation": analysis.contextual_analysis,
+        "factors": analysis.contributing_signals,
+        "confidence": "High" if analysis.confidence >= 0.8 else "Medium" if analysis.confidence >= 0.5 else "Low",
+        "summary": analysis.description,
+        "mitreAttack": f"{analysis.mitre_attack_id} - {analysis.mitre_attack_name}" if analysis.mitre_attack_id else "N/A",
+        "recommendedActions": analysis.recommended_actions,
+        "severity": analysis.severity.value,
+        "threat_type": analysis.threat_type.value,
+        "audit_ref": analysis.audit_ref
+    }
+
+
+def _consolidate_analyses(analyses: list, submitted: int) -> dict:
+    """Build a consolidated summary across per-threat analyses."""
+    severity_order = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFO"]
+    severity_counts = {}
+    techniques = []
+    actions = []
+
+    for analysis in analyses:
+        severity = analysis.severity.value
+        severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        if analysis.mitre_attack_id and analysis.mitre_attack_id not in techniques:
+            techniques.append(analysis.mitre_attack_id)
+        for action in analysis.recommended_actions:
+            if action not in actions:
+                actions.append(action)
+
+    highest = next((level for level in severity_order if level in severity_counts), "INFO")
+
+    return {
+        "threats_submitted": submitted,
+        "threats_analyzed": len(analyses),
+        "highest_severity": highest,
+        "severity_distribution": severity_counts,
+        "mitre_techniques": techniques,
+        "avg_confidence": round(sum(a.confidence for a in analyses) / len(analyses), 3) if analyses else 0.0,
+        "recommended_actions": actions[:10]
+    }
+
+
 @app.post("/api/ai/analyze")
 async def analyze_threats(request: dict):
     """
     Generate AI reasoning and analysis for security threats.
 
+    Up to AI_ANALYZE_MAX_THREATS threats are analyzed concurrently with the
+    shared process-wide analyzer (its caches, executor and rate limiter).
+    Gemini calls come out of the pipeline's AI budget: the threats are
+    ranked by preliminary risk like a queued batch, and those that don't
+    fit the remaining quota get rule-based analysis.
+
     Args:
         request: {
             "threats": [threat_data, ...],  # Array of threat objects
@@ -193,50 +313,63 @@ async def analyze_threats(request: dict):
         }
 
     Returns:
-        AI analysis with MITRE mapping, confidence, and recommended actions
+        AI analysis of the primary (first) threat with MITRE mapping,
+        confidence and recommended actions, plus per-threat results, a
+        consolidated summary and latency breakdown
     """
     try:
-        from app.core.gemini_analyzer import GeminiThreatAnalyzer
-
         threats = request.get("threats", [])
         if not threats:
             return {"error": "No threats provided"}
 
-        # Take the most recent/critical threat for analysis
-        primary_threat = threats[0]
-
-        # Create analyzer
-        analyzer = GeminiThreatAnalyzer()
-
-        # Build comprehensive event data for analysis
-        event_data = {
-            "event_id": primary_threat.get("id", "unknown"),
-            "event_type": primary_threat.get("threat_type", primary_threat.get("type", "unknown")),
-            "source_ip": primary_threat.get("sourceIp", primary_threat.get("source_ip", "unknown")),
-            "destination_ip": primary_threat.get("destination_ip", "10.0.0.1"),
-            "severity": primary_threat.get("severity", "MEDIUM"),
-            "description": primary_threat.get("description", "Security event detected"),
-            "timestamp": primary_threat.get("timestamp", ""),
-            "metadata": {
-                "all_threats": threats,
-                "threat_count": len(threats)
+        started = time.perf_counter()
+        analyzer = get_gemini_analyzer()
+        processor = get_threat_processor()
+        related = summarize_threats(threats)
+        selected = threats[:settings.ai_analyze_max_threats]
+        events = [_threat_to_event(threat, related) for threat in selected]
+
+        # Same budget as the event pipeline, riskiest threats first
+        budget = processor.budget
+        admitted = budget.allocate([
+            budget.preliminary_risk(event, processor.geo.lookup_ip(event["source_ip"])) for event in events
+        ])
+
+        async def analyze_one(i: int, event: dict):
+            threat_started = time.perf_counter()
+            analysis, model_called = await analyzer.analyze_with_usage(event, allow_model=i in admitted)
+            if i in admitted and not model_called:
+                budget.refund()
+            return analysis, model_called, (time.perf_counter() - threat_started) * 1000
+
+        outcomes = await asyncio.gather(*(analyze_one(i, event) for i, event in enumerate(events)))
+        analysis_ms = (time.perf_counter() - started) * 1000
+
+        summary_started = time.perf_counter()
+        analyses = [analysis for analysis, _, _ in outcomes]
+        summary = _consolidate_analyses(analyses, len(threats))
+        summary_ms = (time.perf_counter() - summary_started) * 1000
+
+        results = [
+            {
+                "threat_id": threat.get("id", "unknown"),
+                **_format_analysis(analysis),
+                "ai_analyzed": model_called,
+                "latency_ms": round(latency_ms, 1)
             }
-        }
-
-        # Get AI analysis
-        analysis = await analyzer.analyze(event_data)
+            for threat, (analysis, model_called, latency_ms) in zip(selected, outcomes)
+        ]
 
-        # Return formatted response matching frontend expectations
+        # Top-level fields describe the primary threat (frontend contract)
         return {
-            "explanation": analysis.contextual_analysis,
-            "factors": analysis.contributing_signals,
-            "confidence": "High" if analysis.confidence >= 0.8 else "Medium" if analysis.confidence >= 0.5 else "Low",
-            "summary": analysis.description,
-            "mitreAttack": f"{analysis.mitre_attack_id} - {analysis.mitre_attack_name}" if analysis.mitre_attack_id else "N/A",
-            "recommendedActions": analysis.recommended_actions,
-            "severity": analysis.severity.value,
-            "threat_type": analysis.threat_type.value,
-            "audit_ref": analysis.audit_ref
+            **_format_analysis(analyses[0]),
+            "results": results,
+            "consolidated": summary,
+            "latency_ms": {
+                "analysis": round(analysis_ms, 1),
+                "summary": round(summary_ms, 1),
+                "total": round((time.perf_counter() - started) * 1000, 1)
+            }
         }
 
     except Exception as e:
@@ -98,6 +98,18 @@ class GeminiAnalysis(BaseModel):
     audit_ref: str = "GEMINI-PRO-ENGINE"
 
 
+class ProvisionalClassification(BaseModel):
+    """
+    Early classification parsed from a streaming Gemini response.
+
+    Available before contextual_analysis and recommendations finish
+    generating; superseded by the full GeminiAnalysis.
+    """
+    severity: SeverityLevel
+    threat_type: ThreatType
+    confidence: float = Field(ge=0.0, le=1.0, description="AI confidence score")
+
+
 class Threat(BaseModel):
     """
     Analyzed threat with AI enrichment.
@@ -119,6 +131,7 @@ class Threat(BaseModel):
     source_country: Optional[str] = None
     source_country_code: Optional[str] = None
     source_zone: Optional[str] = None
+    threat_intel_feeds: Optional[List[str]] = None
 
     # Target information
     destination_ip: Optional[str] = None
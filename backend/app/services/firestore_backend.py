@@ -0,0 +1,233 @@
+"""
+Firestore Write-Behind Backend
+Buffers document writes and flushes them to Cloud Firestore in batched commits
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.utils.logger import get_logger
+
+try:
+    from google.cloud import firestore
+except ImportError:  # google-cloud-firestore is only needed with STORAGE_BACKEND=firestore
+    firestore = None
+
+logger = get_logger(__name__)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+
+def to_document(value: Any) -> Any:
+    """Convert model dumps to Firestore-encodable values (enums -> their value)."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {key: to_document(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_document(item) for item in value]
+    return value
+
+
+class FirestoreWriteBehind:
+    """
+    Write-behind buffer in front of the Firestore async client.
+
+    Writes are queued per (collection, document id), so repeated updates
+    to the same document before a flush collapse into one write. The
+    buffer is flushed in batched commits of up to FIRESTORE_BATCH_SIZE
+    documents as soon as a full batch is pending, and otherwise every
+    FIRESTORE_FLUSH_INTERVAL seconds. Failed batches are re-queued unless
+    a newer write to the same document is already pending. Setting
+    FIRESTORE_EMULATOR_HOST points the client at a local emulator.
+    """
+
+    def __init__(self, client=None):
+        if client is None:
+            if firestore is None:
+                raise RuntimeError("google-cloud-firestore is not installed")
+            if settings.firestore_emulator_host:
+                # Read by the client library when it builds its channel
+                os.environ["FIRESTORE_EMULATOR_HOST"] = settings.firestore_emulator_host
+            client = firestore.AsyncClient(
+                project=settings.google_cloud_project or "threatstream-local",
+                database=settings.firestore_database
+            )
+        self.client = client
+
+        self.batch_size = max(1, min(settings.firestore_batch_size, MAX_BATCH_WRITES))
+        self.flush_interval = settings.firestore_flush_interval
+        self.max_pending = settings.firestore_max_pending
+
+        self._pending: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._batch_ready = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Metrics
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.documents_written = 0
+        self.flush_errors = 0
+        self.reads = 0
+        self._batch_sizes: deque = deque(maxlen=256)
+        self._flush_latencies: deque = deque(maxlen=256)  # seconds
+
+        logger.info(
+            f"Firestore write-behind initialized (database {settings.firestore_database}, "
+            f"batch {self.batch_size}, every {self.flush_interval}s"
+            f"{', emulator ' + settings.firestore_emulator_host if settings.firestore_emulator_host else ''})"
+        )
+
+    def enqueue(self, collection: str, document_id: str, data: Dict):
+        """
+        Queue a document write (set, replacing the whole document).
+
+        Args:
+            collection: Collection name
+            document_id: Document id
+            data: Document fields
+        """
+        key = (collection, document_id)
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending.move_to_end(key)
+        elif len(self._pending) >= self.max_pending:
+            # Firestore unreachable for long: keep memory flat, lose the oldest writes
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[key] = data
+        self.enqueued += 1
+
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+    def pending_document(self, collection: str, document_id: str) -> Optional[Dict]:
+        """A queued write that has not reached Firestore yet."""
+        return self._pending.get((collection, document_id))
+
+    async def start(self):
+        """Start the background flusher."""
+        if self._task is None:
+            self._running = True
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Stop the flusher and write everything still pending."""
+        self._running = False
+        if self._task is not None:
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+        while self._pending:
+            if not await self.flush():
+                logger.error(f"❌ {len(self._pending)} Firestore writes lost at shutdown")
+                break
+
+    async def _flush_loop(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            # Drain full batches back to back, then the remainder
+            while self._pending:
+                if not await self.flush():
+                    await asyncio.sleep(min(self.flush_interval, 5.0))  # Back off after a failed commit
+                    break
+                if len(self._pending) < self.batch_size and self._running:
+                    break
+
+    async def flush(self) -> bool:
+        """
+        Commit one batch of pending writes.
+
+        Returns:
+            True if the batch was committed (or nothing was pending)
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+
+            items: List[Tuple[Tuple[str, str], Dict]] = []
+            while self._pending and len(items) < self.batch_size:
+                items.append(self._pending.popitem(last=False))
+
+            batch = self.client.batch()
+            for (collection, document_id), data in items:
+                batch.set(self.client.collection(collection).document(document_id), to_document(data))
+
+            started = time.perf_counter()
+            try:
+                await batch.commit()
+            except Exception as e:
+                self.flush_errors += 1
+                logger.error(f"❌ Firestore batch of {len(items)} writes failed: {e}")
+                # Re-queue at the front unless a newer write for the document arrived meanwhile
+                for key, data in reversed(items):
+                    if key not in self._pending:
+                        self._pending[key] = data
+                        self._pending.move_to_end(key, last=False)
+                return False
+
+            self._flush_latencies.append(time.perf_counter() - started)
+            self._batch_sizes.append(len(items))
+            self.flushes += 1
+            self.documents_written += len(items)
+            logger.debug(f"Flushed {len(items)} documents to Firestore")
+            return True
+
+    async def get(self, collection: str, document_id: str) -> Optional[Dict]:
+        """Read a document (pending writes win over Firestore)."""
+        pending = self.pending_document(collection, document_id)
+        if pending is not None:
+            return pending
+        self.reads += 1
+        snapshot = await self.client.collection(collection).document(document_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def query_recent(self, collection: str, order_by: str, limit: int) -> List[Dict]:
+        """
+        Newest documents of a collection (single-field order, no composite index needed).
+
+        Returns:
+            Documents ordered by `order_by` descending
+        """
+        query = self.client.collection(collection).order_by(order_by, direction="DESCENDING").limit(limit)
+        self.reads += 1
+        return [snapshot.to_dict() async for snapshot in query.stream()]
+
+    def get_stats(self) -> Dict:
+        """Get buffer, batch size and flush latency metrics."""
+        latencies = sorted(self._flush_latencies)
+        sizes = self._batch_sizes
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "emulator": settings.firestore_emulator_host or None,
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "documents_written": self.documents_written,
+            "flush_errors": self.flush_errors,
+            "reads": self.reads,
+            "batch_size_avg": round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+            "batch_size_max": max(sizes) if sizes else 0,
+            "flush_latency_ms_p50": percentile(0.5),
+            "flush_latency_ms_p95": percentile(0.95),
+        }
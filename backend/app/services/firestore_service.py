@@ -2,113 +2,805 @@
 Firestore Database Service
 Storage and retrieval of threats, alerts, and analytics
 """
-from typing import List, Optional, Dict
+import asyncio
+import bisect
+import heapq
+from collections import Counter, OrderedDict, deque
+from itertools import islice
+from typing import Any, Deque, List, Optional, Dict
 from datetime import datetime, timedelta
 from app.models.threat import Threat
 from app.models.alert import Alert
 from app.config import settings
 from app.utils.logger import get_logger
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.inverted_index import InvertedIndex, tokenize
+from app.utils.ring_buffer import IndexedRingBuffer
+from app.services.firestore_backend import FirestoreWriteBehind
+from app.services.threat_log import ThreatLog, to_millis
+from app.services.threat_table import ThreatTable
+from app.utils.executors import get_executor
 
 logger = get_logger(__name__)
 
+# Query filter -> threat field with a secondary index
+THREAT_INDEX_FIELDS = {
+    "severity": "severity",
+    "threat_type": "threat_type",
+    "source_ip": "source_ip",
+    "country": "source_country_code",
+}
+
+# Free-text threat fields covered by full-text search
+SEARCH_FIELDS = ("description", "contextual_analysis", "contributing_signals", "mitre_attack_id")
+
+
+# Alert lifecycle: active statuses vs. closed ones that age out into history
+ACTIVE_ALERT_STATUSES = ("NEW", "ACKNOWLEDGED", "INVESTIGATING")
+CLOSED_ALERT_STATUSES = ("RESOLVED", "FALSE_POSITIVE")
+ALERT_PRIORITIES = ("P1", "P2", "P3", "P4")
+
+
+def _index_key(value: Any) -> Any:
+    """Normalize enum values so SeverityLevel.HIGH and "HIGH" share a key."""
+    return getattr(value, "value", value)
+
+
+def _search_terms(threat: Dict) -> List[str]:
+    terms = []
+    for field in SEARCH_FIELDS:
+        value = threat.get(field)
+        if isinstance(value, str):
+            terms.extend(tokenize(value))
+        elif value:
+            for item in value:
+                terms.extend(tokenize(str(item)))
+    return terms
+
+
+def _cursor_for(item: Dict, timestamp_field: str) -> str:
+    return encode_cursor(to_millis(item[timestamp_field]), item["id"])
+
+
+def _in_window(timestamp: Any, since_ms: Optional[int], until_ms: Optional[int]) -> bool:
+    ts = to_millis(timestamp)
+    return (since_ms is None or ts >= since_ms) and (until_ms is None or ts <= until_ms)
+
+
+# In-memory structures replaced as a unit by FirestoreService.load_state
+MEMORY_STATE = (
+    "threats", "_threat_indexes", "_severity_counts", "_type_counts", "threat_table", "search_index",
+    "alerts", "_alert_status", "_active_alerts", "_alert_history", "_activation_seq", "alerts_dropped",
+    "_restored_until_ms",
+)
+
 
 class FirestoreService:
     """
     Service for Firestore database operations.
 
-    Note: This is a simplified in-memory implementation for demonstration.
-    In production, integrate with actual Google Cloud Firestore.
+    The in-memory structures below are the read cache. With
+    STORAGE_BACKEND=firestore every threat and alert write is also queued
+    on a write-behind buffer that batches it to Cloud Firestore (or the
+    emulator), lookups that miss the cache read through to Firestore, and
+    start() warms the cache from the most recent documents. With
+    STORAGE_BACKEND=local threats are appended to a segmented on-disk
+    ThreatLog instead, which also serves time-range queries.
+
+    Threats live in a fixed-capacity ring buffer indexed by id, so storing,
+    fetching by id and reading the newest N are independent of how many
+    threats are retained. Secondary indexes map each severity, threat
+    type, source IP and country to a deque of sequence numbers in
+    insertion order; evicting a threat pops it from the left of each of
+    its deques. Severity and type counters are maintained the same way,
+    so statistics never rescan the store.
+
+    Alerts are kept in an id -> alert map with a status -> ordered ids
+    index. Active alerts are also bucketed by priority (ordered by when
+    they became active), so active queries touch only active alerts.
+    Closed alerts move into a history capped at ALERT_HISTORY_CAPACITY;
+    if more than ALERT_ACTIVE_CAPACITY alerts are open at once, the oldest
+    lowest-priority one is dropped.
     """
 
-    def __init__(self):
+    def __init__(self, max_threats: int = None):
         # In-memory storage (replace with Firestore in production)
-        self.threats: List[Dict] = []
-        self.alerts: List[Dict] = []
-        self.max_threats = 1000  # Keep last 1000 threats in memory
+        self.max_threats = max_threats or settings.threat_store_capacity
+        self.max_active_alerts = settings.alert_active_capacity
+        self.max_alert_history = settings.alert_history_capacity
+        self._reset_memory_state()
+
+        # Durable storage behind the cache
+        self.backend: Optional[FirestoreWriteBehind] = None
+        self.threat_log: Optional[ThreatLog] = None
+        if settings.storage_backend == "firestore":
+            try:
+                self.backend = FirestoreWriteBehind()
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize Firestore backend: {e}")
+                logger.warning("⚠️  Falling back to in-memory storage")
+        elif settings.storage_backend == "local":
+            try:
+                self.threat_log = ThreatLog()
+            except OSError as e:
+                logger.error(f"❌ Failed to open threat log: {e}")
+                logger.warning("⚠️  Falling back to in-memory storage")
+
+        if self.backend:
+            mode = "Firestore write-behind"
+        elif self.threat_log:
+            mode = f"local threat log at {self.threat_log.directory}"
+        else:
+            mode = "in-memory mode"
+        logger.info(f"FirestoreService initialized ({mode}, {self.max_threats} threats cached)")
+
+    def _reset_memory_state(self):
+        """Empty every in-memory threat and alert structure (see MEMORY_STATE)."""
+        self.threats = IndexedRingBuffer(self.max_threats)
+        self._threat_indexes: Dict[str, Dict[Any, Deque[int]]] = {name: {} for name in THREAT_INDEX_FIELDS}
+        self._severity_counts: Counter = Counter()
+        self._type_counts: Counter = Counter()
+        self.threat_table = ThreatTable()  # Columnar history for aggregations
+        self.search_index = InvertedIndex() if settings.threat_search_enabled else None
+        self.alerts: Dict[str, Dict] = {}  # id -> alert (active + history)
+        self._alert_status: Dict[str, OrderedDict] = {
+            status: OrderedDict() for status in ACTIVE_ALERT_STATUSES + CLOSED_ALERT_STATUSES
+        }
+        self._active_alerts: Dict[str, OrderedDict] = {priority: OrderedDict() for priority in ALERT_PRIORITIES}
+        self._alert_history: OrderedDict = OrderedDict()  # closed ids, oldest first
+        self._activation_seq = 0
+        self.alerts_dropped = 0
+        self._restored_until_ms: Optional[int] = None  # Newest threat timestamp from a restored snapshot
+
+    async def start(self):
+        """Start the write-behind flusher and warm the cache from durable storage."""
+        if self.threat_log is not None:
+            threats = await asyncio.get_running_loop().run_in_executor(
+                get_executor("threat-log", 1), self.threat_log.tail, self.max_threats
+            )
+            # The log tail is in append order: anything not restored from a snapshot is newer
+            threats = [threat_dict for threat_dict in threats if threat_dict["id"] not in self.threats]
+            for threat_dict in threats:
+                self._cache_threat(Threat(**threat_dict).dict())
+            logger.info(f"✅ Warmed cache from threat log: {len(threats)} threats")
+            return
+
+        if self.backend is None:
+            return
+        await self.backend.start()
+        try:
+            threats = await self.backend.query_recent(
+                settings.firestore_collection_threats, "timestamp", self.max_threats
+            )
+            threats = [threat_dict for threat_dict in reversed(threats) if not self._restored(threat_dict)]
+            for threat_dict in threats:
+                self._cache_threat(threat_dict)
+
+            alerts = await self.backend.query_recent(
+                settings.firestore_collection_alerts, "created_at", self.max_active_alerts + self.max_alert_history
+            )
+            alerts = [alert_dict for alert_dict in reversed(alerts) if alert_dict["id"] not in self.alerts]
+            for alert_dict in alerts:
+                self._cache_alert(alert_dict)
+
+            logger.info(f"✅ Warmed cache from Firestore: {len(threats)} threats, {len(alerts)} alerts")
+        except Exception as e:
+            logger.error(f"❌ Failed to warm cache from Firestore: {e}")
+
+    def _restored(self, threat_dict: Dict) -> bool:
+        """
+        Whether a threat from Firestore is covered by the restored snapshot.
 
-        logger.info("FirestoreService initialized (in-memory mode)")
+        query_recent returns the newest threats by event timestamp, not by
+        write order, so older ones missing from the cache were evicted
+        before the snapshot rather than written after it.
+        """
+        if self._restored_until_ms is None:
+            return False
+        return threat_dict["id"] in self.threats or to_millis(threat_dict["timestamp"]) < self._restored_until_ms
+
+    def get_state(self) -> Dict:
+        """
+        Copy of the in-memory threat and alert state for snapshots.
+
+        Containers are copied (alerts one level deep, since their status
+        fields change in place) so the copy can be pickled off the event
+        loop while new threats arrive.
+        """
+        return {
+            "threats": self.threats.get_state(),
+            "threat_indexes": {
+                name: {key: list(seqs) for key, seqs in index.items()} for name, index in self._threat_indexes.items()
+            },
+            "severity_counts": dict(self._severity_counts),
+            "type_counts": dict(self._type_counts),
+            "threat_table": self.threat_table.get_state(),
+            "search_index": self.search_index.get_state() if self.search_index else None,
+            "alerts": {alert_id: dict(alert) for alert_id, alert in self.alerts.items()},
+            "alert_status": {status: list(ids) for status, ids in self._alert_status.items()},
+            "active_alerts": {priority: list(bucket.items()) for priority, bucket in self._active_alerts.items()},
+            "alert_history": list(self._alert_history),
+            "activation_seq": self._activation_seq,
+            "alerts_dropped": self.alerts_dropped,
+        }
+
+    def load_state(self, state: Dict):
+        """
+        Restore a get_state() copy.
+
+        Indexes are loaded as saved when THREAT_STORE_CAPACITY is unchanged;
+        otherwise the saved threats are re-inserted (slower, re-indexes).
+        Everything is built and checked on a staging instance and only
+        then swapped in, so a bad snapshot leaves a fresh, empty store.
+
+        Raises:
+            KeyError, ValueError: If the state is incomplete or inconsistent
+        """
+        staged = FirestoreService.__new__(FirestoreService)
+        staged.max_threats = self.max_threats
+        staged.max_active_alerts = self.max_active_alerts
+        staged.max_alert_history = self.max_alert_history
+        staged._reset_memory_state()
+        try:
+            staged._load_memory_state(state)
+            staged._check_memory_state()
+        except Exception:
+            self._reset_memory_state()
+            raise
+
+        for name in MEMORY_STATE:
+            setattr(self, name, getattr(staged, name))
+
+    def _load_memory_state(self, state: Dict):
+        threats = state["threats"]
+        try:
+            self.threats.load_state(threats)
+        except ValueError:
+            saved = IndexedRingBuffer(threats["capacity"])
+            saved.load_state(threats)
+            logger.warning(f"⚠️  Threat store capacity changed, re-indexing {len(saved)} snapshot threats")
+            for threat_dict in reversed(saved.newest(self.max_threats)):
+                self._cache_threat(threat_dict)
+        else:
+            self._threat_indexes = {
+                name: {key: deque(seqs) for key, seqs in index.items()}
+                for name, index in state["threat_indexes"].items()
+            }
+            self._severity_counts = Counter(state["severity_counts"])
+            self._type_counts = Counter(state["type_counts"])
+            if self.search_index is not None:
+                if state["search_index"] is not None:
+                    self.search_index.load_state(state["search_index"])
+                else:
+                    for seq in range(self.threats.oldest_seq, self.threats.next_seq):
+                        self.search_index.add(seq, _search_terms(self.threats.get_seq(seq)))
+        self.threat_table.load_state(state["threat_table"])
+
+        self.alerts = state["alerts"]
+        for status, ids in state["alert_status"].items():
+            self._alert_status[status] = OrderedDict.fromkeys(ids)
+        for priority, items in state["active_alerts"].items():
+            self._active_alerts[priority] = OrderedDict(items)
+        self._alert_history = OrderedDict.fromkeys(state["alert_history"])
+        self._activation_seq = state["activation_seq"]
+        self.alerts_dropped = state["alerts_dropped"]
+
+        newest = self.threats.newest(1)
+        self._restored_until_ms = to_millis(newest[0]["timestamp"]) if newest else None
+
+    def _check_memory_state(self):
+        """Cross-check restored structures; raises ValueError on a mismatch."""
+        cached = len(self.threats)
+        if sum(self._severity_counts.values()) != cached or sum(self._type_counts.values()) != cached:
+            raise ValueError("threat counters do not match the threat store")
+        if self.search_index is not None and self.search_index.documents != cached:
+            raise ValueError("search index does not match the threat store")
+        for index in self._threat_indexes.values():
+            for seqs in index.values():
+                if seqs and (seqs[0] < self.threats.oldest_seq or seqs[-1] >= self.threats.next_seq):
+                    raise ValueError("secondary index points outside the threat store")
+
+        if sum(len(ids) for ids in self._alert_status.values()) != len(self.alerts):
+            raise ValueError("alert status index does not match the alerts")
+        indexed = list(self._alert_status.values())
+        indexed += list(self._active_alerts.values()) + [self._alert_history]
+        if any(alert_id not in self.alerts for ids in indexed for alert_id in ids):
+            raise ValueError("alert index references a missing alert")
+
+    async def close(self):
+        """Flush pending writes to Firestore / the threat log."""
+        if self.backend is not None:
+            await self.backend.close()
+        if self.threat_log is not None:
+            await asyncio.get_running_loop().run_in_executor(get_executor("threat-log", 1), self.threat_log.close)
 
     async def store_threat(self, threat: Threat) -> None:
         """Store a threat in the database."""
         try:
             threat_dict = threat.dict()
-            self.threats.insert(0, threat_dict)  # Add to beginning
-
-            # Keep only recent threats
-            if len(self.threats) > self.max_threats:
-                self.threats = self.threats[:self.max_threats]
+            self._cache_threat(threat_dict)
+            if self.backend:
+                self.backend.enqueue(settings.firestore_collection_threats, threat_dict["id"], threat_dict)
+            elif self.threat_log:
+                # Write, flush, fsync and segment rolls stay off the event loop; one thread keeps appends ordered
+                await asyncio.get_running_loop().run_in_executor(
+                    get_executor("threat-log", 1), self.threat_log.append, threat_dict
+                )
 
             logger.debug(f"Stored threat: {threat.id}")
         except Exception as e:
             logger.error(f"Failed to store threat: {e}")
             raise
 
+    def _cache_threat(self, threat_dict: Dict):
+        seq, evicted = self.threats.append(threat_dict["id"], threat_dict)  # Evicts the oldest when full
+        if evicted is not None:
+            self._unindex_threat(evicted)
+            if self.search_index is not None:
+                self.search_index.remove(seq - self.max_threats, _search_terms(evicted))
+        self._index_threat(seq, threat_dict)
+        if self.search_index is not None:
+            self.search_index.add(seq, _search_terms(threat_dict))
+        self.threat_table.append(threat_dict)
+
     async def get_threat(self, threat_id: str) -> Optional[Dict]:
-        """Get a specific threat by ID."""
-        for threat in self.threats:
-            if threat.get("id") == threat_id:
-                return threat
-        return None
+        """Get a specific threat by ID (reads through to Firestore on a cache miss)."""
+        threat = self.threats.get(threat_id)
+        if threat is None and self.backend:
+            threat = await self.backend.get(settings.firestore_collection_threats, threat_id)
+        return threat
+
+    def _index_threat(self, seq: int, threat: Dict):
+        self._severity_counts[_index_key(threat.get("severity", "UNKNOWN"))] += 1
+        self._type_counts[_index_key(threat.get("threat_type", "UNKNOWN"))] += 1
+        for name, field in THREAT_INDEX_FIELDS.items():
+            key = _index_key(threat.get(field))
+            if key is not None:
+                self._threat_indexes[name].setdefault(key, deque()).append(seq)
 
-    async def get_recent_threats(self, limit: int = 50, severity: Optional[str] = None) -> List[Dict]:
-        """Get recent threats, optionally filtered by severity."""
-        threats = self.threats
+    def _unindex_threat(self, threat: Dict):
+        for counts, field in ((self._severity_counts, "severity"), (self._type_counts, "threat_type")):
+            key = _index_key(threat.get(field, "UNKNOWN"))
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
 
-        if severity:
-            threats = [t for t in threats if t.get("severity") == severity]
+        # The evicted threat is the oldest, so it is at the left of every deque it is in
+        for name, field in THREAT_INDEX_FIELDS.items():
+            key = _index_key(threat.get(field))
+            postings = self._threat_indexes[name].get(key)
+            if postings:
+                postings.popleft()
+                if not postings:
+                    del self._threat_indexes[name][key]
 
-        return threats[:limit]
+    async def get_recent_threats(
+        self,
+        limit: int = 50,
+        severity: Optional[str] = None,
+        threat_type: Optional[str] = None,
+        source_ip: Optional[str] = None,
+        country: Optional[str] = None
+    ) -> List[Dict]:
+        """Get recent threats, newest first, optionally filtered (see get_threat_page)."""
+        page = await self.get_threat_page(
+            limit=limit, severity=severity, threat_type=threat_type, source_ip=source_ip, country=country
+        )
+        return page["threats"]
+
+    async def get_threat_page(
+        self,
+        limit: int = 50,
+        severity: Optional[str] = None,
+        threat_type: Optional[str] = None,
+        source_ip: Optional[str] = None,
+        country: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        since_cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Get one page of recent threats, newest first.
+
+        Filters are combined with AND. The query walks the smallest
+        matching secondary index and checks the remaining filters per
+        threat, stopping after `limit` matches. Cursors are keyset
+        positions on (timestamp, id); a cursor whose threat is still
+        retained is resolved to its sequence number, so paging starts
+        right at it. Otherwise (timestamp, id) is compared per threat.
+
+        Args:
+            limit: Maximum number of threats to return
+            severity: Severity level
+            threat_type: Threat type
+            source_ip: Source IP address
+            country: Source country code
+            since: Only threats with timestamp >= since
+            until: Only threats with timestamp <= until
+            cursor: Return threats older than this cursor (next page)
+            since_cursor: Return only threats newer than this cursor
+                (polling); the oldest `limit` of them, so repeated polls
+                never skip any
+
+        Returns:
+            {"threats", "next_cursor", "latest_cursor", "has_more"}
+
+        Raises:
+            ValueError: If a cursor is malformed
+        """
+        filters = {
+            name: value for name, value in (
+                ("severity", severity), ("threat_type", threat_type),
+                ("source_ip", source_ip), ("country", country)
+            ) if value
+        }
+        forward = since_cursor is not None
+        position = decode_cursor(since_cursor if forward else cursor) if (cursor or forward) else None
+        empty = {"threats": [], "next_cursor": None, "latest_cursor": since_cursor, "has_more": False}
+
+        # Driving sequence numbers: the smallest matching index, or the whole buffer
+        postings = None
+        checks = []
+        if filters:
+            candidates = []
+            for name, value in filters.items():
+                seqs = self._threat_indexes[name].get(value)
+                if not seqs:
+                    return empty
+                candidates.append((len(seqs), name, seqs))
+            _, driver, postings = min(candidates)
+            checks = [(THREAT_INDEX_FIELDS[name], value) for name, value in filters.items() if name != driver]
+
+        # Keyset position: exact sequence number if the cursor's threat is retained
+        position_seq = self.threats.seq_of(position[1]) if position else None
+        after = position_seq if forward else None
+        before = position_seq if not forward else None
+        fallback = position if position and position_seq is None else None
+
+        if postings is None:
+            lo = self.threats.oldest_seq if after is None else max(after + 1, self.threats.oldest_seq)
+            hi = self.threats.next_seq if before is None else before
+            seqs = range(lo, hi) if forward else range(hi - 1, lo - 1, -1)
+        else:
+            lo = bisect.bisect_right(postings, after) if after is not None else 0
+            hi = bisect.bisect_left(postings, before) if before is not None else len(postings)
+            seqs = (postings[i] for i in (range(lo, hi) if forward else range(hi - 1, lo - 1, -1)))
+
+        since_ms = to_millis(since) if since else None
+        until_ms = to_millis(until) if until else None
+        windowed = since_ms is not None or until_ms is not None
+        threats = []
+        has_more = False
+        for seq in seqs:
+            threat = self.threats.get_seq(seq)
+            if checks and not all(_index_key(threat.get(field)) == value for field, value in checks):
+                continue
+            if windowed and not _in_window(threat["timestamp"], since_ms, until_ms):
+                continue
+            if fallback:
+                key = (to_millis(threat["timestamp"]), threat["id"])
+                if (key <= fallback) if forward else (key >= fallback):
+                    continue
+            if len(threats) >= limit:
+                has_more = True
+                break
+            threats.append(threat)
+
+        if forward:
+            threats.reverse()
+        return {
+            "threats": threats,
+            "next_cursor": _cursor_for(threats[-1], "timestamp") if threats and has_more and not forward else None,
+            "latest_cursor": _cursor_for(threats[0], "timestamp") if threats else since_cursor,
+            "has_more": has_more
+        }
+
+    async def search_threats(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Full-text search over cached threats (see SEARCH_FIELDS).
+
+        Args:
+            query: Terms (AND), OR, -term / NOT term and prefix* (see parse_query)
+            limit: Maximum number of threats to return
+
+        Returns:
+            Matching threats, newest first
+
+        Raises:
+            ValueError: If the query is empty or invalid, or search is disabled
+        """
+        if self.search_index is None:
+            raise ValueError("Threat search is disabled (THREAT_SEARCH_ENABLED=false)")
+        seqs = self.search_index.search(query, limit=limit, min_seq=self.threats.oldest_seq)
+        return [self.threats.get_seq(seq) for seq in seqs]
+
+    async def get_threats_between(
+        self,
+        start: datetime,
+        end: datetime,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 1000
+    ) -> List[Dict]:
+        """
+        Get threats with start <= timestamp <= end, oldest first.
+
+        Served from the threat log when STORAGE_BACKEND=local (only the
+        segments and index blocks overlapping the range are read, off the
+        event loop); otherwise from the in-memory store.
+
+        Args:
+            start: Range start
+            end: Range end (inclusive)
+            filters: Query filters (severity, threat_type, source_ip, country)
+            limit: Maximum number of threats to return
+
+        Returns:
+            Matching threats
+        """
+        fields = {THREAT_INDEX_FIELDS[name]: value for name, value in (filters or {}).items() if value}
+
+        if self.threat_log is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                get_executor("threat-log", 1), self.threat_log.get_threats_between, start, end, fields, limit
+            )
+
+        start_ms, end_ms = to_millis(start), to_millis(end)
+        threats = []
+        for threat in reversed(list(self.threats.iter_newest())):
+            if start_ms <= to_millis(threat["timestamp"]) <= end_ms and all(
+                _index_key(threat.get(field)) == value for field, value in fields.items()
+            ):
+                threats.append(threat)
+                if len(threats) >= limit:
+                    break
+        return threats
 
     async def store_alert(self, alert: Alert) -> None:
         """Store an alert in the database."""
         try:
             alert_dict = alert.dict()
-            self.alerts.insert(0, alert_dict)
+            self._cache_alert(alert_dict)
+            if self.backend:
+                self.backend.enqueue(settings.firestore_collection_alerts, alert_dict["id"], alert_dict)
+
             logger.debug(f"Stored alert: {alert.id}")
         except Exception as e:
             logger.error(f"Failed to store alert: {e}")
             raise
 
-    async def get_active_alerts(self, limit: int = 50) -> List[Dict]:
-        """Get active alerts."""
-        active_alerts = [
-            a for a in self.alerts
-            if a.get("status") in ["NEW", "ACKNOWLEDGED", "INVESTIGATING"]
-        ]
-        return active_alerts[:limit]
+    def _cache_alert(self, alert_dict: Dict):
+        alert_id = alert_dict["id"]
+        status = _index_key(alert_dict.get("status")) or "NEW"
+
+        self.alerts[alert_id] = alert_dict
+        self._alert_status.setdefault(status, OrderedDict())[alert_id] = None
+        if status in ACTIVE_ALERT_STATUSES:
+            self._activate_alert(alert_id, alert_dict)
+        else:
+            self._archive_alert(alert_id)
+
+    def _activate_alert(self, alert_id: str, alert: Dict):
+        """Add to its priority bucket, dropping the oldest lowest-priority alert if over capacity."""
+        self._activation_seq += 1
+        self._active_alerts.setdefault(_index_key(alert.get("priority")), OrderedDict())[alert_id] = self._activation_seq
+
+        if sum(len(bucket) for bucket in self._active_alerts.values()) > self.max_active_alerts:
+            for bucket in reversed(list(self._active_alerts.values())):
+                if bucket:
+                    dropped_id, _ = bucket.popitem(last=False)
+                    dropped = self.alerts.pop(dropped_id)
+                    self._alert_status[_index_key(dropped.get("status"))].pop(dropped_id, None)
+                    self.alerts_dropped += 1
+                    logger.warning(f"⚠️  Active alert limit ({self.max_active_alerts}) reached, dropped {dropped_id}")
+                    break
+
+    def _archive_alert(self, alert_id: str):
+        """Append to the closed-alert history, ageing out the oldest beyond capacity."""
+        self._alert_history[alert_id] = None
+        while len(self._alert_history) > self.max_alert_history:
+            expired_id, _ = self._alert_history.popitem(last=False)
+            expired = self.alerts.pop(expired_id)
+            self._alert_status[_index_key(expired.get("status"))].pop(expired_id, None)
+
+    async def get_alert(self, alert_id: str) -> Optional[Dict]:
+        """Get a specific alert by ID (reads through to Firestore on a cache miss)."""
+        alert = self.alerts.get(alert_id)
+        if alert is None and self.backend:
+            alert = await self.backend.get(settings.firestore_collection_alerts, alert_id)
+        return alert
+
+    async def get_active_alerts(self, limit: int = 50, order: str = "recent") -> List[Dict]:
+        """Get active alerts (see get_alert_page)."""
+        page = await self.get_alert_page(limit=limit, order=order)
+        return page["alerts"]
+
+    async def get_alert_page(
+        self,
+        limit: int = 50,
+        order: str = "recent",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        since_cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Get one page of active alerts.
+
+        Args:
+            limit: Maximum number of alerts to return
+            order: "recent" (newest first) or "priority" (P1 first, newest
+                first within a priority)
+            since: Only alerts created at or after since
+            until: Only alerts created at or before until
+            cursor: Return alerts older than this cursor (order=recent only)
+            since_cursor: Return only alerts that became active after this
+                cursor (order=recent only), oldest `limit` of them
+
+        Returns:
+            {"alerts", "next_cursor", "latest_cursor", "has_more"} with
+            active alerts (NEW, ACKNOWLEDGED, INVESTIGATING)
+
+        Raises:
+            ValueError: If a cursor is malformed or used with order=priority
+        """
+        buckets = [self._active_alerts[priority] for priority in ALERT_PRIORITIES]
+        since_ms = to_millis(since) if since else None
+        until_ms = to_millis(until) if until else None
+        windowed = since_ms is not None or until_ms is not None
+
+        if order == "priority":
+            if cursor or since_cursor:
+                raise ValueError("Cursors are only supported with order=recent")
+            ids = (alert_id for bucket in buckets for alert_id in reversed(bucket))
+            matching = (self.alerts[alert_id] for alert_id in ids)
+            alerts = list(islice(
+                (alert for alert in matching if not windowed or _in_window(alert["created_at"], since_ms, until_ms)),
+                limit + 1
+            ))
+            has_more = len(alerts) > limit
+            return {"alerts": alerts[:limit], "next_cursor": None, "latest_cursor": None, "has_more": has_more}
+
+        forward = since_cursor is not None
+        position = decode_cursor(since_cursor if forward else cursor) if (cursor or forward) else None
+        position_seq = None
+        if position:
+            anchor = self.alerts.get(position[1])
+            if anchor is not None:
+                position_seq = self._active_alerts.get(_index_key(anchor.get("priority")), {}).get(position[1])
+
+        def after_cursor(alert_id: str, seq: int) -> bool:
+            if position is None:
+                return True
+            if position_seq is not None:
+                return seq > position_seq if forward else seq < position_seq
+            key = (to_millis(self.alerts[alert_id]["created_at"]), alert_id)
+            return key > position if forward else key < position
+
+        # Each bucket is ordered by activation, so a k-way merge yields newest first
+        merged = heapq.merge(*(reversed(bucket.items()) for bucket in buckets), key=lambda item: item[1], reverse=True)
+
+        selected = []
+        for alert_id, seq in merged:
+            if not after_cursor(alert_id, seq):
+                if forward and position_seq is not None:
+                    break  # Everything further is older than the cursor
+                continue
+            alert = self.alerts[alert_id]
+            if windowed and not _in_window(alert["created_at"], since_ms, until_ms):
+                continue
+            selected.append(alert)
+            if not forward and len(selected) > limit:
+                break
+
+        has_more = len(selected) > limit
+        # Polling returns the oldest new alerts first so no alert is skipped between polls
+        alerts = selected[max(0, len(selected) - limit):] if forward else selected[:limit]
+        return {
+            "alerts": alerts,
+            "next_cursor": _cursor_for(alerts[-1], "created_at") if alerts and has_more and not forward else None,
+            "latest_cursor": _cursor_for(alerts[0], "created_at") if alerts else since_cursor,
+            "has_more": has_more
+        }
+
+    async def get_alerts_by_status(self, status: str, limit: int = 50) -> List[Dict]:
+        """Get alerts with a given status, most recent status change first."""
+        ids = self._alert_status.get(status)
+        if not ids:
+            return []
+        return [self.alerts[alert_id] for alert_id in islice(reversed(ids), limit)]
+
+    async def get_alert_history(self, limit: int = 50) -> List[Dict]:
+        """Get closed alerts, most recently closed first."""
+        return [self.alerts[alert_id] for alert_id in islice(reversed(self._alert_history), limit)]
 
     async def update_alert_status(self, alert_id: str, status: str, analyst_id: Optional[str] = None) -> bool:
         """Update alert status."""
-        for alert in self.alerts:
-            if alert.get("id") == alert_id:
-                alert["status"] = status
-                if analyst_id:
-                    alert["assigned_to"] = analyst_id
-                    alert["assigned_at"] = datetime.utcnow().isoformat()
-                logger.debug(f"Updated alert {alert_id} status to {status}")
-                return True
-        return False
+        alert = self.alerts.get(alert_id)
+        if alert is None and self.backend:
+            # Aged out of the cache - bring it back from Firestore
+            alert = await self.backend.get(settings.firestore_collection_alerts, alert_id)
+            if alert is not None:
+                self._cache_alert(alert)
+        if alert is None:
+            return False
 
-    async def get_threat_stats(self) -> Dict:
-        """Get aggregated threat statistics."""
-        total = len(self.threats)
+        previous = _index_key(alert.get("status"))
+        alert["status"] = status
+        if analyst_id:
+            alert["assigned_to"] = analyst_id
+            alert["assigned_at"] = datetime.utcnow().isoformat()
+
+        if previous != status:
+            self._alert_status[previous].pop(alert_id, None)
+            self._alert_status.setdefault(status, OrderedDict())[alert_id] = None
+
+            was_active = previous in ACTIVE_ALERT_STATUSES
+            if was_active and status not in ACTIVE_ALERT_STATUSES:
+                alert["resolved_at"] = datetime.utcnow().isoformat()
+                self._active_alerts[_index_key(alert.get("priority"))].pop(alert_id, None)
+                self._archive_alert(alert_id)
+            elif not was_active and status in ACTIVE_ALERT_STATUSES:
+                # Reopened
+                alert["resolved_at"] = None
+                self._alert_history.pop(alert_id, None)
+                self._activate_alert(alert_id, alert)
 
-        # Count by severity
-        severity_counts = {}
-        for threat in self.threats:
-            severity = threat.get("severity", "UNKNOWN")
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        if self.backend:
+            self.backend.enqueue(settings.firestore_collection_alerts, alert_id, alert)
 
-        # Count by type
-        type_counts = {}
-        for threat in self.threats:
-            threat_type = threat.get("threat_type", "UNKNOWN")
-            type_counts[threat_type] = type_counts.get(threat_type, 0) + 1
+        logger.debug(f"Updated alert {alert_id} status to {status}")
+        return True
+
+    def get_alert_stats(self) -> Dict:
+        """Get alert counts per status and store bounds."""
+        return {
+            "by_status": {status: len(ids) for status, ids in self._alert_status.items()},
+            "active_by_priority": {priority: len(ids) for priority, ids in self._active_alerts.items()},
+            "stored": len(self.alerts),
+            "max_active": self.max_active_alerts,
+            "max_history": self.max_alert_history,
+            "dropped": self.alerts_dropped,
+        }
 
+    async def aggregate_threats(
+        self,
+        group_by: List[str],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        limit: int = 1000
+    ) -> Dict:
+        """
+        Group threat history and summarize it (see ThreatTable.aggregate).
+
+        Runs on the analytics executor so large scans do not block the
+        event loop.
+        """
+        filters = {name: value for name, value in (filters or {}).items() if value}
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor("analytics", 2),
+            lambda: self.threat_table.aggregate(group_by, since=since, until=until, filters=filters, limit=limit)
+        )
+
+    def get_storage_stats(self) -> Dict:
+        """Get cache sizes and write-behind metrics."""
+        return {
+            "backend": "firestore" if self.backend else "local" if self.threat_log else "memory",
+            "threats_cached": len(self.threats),
+            "alerts_cached": len(self.alerts),
+            "write_behind": self.backend.get_stats() if self.backend else None,
+            "threat_log": self.threat_log.get_stats() if self.threat_log else None,
+            "threat_table": self.threat_table.get_stats(),
+            "search_index": self.search_index.get_stats() if self.search_index else None
+        }
+
+    async def get_threat_stats(self) -> Dict:
+        """Get aggregated threat statistics (from counters kept on insert/evict)."""
         return {
-            "total_threats": total,
-            "severity_distribution": severity_counts,
-            "type_distribution": type_counts
+            "total_threats": len(self.threats),
+            "severity_distribution": dict(self._severity_counts),
+            "type_distribution": dict(self._type_counts)
         }
 
 
@@ -2,8 +2,19 @@
 Geolocation Service
 IP address to geographic location mapping
 """
-from typing import Dict, Optional, Tuple
-from app.utils.ip_utils import classify_source_zone, get_country_risk_multiplier
+import asyncio
+import os
+import socket
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.config import settings
+from app.services.threat_intel_service import get_threat_intel_service
+from app.utils.executors import get_executor
+from app.utils.geoip_database import GeoIPDatabase, UNKNOWN_COUNTRY
+from app.utils.ip_utils import classify_country_zone, get_country_risk_multiplier
+from app.utils.prefix_trie import COUNTRY_LABEL_PREFIX, INTERNAL_LABELS, get_prefix_table, parse_ip
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -33,11 +44,115 @@ COUNTRY_COORDS = {
     "PL": {"lat": 51.9194, "lng": 19.1451, "country": "Poland"},
 }
 
+INTERNAL_COUNTRY = "XX"
+
+_pack_ipv4 = partial(socket.inet_pton, socket.AF_INET)
+
+# Zone codes used by GeoBatch.zone_index
+ZONES = ("INTERNAL_ZONE", "EXTERNAL_ZONE", "HOSTILE_ZONE", "TRUSTED_ZONE")
+_ZONE_INDEX = {zone: i for i, zone in enumerate(ZONES)}
+
+
+def _range_lookup(starts: np.ndarray, ends: np.ndarray, slots: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Vectorized lookup in sorted disjoint ranges; -1 where a value is not covered."""
+    if not len(starts) or not len(values):
+        return np.full(len(values), -1, dtype=np.int32)
+    positions = np.searchsorted(starts, values, side="right").astype(np.int64) - 1
+    clipped = np.maximum(positions, 0)
+    covered = (positions >= 0) & (values <= ends[clipped])
+    return np.where(covered, slots[clipped], -1).astype(np.int32)
+
+
+def _label_slot(label: str, country_slot: Dict[str, int]) -> int:
+    """Country slot of a prefix label (-1 for labels that don't decide the country)."""
+    if label in INTERNAL_LABELS:
+        return country_slot[INTERNAL_COUNTRY]
+    if label.startswith(COUNTRY_LABEL_PREFIX):
+        return country_slot[label[len(COUNTRY_LABEL_PREFIX):]]
+    return -1
+
+
+class GeoBatch:
+    """
+    Columnar geo enrichment for a batch of IPs.
+
+    Per-IP columns index into per-country tables, so the threat map can
+    aggregate by country_index and read coordinates from one (n, 2) array
+    instead of a dict per event.
+    """
+
+    __slots__ = (
+        "country_index", "zone_index", "risk_multiplier",
+        "country_codes", "country_names", "coordinates", "threat_intel"
+    )
+
+    def __init__(
+        self,
+        country_index: np.ndarray,
+        zone_index: np.ndarray,
+        risk_multiplier: np.ndarray,
+        country_codes: List[str],
+        country_names: List[str],
+        coordinates: np.ndarray,
+        threat_intel: Dict[int, Dict]
+    ):
+        self.country_index = country_index      # (n,) index into the country tables
+        self.zone_index = zone_index            # (n,) index into ZONES
+        self.risk_multiplier = risk_multiplier  # (n,) float64
+        self.country_codes = country_codes      # (m,) country table
+        self.country_names = country_names      # (m,)
+        self.coordinates = coordinates          # (m, 2) [lat, lng]
+        self.threat_intel = threat_intel        # row -> threat-intel match (listed rows only)
+
+    def __len__(self) -> int:
+        return len(self.country_index)
+
+    def country_counts(self) -> np.ndarray:
+        """IPs per country table entry (aligned with country_codes / coordinates)."""
+        return np.bincount(self.country_index, minlength=len(self.country_codes))
+
+    def row(self, i: int) -> Dict:
+        """Enrichment for one IP, in the lookup_ip() format."""
+        country = int(self.country_index[i])
+        lat, lng = self.coordinates[country]
+        return {
+            "country": self.country_names[country],
+            "country_code": self.country_codes[country],
+            "coordinates": [float(lat), float(lng)],
+            "zone": ZONES[self.zone_index[i]],
+            "risk_multiplier": float(self.risk_multiplier[i]),
+            "threat_intel": self.threat_intel.get(i)
+        }
+
 
 class GeoService:
-    """Service for IP geolocation and geographic threat analysis."""
+    """
+    Service for IP geolocation and geographic threat analysis.
+
+    Full lookup_ip() results (geo plus threat-intel matches) are kept in a
+    bounded LRU keyed by IP, since the same attacker addresses recur
+    constantly. The cache is cleared whenever the GeoIP database is
+    reloaded or the threat-intel feeds are swapped. A background watcher
+    checks the database file every GEOIP_CHECK_INTERVAL seconds and loads
+    changes on the "geoip" executor; lookups never touch the filesystem.
+    """
 
     def __init__(self):
+        self.prefixes = get_prefix_table()
+        self.threat_intel = get_threat_intel_service()
+        self.check_interval = settings.geoip_check_interval
+        self._running = False
+        self._install(self._load_database())
+
+        self.cache_size = settings.geo_cache_size
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self.cache_generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+        self.threat_intel.add_reload_listener(lambda: self.invalidate_cache("threat-intel feeds reloaded"))
+
         logger.info("GeoService initialized")
 
     def lookup_ip(self, ip: str) -> Dict:
@@ -48,73 +163,289 @@ class GeoService:
             ip: IP address to lookup
 
         Returns:
-            Dictionary with country, coordinates, zone, and risk multiplier
+            Dictionary with country, coordinates, zone, risk multiplier and
+            threat-intel match (shared with the cache - do not mutate)
         """
-        # For production, integrate with a real IP geolocation service
-        # like MaxMind GeoIP2, IPStack, or IP2Location
-        # For now, we'll use a simplified approach
+        cached = self._cache.get(ip)
+        if cached is not None:
+            self._cache.move_to_end(ip)
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        result = self._resolve(ip)
+
+        if self.cache_size > 0:
+            self._cache[ip] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.cache_evictions += 1
+
+        return result
+
+    def invalidate_cache(self, reason: str = "manual"):
+        """
+        Drop all cached enrichment results.
+
+        Call this whenever a data source behind lookup_ip() changes.
+        """
+        self._cache.clear()
+        self.cache_generation += 1
+        logger.info(f"🧹 Geo enrichment cache invalidated ({reason}), generation {self.cache_generation}")
+
+    def reload(self) -> bool:
+        """
+        Reload the GeoIP database and invalidate the enrichment cache (blocking).
+
+        Returns:
+            True if the new database was installed
+        """
+        try:
+            loaded = self._load_database()
+        except Exception as e:
+            logger.error(f"❌ Failed to reload GeoIP database from {self.database.path}: {e}")
+            return False
+        self._install(loaded)
+        self.invalidate_cache("GeoIP database reloaded")
+        return True
+
+    def _load_changed_database(self) -> Optional[Tuple]:
+        """_load_database() if the database file changed since the last load, else None."""
+        try:
+            mtime = os.path.getmtime(self.database.path)
+        except OSError:
+            return None
+        if mtime == self._database_mtime:
+            return None
+        return self._load_database()
+
+    async def watch(self):
+        """Background task: reload the GeoIP database off the event loop whenever its file changes."""
+        if self.check_interval <= 0:
+            return
+        self._running = True
+        loop = asyncio.get_running_loop()
+        while self._running:
+            await asyncio.sleep(self.check_interval)
+            try:
+                loaded = await loop.run_in_executor(get_executor("geoip", 1), self._load_changed_database)
+            except Exception as e:
+                logger.error(f"❌ Failed to reload GeoIP database from {self.database.path}: {e}")
+                continue
+            if loaded is not None:
+                # Swapped on the event loop, so a lookup never sees a database with another one's tables
+                self._install(loaded)
+                self.invalidate_cache("GeoIP database reloaded")
+
+    def stop(self):
+        """Stop the watcher loop."""
+        self._running = False
+
+    def _load_database(self) -> Tuple[GeoIPDatabase, Dict[str, Any], float]:
+        """
+        Open the GeoIP database and build its per-country tables.
+
+        Only reads service state, so it can run on an executor; see _install().
+
+        Returns:
+            (database, country tables, database file mtime)
+        """
+        database = GeoIPDatabase(
+            path=settings.geoip_database_path or None,
+            cache_dir=settings.geoip_cache_dir or None
+        )
+        mtime = os.path.getmtime(database.path)
+        return database, self._build_country_table(database), mtime
+
+    def _install(self, loaded: Tuple[GeoIPDatabase, Dict[str, Any], float]):
+        """Make a _load_database() result current."""
+        database, tables, mtime = loaded
+        self.database = database
+        for name, value in tables.items():
+            setattr(self, name, value)
+        self._database_mtime = mtime
+
+    def _resolve(self, ip: str) -> Dict:
+        """Uncached lookup_ip()."""
+        parsed = parse_ip(ip)
+        label = self.prefixes.lookup_int(*parsed) if parsed is not None else None
 
         # Check if private IP
-        if ip.startswith(("10.", "172.16.", "192.168.", "127.")):
+        if label in INTERNAL_LABELS:
             return {
                 "country": "Internal",
                 "country_code": "XX",
                 "coordinates": [0, 0],
                 "zone": "INTERNAL_ZONE",
-                "risk_multiplier": 1.0
+                "risk_multiplier": 1.0,
+                "threat_intel": None
             }
 
-        # Simple heuristic based on IP range (for demo purposes)
-        # In production, use a proper GeoIP database
-        country_code = self._guess_country_from_ip(ip)
-        country_info = COUNTRY_COORDS.get(country_code, COUNTRY_COORDS["US"])
+        # IPv6 geolocation comes from the prefix trie, IPv4 from the range database
+        if label is not None and label.startswith(COUNTRY_LABEL_PREFIX):
+            country_code = label[len(COUNTRY_LABEL_PREFIX):]
+        elif parsed is not None and parsed[0] == 4:
+            country_code = self.database.lookup_int(parsed[1]) or UNKNOWN_COUNTRY
+        else:
+            country_code = UNKNOWN_COUNTRY
+        country_info = COUNTRY_COORDS.get(country_code)
 
-        zone = classify_source_zone(ip, country_code)
+        threat_intel = self.threat_intel.lookup_int(*parsed) if parsed is not None else None
+        zone = classify_country_zone(country_code, threat_intel is not None)
         risk_multiplier = get_country_risk_multiplier(country_code)
 
         return {
-            "country": country_info["country"],
+            "country": country_info["country"] if country_info else "Unknown",
             "country_code": country_code,
-            "coordinates": [country_info["lat"], country_info["lng"]],
+            "coordinates": [country_info["lat"], country_info["lng"]] if country_info else [0, 0],
             "zone": zone,
-            "risk_multiplier": risk_multiplier
+            "risk_multiplier": risk_multiplier,
+            "threat_intel": threat_intel
         }
 
-    def _guess_country_from_ip(self, ip: str) -> str:
+    def lookup_many(self, ips: Sequence[str]) -> GeoBatch:
         """
-        Simple heuristic to guess country from IP (for demo purposes).
-        In production, use MaxMind GeoIP2 or similar service.
+        Lookup geographic information for a batch of IP addresses.
+
+        Distinct IPv4 addresses are packed into one uint32 array, then
+        classified against the flattened prefix trie and the range
+        database with one searchsorted each; threat-intel membership is
+        checked in bulk and match details fetched only for listed sources.
+        IPv6 addresses fall back to per-address trie lookups.
+
+        Args:
+            ips: IP addresses to lookup
+
+        Returns:
+            GeoBatch with per-IP country/zone/risk columns
         """
-        octets = ip.split(".")
-        if len(octets) != 4:
-            return "US"
+        unique, inverse = np.unique(np.asarray(ips, dtype=str), return_inverse=True)
+        count = len(unique)
+
+        addresses = np.zeros(count, dtype=np.uint32)
+        is_ipv4 = np.zeros(count, dtype=bool)
+        country = np.full(count, self._country_slot[UNKNOWN_COUNTRY], dtype=np.int32)
+        matches: Dict[int, Dict] = {}
 
+        # Parse dotted IPv4 in one pass; a malformed entry drops to per-address parsing
+        dotted = np.flatnonzero(np.char.find(unique, ":") < 0)
         try:
-            first_octet = int(octets[0])
-
-            # Very simplified mapping (for demonstration only)
-            if 1 <= first_octet <= 50:
-                return "US"
-            elif 51 <= first_octet <= 80:
-                return "CN"
-            elif 81 <= first_octet <= 100:
-                return "RU"
-            elif 101 <= first_octet <= 120:
-                return "DE"
-            elif 121 <= first_octet <= 140:
-                return "GB"
-            elif 141 <= first_octet <= 160:
-                return "IN"
-            elif 161 <= first_octet <= 180:
-                return "BR"
-            elif 181 <= first_octet <= 200:
-                return "KP"
-            elif 201 <= first_octet <= 220:
-                return "IR"
-            else:
-                return "US"
-        except ValueError:
-            return "US"
+            packed = b"".join(map(_pack_ipv4, unique[dotted].tolist()))
+            addresses[dotted] = np.frombuffer(packed, dtype=">u4")
+            is_ipv4[dotted] = True
+            remaining = np.flatnonzero(~is_ipv4)
+        except (OSError, TypeError):
+            remaining = np.arange(count)
+
+        for i in remaining.tolist():
+            parsed = parse_ip(unique[i])
+            if parsed is None:
+                continue
+            version, address = parsed
+            if version == 4:
+                addresses[i] = address
+                is_ipv4[i] = True
+                continue
+            label = self.prefixes.v6.lookup(address)
+            if label in INTERNAL_LABELS:
+                country[i] = self._country_slot[INTERNAL_COUNTRY]
+                continue
+            if label is not None and label.startswith(COUNTRY_LABEL_PREFIX):
+                country[i] = self._country_slot[label[len(COUNTRY_LABEL_PREFIX):]]
+            match = self.threat_intel.lookup_int(version, address)
+            if match is not None:
+                matches[i] = match
+
+        ipv4 = np.flatnonzero(is_ipv4)
+        if len(ipv4):
+            values = addresses[ipv4]
+
+            # Prefix labels (internal space, CC: overrides)
+            slot = _range_lookup(self._v4_label_starts, self._v4_label_ends, self._v4_label_slots, values)
+            labelled = slot >= 0
+            country[ipv4[labelled]] = slot[labelled]
+
+            # Range database for the rest
+            ipv4, values = ipv4[~labelled], values[~labelled]
+            database = self.database
+            slot = _range_lookup(database.starts, database.ends, self._database_slots[database.countries], values)
+            located = slot >= 0
+            country[ipv4[located]] = slot[located]
+
+            # Threat intel for public IPv4 (vectorized membership, details for hits only)
+            public = np.flatnonzero(is_ipv4 & (country != self._country_slot[INTERNAL_COUNTRY]))
+            for i in public[self.threat_intel.contains_v4_many(addresses[public])].tolist():
+                match = self.threat_intel.lookup_int(4, int(addresses[i]))
+                if match is not None:
+                    matches[i] = match
+
+        zone = self._country_zone[country]
+        if matches:
+            zone[list(matches)] = _ZONE_INDEX["HOSTILE_ZONE"]
+
+        return GeoBatch(
+            country_index=country[inverse],
+            zone_index=zone[inverse],
+            risk_multiplier=self._country_risk[country][inverse],
+            country_codes=self._country_codes,
+            country_names=self._country_names,
+            coordinates=self._country_coordinates,
+            threat_intel={row: matches[i] for row, i in enumerate(inverse.tolist()) if i in matches} if matches else {}
+        )
+
+    def _build_country_table(self, database: GeoIPDatabase) -> Dict[str, Any]:
+        """Per-country name/coordinates/zone/risk tables shared by every GeoBatch (see _install)."""
+        trie_codes = sorted(
+            label[len(COUNTRY_LABEL_PREFIX):] for label in self.prefixes.labels()
+            if label.startswith(COUNTRY_LABEL_PREFIX)
+        )
+        codes = list(dict.fromkeys([INTERNAL_COUNTRY, UNKNOWN_COUNTRY, *COUNTRY_COORDS, *database.codes, *trie_codes]))
+
+        names, coordinates, zones, risks = [], [], [], []
+        for code in codes:
+            info = COUNTRY_COORDS.get(code)
+            internal = code == INTERNAL_COUNTRY
+            names.append("Internal" if internal else info["country"] if info else "Unknown")
+            coordinates.append([info["lat"], info["lng"]] if info else [0.0, 0.0])
+            zones.append(_ZONE_INDEX["INTERNAL_ZONE" if internal else classify_country_zone(code)])
+            risks.append(1.0 if internal else get_country_risk_multiplier(code))
+        country_slot = {code: i for i, code in enumerate(codes)}
+
+        # IPv4 prefix labels as disjoint ranges -> country slot (-1 = defer to the range database)
+        label_ranges = [
+            (first, last, _label_slot(label, country_slot)) for first, last, label in self.prefixes.v4.flatten()
+        ]
+        label_ranges = [r for r in label_ranges if r[2] >= 0]
+
+        return {
+            "_country_codes": codes,
+            "_country_slot": country_slot,
+            "_country_names": names,
+            "_country_coordinates": np.array(coordinates, dtype=np.float64),
+            "_country_zone": np.array(zones, dtype=np.int8),
+            "_country_risk": np.array(risks, dtype=np.float64),
+            "_database_slots": np.array([country_slot[code] for code in database.codes], dtype=np.int32),
+            "_v4_label_starts": np.array([r[0] for r in label_ranges], dtype=np.uint32),
+            "_v4_label_ends": np.array([r[1] for r in label_ranges], dtype=np.uint32),
+            "_v4_label_slots": np.array([r[2] for r in label_ranges], dtype=np.int32),
+        }
+
+    def get_stats(self) -> Dict:
+        """Get GeoIP database and prefix trie statistics (size, memory, lookups)."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            **self.database.get_stats(),
+            "prefix_trie": self.prefixes.get_stats(),
+            "cache": {
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+                "generation": self.cache_generation,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "evictions": self.cache_evictions,
+                "hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0
+            }
+        }
 
     def get_country_coords(self, country_code: str) -> Tuple[float, float]:
         """Get coordinates for a country code."""
@@ -123,6 +123,36 @@ class MetricsService:
             "threats_detected": self.threats_detected
         }
 
+    def get_state(self) -> Dict:
+        """Copy of counters, risk index and timeline for snapshots."""
+        return {
+            "events_processed": self.events_processed,
+            "threats_detected": self.threats_detected,
+            "alerts_generated": self.alerts_generated,
+            "events_blocked": self.events_blocked,
+            "detection_times": list(self.detection_times),
+            "risk_timeline": [(point.time, point.risk) for point in self.risk_timeline],
+            "current_risk_index": self.current_risk_index,
+            "risk_trend": self.risk_trend,
+            "risk_history": list(self.risk_history),
+        }
+
+    def load_state(self, state: Dict):
+        """Restore a get_state() copy (all or nothing: a bad state changes nothing)."""
+        counters = (
+            state["events_processed"], state["threats_detected"], state["alerts_generated"], state["events_blocked"]
+        )
+        detection_times = state["detection_times"][-self.max_detection_times:]
+        risk_timeline = [
+            TimelineData(time=time_str, risk=risk) for time_str, risk in state["risk_timeline"][-self.max_timeline_points:]
+        ]
+        risk = (state["current_risk_index"], state["risk_trend"], state["risk_history"][-self.max_risk_history:])
+
+        self.events_processed, self.threats_detected, self.alerts_generated, self.events_blocked = counters
+        self.detection_times = detection_times
+        self.risk_timeline = risk_timeline
+        self.current_risk_index, self.risk_trend, self.risk_history = risk
+
     async def start_aggregation(self):
         """Start background metrics aggregation and publishing task."""
         while True:
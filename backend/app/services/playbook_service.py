@@ -155,6 +155,14 @@ class PlaybookService:
         """Get recent playbook executions."""
         return self.executions[:limit]
 
+    def get_state(self) -> Dict:
+        """Copy of the execution history for snapshots."""
+        return {"executions": list(self.executions)}
+
+    def load_state(self, state: Dict):
+        """Restore a get_state() copy."""
+        self.executions = list(state["executions"])
+
 
 # Global instance
 _playbook_service = None
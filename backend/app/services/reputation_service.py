@@ -0,0 +1,192 @@
+"""
+Source Reputation Service
+Per-source_ip threat history as exponentially decayed scores in fixed-capacity arrays
+"""
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from app.config import settings
+from app.models.threat import SeverityLevel
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Reputation added per analyzed threat, by final severity
+SEVERITY_WEIGHTS = {
+    SeverityLevel.CRITICAL: 10.0,
+    SeverityLevel.HIGH: 5.0,
+    SeverityLevel.MEDIUM: 2.0,
+    SeverityLevel.LOW: 1.0,
+    SeverityLevel.INFO: 0.0,
+}
+
+# Maximum risk score points contributed by reputation
+MAX_REPUTATION_POINTS = 10
+
+# Occupied slots sampled per eviction (the one with the lowest decayed score goes)
+EVICTION_SAMPLES = 16
+
+
+class ReputationService:
+    """
+    Bounded table of per-source reputation scores.
+
+    Each source owns a slot in parallel NumPy arrays (score, last update,
+    event counts); a dict maps source_ip -> slot. A score halves every
+    REPUTATION_HALF_LIFE_SECONDS and is only decayed when its slot is
+    touched, so recording a threat is O(1). When the table is full the
+    new source replaces the weakest of a small random sample of slots
+    after decay - old, quiet sources go first without scanning the table.
+    """
+
+    def __init__(self, capacity: int = None, half_life: float = None, saturation: float = None):
+        self.capacity = max(1, capacity or settings.reputation_capacity)
+        self.half_life = half_life or settings.reputation_half_life_seconds
+        self.saturation = saturation or settings.reputation_saturation
+        self._decay_rate = math.log(2) / self.half_life
+
+        self._rng = np.random.default_rng()
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._ips: List[Optional[str]] = [None] * self.capacity
+        self._scores = np.zeros(self.capacity, dtype=np.float64)     # score as of _updated
+        self._updated = np.zeros(self.capacity, dtype=np.float64)    # epoch seconds
+        self._first_seen = np.zeros(self.capacity, dtype=np.float64)
+        self._events = np.zeros(self.capacity, dtype=np.uint32)
+        self._critical = np.zeros(self.capacity, dtype=np.uint32)
+
+        self.updates = 0
+        self.evictions = 0
+
+    def _decayed(self, slot: int, now: float) -> float:
+        return float(self._scores[slot]) * math.exp(-self._decay_rate * (now - float(self._updated[slot])))
+
+    def record(self, source_ip: str, severity: SeverityLevel, now: float = None):
+        """
+        Add a threat to a source's reputation.
+
+        Args:
+            source_ip: Source IP of the threat
+            severity: Final (analyzed) severity
+            now: Event time in epoch seconds (default: current time)
+        """
+        now = time.time() if now is None else now
+        weight = SEVERITY_WEIGHTS.get(severity, 1.0)
+
+        with self._lock:
+            slot = self._slots.get(source_ip)
+            if slot is None:
+                slot = self._allocate(source_ip, now)
+                score = 0.0
+            else:
+                score = self._decayed(slot, now)
+
+            self._scores[slot] = score + weight
+            self._updated[slot] = now
+            self._events[slot] += 1
+            if severity == SeverityLevel.CRITICAL:
+                self._critical[slot] += 1
+            self.updates += 1
+
+    def _allocate(self, source_ip: str, now: float) -> int:
+        """Claim a slot for a new source, evicting a low-reputation one if full."""
+        if len(self._slots) < self.capacity:
+            slot = len(self._slots)
+        else:
+            candidates = self._rng.integers(0, self.capacity, EVICTION_SAMPLES)
+            decayed = self._scores[candidates] * np.exp(-self._decay_rate * (now - self._updated[candidates]))
+            slot = int(candidates[np.argmin(decayed)])
+            del self._slots[self._ips[slot]]
+            self.evictions += 1
+
+        self._slots[source_ip] = slot
+        self._ips[slot] = source_ip
+        self._scores[slot] = 0.0
+        self._updated[slot] = now
+        self._first_seen[slot] = now
+        self._events[slot] = 0
+        self._critical[slot] = 0
+        return slot
+
+    def get_score(self, source_ip: str, now: float = None) -> float:
+        """Decayed reputation score of a source (0 if unknown)."""
+        slot = self._slots.get(source_ip)
+        if slot is None:
+            return 0.0
+        return self._decayed(slot, time.time() if now is None else now)
+
+    def risk_points(self, source_ip: str) -> int:
+        """
+        Reputation contribution to the risk score.
+
+        Returns:
+            0-MAX_REPUTATION_POINTS, saturating as the decayed score grows
+            past REPUTATION_SATURATION
+        """
+        score = self.get_score(source_ip)
+        if score <= 0.0:
+            return 0
+        return int(MAX_REPUTATION_POINTS * (1.0 - math.exp(-score / self.saturation)))
+
+    def top_sources(self, limit: int = 10) -> List[Dict]:
+        """
+        Worst sources by decayed score.
+
+        Args:
+            limit: Number of sources to return
+
+        Returns:
+            Sources ordered by descending score
+        """
+        now = time.time()
+        with self._lock:
+            used = len(self._slots)
+            if used == 0 or limit <= 0:
+                return []
+            scores = self._scores[:used] * np.exp(-self._decay_rate * (now - self._updated[:used]))
+
+            # Partial selection, then sort only the top slice
+            if limit < used:
+                top = np.argpartition(scores, used - limit)[used - limit:]
+            else:
+                top = np.arange(used)
+            top = top[np.argsort(scores[top])[::-1]]
+
+            return [
+                {
+                    "source_ip": self._ips[slot],
+                    "score": round(float(scores[slot]), 2),
+                    "risk_points": int(MAX_REPUTATION_POINTS * (1.0 - math.exp(-scores[slot] / self.saturation))),
+                    "events": int(self._events[slot]),
+                    "critical_events": int(self._critical[slot]),
+                    "first_seen": float(self._first_seen[slot]),
+                    "last_seen": float(self._updated[slot]),
+                }
+                for slot in top.tolist()
+            ]
+
+    def get_stats(self) -> Dict:
+        """Get table occupancy and memory."""
+        arrays = (self._scores, self._updated, self._first_seen, self._events, self._critical)
+        return {
+            "sources": len(self._slots),
+            "capacity": self.capacity,
+            "half_life_seconds": self.half_life,
+            "updates": self.updates,
+            "evictions": self.evictions,
+            "array_bytes": sum(int(a.nbytes) for a in arrays),
+        }
+
+
+# Global instance
+_reputation_service = None
+
+
+def get_reputation_service() -> ReputationService:
+    """Get the global ReputationService instance."""
+    global _reputation_service
+    if _reputation_service is None:
+        _reputation_service = ReputationService()
+    return _reputation_service
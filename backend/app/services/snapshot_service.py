@@ -0,0 +1,208 @@
+"""
+Snapshot Service
+Periodic binary snapshots of in-memory service state for warm restarts
+"""
+import asyncio
+import gc
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.utils.executors import get_executor
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bumped when a component's get_state() layout changes incompatibly
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotService:
+    """
+    Saves and restores the state of registered components.
+
+    A component is any object with get_state() -> dict and
+    load_state(dict). Saving collects every component's state on the
+    event loop (cheap container copies), then pickles it on the
+    "snapshot" executor and writes it to a temp file that is fsynced and
+    renamed over SNAPSHOT_PATH, so a crash mid-write leaves the previous
+    snapshot intact. Snapshots are pickles: only point SNAPSHOT_PATH at
+    a directory this service alone writes to.
+    """
+
+    def __init__(self, path: str = None, interval: float = None):
+        self.path = Path(path or settings.snapshot_path)
+        self.interval = settings.snapshot_interval if interval is None else interval
+        self.max_age = settings.snapshot_max_age_hours * 3600
+
+        self._components: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+        self._running = False
+
+        # Metrics
+        self.snapshots = 0
+        self.failures = 0
+        self.last_snapshot_at: Optional[float] = None
+        self.last_bytes = 0
+        self.last_collect_ms = 0.0
+        self.last_write_ms = 0.0
+        self.restored_from: Optional[float] = None  # created_at of the restored snapshot
+        self.restore_ms = 0.0
+
+    def register(self, name: str, component: Any):
+        """
+        Include a component in snapshots.
+
+        Args:
+            name: Key of the component's state in the snapshot
+            component: Object with get_state() and load_state(state)
+        """
+        self._components[name] = component
+
+    async def save(self) -> bool:
+        """
+        Write a snapshot of every registered component.
+
+        Returns:
+            True if the snapshot was written
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "created_at": time.time(),
+                "components": {name: component.get_state() for name, component in self._components.items()},
+            }
+            self.last_collect_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            try:
+                size = await asyncio.get_running_loop().run_in_executor(
+                    get_executor("snapshot", 1), self._write, snapshot
+                )
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ Failed to write snapshot {self.path}: {e}")
+                return False
+
+            self.last_write_ms = (time.perf_counter() - started) * 1000
+            self.last_bytes = size
+            self.last_snapshot_at = snapshot["created_at"]
+            self.snapshots += 1
+            logger.debug(
+                f"Snapshot written: {size / 1024:.0f} KiB "
+                f"(collect {self.last_collect_ms:.1f} ms, write {self.last_write_ms:.1f} ms)"
+            )
+            return True
+
+    def _write(self, snapshot: Dict) -> int:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(temp_path, self.path)
+        return size
+
+    def _read(self) -> Dict:
+        with open(self.path, "rb") as f:
+            data = f.read()
+        # Unpickling allocates millions of containers; cyclic GC passes over them
+        # would more than double the load time. Only runs at startup.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return pickle.loads(data)
+        finally:
+            if enabled:
+                gc.enable()
+
+    async def restore(self) -> bool:
+        """
+        Load the latest snapshot into the registered components.
+
+        Components missing from the snapshot keep their fresh state.
+        load_state() is all or nothing, so a component that fails to load
+        is logged and starts fresh rather than half restored.
+
+        Returns:
+            True if a snapshot was restored
+        """
+        if not self.path.exists():
+            logger.info(f"No snapshot at {self.path}, starting fresh")
+            return False
+
+        started = time.perf_counter()
+        try:
+            snapshot = await asyncio.get_running_loop().run_in_executor(get_executor("snapshot", 1), self._read)
+        except Exception as e:
+            logger.error(f"❌ Failed to read snapshot {self.path}: {e}")
+            return False
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"⚠️  Ignoring snapshot with version {snapshot.get('version')} (expected {SNAPSHOT_VERSION})")
+            return False
+        age = time.time() - snapshot["created_at"]
+        if self.max_age and age > self.max_age:
+            logger.warning(f"⚠️  Ignoring snapshot from {age / 3600:.1f} hours ago")
+            return False
+
+        for name, component in self._components.items():
+            state = snapshot["components"].get(name)
+            if state is None:
+                continue
+            try:
+                component.load_state(state)
+            except Exception as e:
+                logger.error(f"❌ Failed to restore {name} from snapshot: {e}")
+
+        self.restore_ms = (time.perf_counter() - started) * 1000
+        self.restored_from = snapshot["created_at"]
+        logger.info(f"✅ Restored snapshot from {age:.0f}s ago in {self.restore_ms:.0f} ms")
+        return True
+
+    async def run(self):
+        """Write a snapshot every SNAPSHOT_INTERVAL seconds until stopped."""
+        if self.interval <= 0:
+            return
+        self._running = True
+        while self._running:
+            await asyncio.sleep(self.interval)
+            if self._running:
+                await self.save()
+
+    def stop(self):
+        """Stop the periodic snapshot loop."""
+        self._running = False
+
+    def get_stats(self) -> Dict:
+        """Get snapshot timing and size metrics."""
+        return {
+            "path": str(self.path),
+            "interval_seconds": self.interval,
+            "components": list(self._components),
+            "snapshots": self.snapshots,
+            "failures": self.failures,
+            "last_snapshot_at": self.last_snapshot_at,
+            "last_bytes": self.last_bytes,
+            "last_collect_ms": round(self.last_collect_ms, 2),
+            "last_write_ms": round(self.last_write_ms, 2),
+            "restored_from": self.restored_from,
+            "restore_ms": round(self.restore_ms, 2),
+        }
+
+
+# Global instance
+_snapshot_service = None
+
+
+def get_snapshot_service() -> SnapshotService:
+    """Get the global SnapshotService instance."""
+    global _snapshot_service
+    if _snapshot_service is None:
+        _snapshot_service = SnapshotService()
+    return _snapshot_service
@@ -0,0 +1,412 @@
+"""
+Threat Intelligence Service
+Local IP/CIDR blocklist feeds compiled into compact, atomically swapped lookup structures
+"""
+import asyncio
+import bisect
+import os
+import socket
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.utils.bloom_filter import BloomFilter, fold_key
+from app.utils.executors import get_executor
+from app.utils.logger import get_logger
+from app.utils.prefix_trie import PrefixTrie, parse_ip, parse_prefix
+
+logger = get_logger(__name__)
+
+DEFAULT_FEED_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "threat_intel")
+
+FEED_EXTENSIONS = (".txt", ".list", ".netset", ".ipset")
+
+_pack_ipv4 = partial(socket.inet_pton, socket.AF_INET)
+
+
+class CompiledFeed:
+    """
+    One feed file in compact form.
+
+    - v4_exact: sorted unique uint32 addresses
+    - v6_exact: sorted unique 16-byte big-endian addresses (V16 sorts numerically
+      and, unlike S16, keeps trailing NUL bytes)
+    - v4_starts / v4_ends: CIDRs as disjoint uint32 ranges (flattened prefix trie)
+    - v6_ranges: prefix trie for IPv6 CIDRs
+    """
+
+    def __init__(self, name: str, path: str, category: str, confidence: float):
+        self.name = name
+        self.path = path
+        self.category = category
+        self.confidence = confidence
+        self.v4_exact = np.empty(0, dtype=np.uint32)
+        self.v6_exact = np.empty(0, dtype="V16")
+        self.v4_starts = np.empty(0, dtype=np.uint32)
+        self.v4_ends = np.empty(0, dtype=np.uint32)
+        self.v6_ranges = PrefixTrie(128)
+        self.v4_prefixes = 0
+        self.invalid_lines = 0
+        self.build_ms = 0.0
+
+    def finalize(self):
+        self._v4_exact = memoryview(self.v4_exact)
+        self._v4_starts = memoryview(self.v4_starts)
+        self._v4_ends = memoryview(self.v4_ends)
+
+    def contains_v4(self, address: int, check_exact: bool = True) -> bool:
+        if check_exact:
+            exact = self._v4_exact
+            i = bisect.bisect_left(exact, address)
+            if i < len(exact) and exact[i] == address:
+                return True
+        i = bisect.bisect_right(self._v4_starts, address) - 1
+        return i >= 0 and address <= self._v4_ends[i]
+
+    def contains_v6(self, address: int, check_exact: bool = True) -> bool:
+        if check_exact and len(self.v6_exact):
+            key = np.void(address.to_bytes(16, "big"))
+            i = int(np.searchsorted(self.v6_exact, key))
+            if i < len(self.v6_exact) and self.v6_exact[i] == key:
+                return True
+        return self.v6_ranges.lookup(address) is not None
+
+    def contains_v4_many(self, addresses: np.ndarray) -> np.ndarray:
+        """Vectorized IPv4 membership (exact or range)."""
+        listed = np.zeros(len(addresses), dtype=bool)
+        if len(self.v4_exact):
+            i = np.minimum(np.searchsorted(self.v4_exact, addresses), len(self.v4_exact) - 1)
+            listed |= self.v4_exact[i] == addresses
+        if len(self.v4_starts):
+            i = np.searchsorted(self.v4_starts, addresses, side="right").astype(np.int64) - 1
+            clipped = np.maximum(i, 0)
+            listed |= (i >= 0) & (addresses <= self.v4_ends[clipped])
+        return listed
+
+    @property
+    def nbytes(self) -> int:
+        return int(
+            self.v4_exact.nbytes + self.v6_exact.nbytes + self.v4_starts.nbytes + self.v4_ends.nbytes
+            + (self.v6_ranges.nbytes if len(self.v6_ranges) else 0)
+        )
+
+    def get_stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "category": self.category,
+            "confidence": self.confidence,
+            "ipv4_addresses": len(self.v4_exact),
+            "ipv6_addresses": len(self.v6_exact),
+            "ipv4_prefixes": self.v4_prefixes,
+            "ipv4_ranges": len(self.v4_starts),
+            "ipv6_prefixes": len(self.v6_ranges),
+            "invalid_lines": self.invalid_lines,
+            "memory_bytes": self.nbytes,
+            "build_ms": round(self.build_ms, 1),
+        }
+
+
+def compile_feed(path: str) -> CompiledFeed:
+    """
+    Compile a feed file.
+
+    One IP or CIDR per line; '#' and ';' start comments. Optional header
+    directives set metadata: "# category: botnet", "# confidence: 0.8".
+    """
+    started = time.perf_counter()
+    name = os.path.splitext(os.path.basename(path))[0]
+    category, confidence = "blocklist", 1.0
+
+    v4_exact: List[str] = []
+    v6_exact: List[bytes] = []
+    v4_ranges = PrefixTrie(32)
+    v6_ranges = PrefixTrie(128)
+    invalid = 0
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line[:1] in ("#", ";"):
+                key, _, value = line[1:].partition(":")
+                key = key.strip().lower()
+                if key == "category" and value.strip():
+                    category = value.strip()
+                elif key == "confidence":
+                    try:
+                        confidence = min(1.0, max(0.0, float(value)))
+                    except ValueError:
+                        pass
+                continue
+
+            entry = line.split("#", 1)[0].split(";", 1)[0].strip()
+            if not entry:
+                continue
+            entry = entry.split()[0]
+
+            if "/" in entry:
+                try:
+                    version, network, length = parse_prefix(entry)
+                except ValueError:
+                    invalid += 1
+                    continue
+                (v4_ranges if version == 4 else v6_ranges).insert(network, length, True)
+            elif ":" in entry:
+                parsed = parse_ip(entry)
+                if parsed is None:
+                    invalid += 1
+                elif parsed[0] == 4:
+                    v4_exact.append(socket.inet_ntoa(parsed[1].to_bytes(4, "big")))
+                else:
+                    v6_exact.append(parsed[1].to_bytes(16, "big"))
+            else:
+                v4_exact.append(entry)
+
+    feed = CompiledFeed(name, path, category, confidence)
+    feed.v4_exact, bad = _pack_ipv4_list(v4_exact)
+    feed.invalid_lines = invalid + bad
+    feed.v6_exact = np.unique(np.array(v6_exact, dtype="V16"))
+
+    ranges = v4_ranges.flatten()
+    feed.v4_prefixes = len(v4_ranges)
+    feed.v4_starts = np.array([r[0] for r in ranges], dtype=np.uint32)
+    feed.v4_ends = np.array([r[1] for r in ranges], dtype=np.uint32)
+    feed.v6_ranges = v6_ranges
+
+    feed.build_ms = (time.perf_counter() - started) * 1000
+    feed.finalize()
+    return feed
+
+
+def _pack_ipv4_list(addresses: List[str]) -> Tuple[np.ndarray, int]:
+    """Sorted unique uint32 array from dotted IPv4 strings, and the count of invalid ones."""
+    try:
+        packed = b"".join(map(_pack_ipv4, addresses))
+        return np.unique(np.frombuffer(packed, dtype=">u4").astype(np.uint32)), 0
+    except OSError:
+        pass
+
+    # A malformed line somewhere - pack one by one
+    values, invalid = [], 0
+    for address in addresses:
+        try:
+            values.append(_pack_ipv4(address))
+        except OSError:
+            invalid += 1
+    return np.unique(np.frombuffer(b"".join(values), dtype=">u4").astype(np.uint32)), invalid
+
+
+def _fold_v6(addresses: np.ndarray) -> np.ndarray:
+    """fold_key() of each full 128-bit address in a V16 array, as uint64."""
+    halves = addresses.view(">u8").reshape(-1, 2)
+    return (halves[:, 0] ^ halves[:, 1]).astype(np.uint64)
+
+
+class ThreatIntelIndex:
+    """Immutable snapshot of all compiled feeds (swapped as a whole on reload)."""
+
+    def __init__(self, feeds: List[CompiledFeed], bloom: Optional[BloomFilter], signature: Tuple):
+        self.feeds = feeds
+        self.bloom = bloom
+        self.signature = signature
+        self.has_v4_ranges = any(len(feed.v4_starts) for feed in feeds)
+        self.has_v6_ranges = any(len(feed.v6_ranges) for feed in feeds)
+        self.loaded_at = time.time()
+
+    def lookup(self, version: int, address: int) -> List[CompiledFeed]:
+        """Feeds listing a parsed address."""
+        feeds = self.feeds
+        if not feeds:
+            return []
+
+        # The Bloom filter covers exact entries only; ranges are always checked
+        check_exact = self.bloom is None or fold_key(address) in self.bloom
+        if not check_exact and not (self.has_v4_ranges if version == 4 else self.has_v6_ranges):
+            return []
+
+        if version == 4:
+            return [feed for feed in feeds if feed.contains_v4(address, check_exact)]
+        return [feed for feed in feeds if feed.contains_v6(address, check_exact)]
+
+
+class ThreatIntelService:
+    """
+    Threat-intel blocklists loaded from a directory of feed files.
+
+    Feeds are compiled on a dedicated thread and installed by replacing
+    one reference, so lookups never see a half-built index and the event
+    pipeline never waits for a reload. A background watcher rebuilds the
+    index when files in the feed directory are added, changed or removed.
+    """
+
+    def __init__(self, feed_dir: Optional[str] = None):
+        self.feed_dir = feed_dir or settings.threat_intel_feed_dir or DEFAULT_FEED_DIR
+        self.check_interval = settings.threat_intel_check_interval
+        self.bloom_enabled = settings.threat_intel_bloom_enabled
+        self.bloom_error_rate = settings.threat_intel_bloom_error_rate
+
+        self._executor = get_executor("threat-intel", 1)
+        self._index = ThreatIntelIndex([], None, ())
+        self._listeners: List[Callable[[], None]] = []
+        self._running = False
+
+        self.lookups = 0
+        self.matches = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_reload_ms = 0.0
+
+    def add_reload_listener(self, callback: Callable[[], None]):
+        """Register a callback run (on the event loop) after each successful swap."""
+        self._listeners.append(callback)
+
+    def lookup(self, ip: str) -> Optional[Dict]:
+        """
+        Check an address against all feeds.
+
+        Args:
+            ip: IPv4 or IPv6 address
+
+        Returns:
+            None if not listed, else {"feeds", "categories", "confidence"}
+        """
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return None
+        return self.lookup_int(*parsed)
+
+    def lookup_int(self, version: int, address: int) -> Optional[Dict]:
+        """lookup() for a pre-parsed (version, address) pair."""
+        self.lookups += 1
+        feeds = self._index.lookup(version, address)
+        if not feeds:
+            return None
+
+        self.matches += 1
+        return {
+            "feeds": [feed.name for feed in feeds],
+            "categories": sorted({feed.category for feed in feeds}),
+            "confidence": max(feed.confidence for feed in feeds),
+        }
+
+    def contains_v4_many(self, addresses: np.ndarray) -> np.ndarray:
+        """Vectorized check of uint32 IPv4 addresses against all feeds."""
+        listed = np.zeros(len(addresses), dtype=bool)
+        for feed in self._index.feeds:
+            listed |= feed.contains_v4_many(addresses)
+        return listed
+
+    async def reload(self, force: bool = False) -> bool:
+        """
+        Rebuild the index off the event loop and swap it in.
+
+        Args:
+            force: Rebuild even if no feed file changed
+
+        Returns:
+            True if a new index was installed
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            signature = await loop.run_in_executor(self._executor, self._scan)
+            if not force and signature == self._index.signature:
+                return False
+
+            started = time.perf_counter()
+            index = await loop.run_in_executor(self._executor, self._build, signature)
+        except Exception as e:
+            self.reload_errors += 1
+            logger.error(f"❌ Failed to load threat-intel feeds from {self.feed_dir}: {e}")
+            return False
+
+        # Atomic swap - readers hold on to whichever index they started with
+        self._index = index
+        self.reloads += 1
+        self.last_reload_ms = (time.perf_counter() - started) * 1000
+
+        total = sum(len(feed.v4_exact) + len(feed.v6_exact) for feed in index.feeds)
+        logger.info(
+            f"🛡️  Threat-intel index loaded: {len(index.feeds)} feeds, {total} addresses, "
+            f"{self._memory_bytes(index) / 1024 / 1024:.2f} MiB in {self.last_reload_ms:.0f}ms"
+        )
+
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Threat-intel reload listener failed: {e}")
+        return True
+
+    async def watch(self):
+        """Background task: reload whenever the feed directory changes."""
+        self._running = True
+        while self._running:
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Threat-intel watcher error: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def stop(self):
+        """Stop the watcher loop."""
+        self._running = False
+
+    def get_stats(self) -> Dict:
+        """Get per-feed sizes and memory, Bloom filter state and lookup counters."""
+        index = self._index
+        return {
+            "feed_dir": self.feed_dir,
+            "feeds": [feed.get_stats() for feed in index.feeds],
+            "bloom": index.bloom.get_stats() if index.bloom is not None else None,
+            "memory_bytes": self._memory_bytes(index),
+            "loaded_at": index.loaded_at,
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_reload_ms": round(self.last_reload_ms, 1),
+        }
+
+    def _scan(self) -> Tuple:
+        """Signature of the feed directory: (name, size, mtime) per feed file."""
+        if not os.path.isdir(self.feed_dir):
+            return ()
+        entries = []
+        for entry in os.scandir(self.feed_dir):
+            if entry.is_file() and entry.name.endswith(FEED_EXTENSIONS):
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+        return tuple(sorted(entries))
+
+    def _build(self, signature: Tuple) -> ThreatIntelIndex:
+        """Compile every feed (runs on the threat-intel executor)."""
+        feeds = [compile_feed(os.path.join(self.feed_dir, name)) for name, _, _ in signature]
+
+        bloom = None
+        if self.bloom_enabled:
+            keys = [feed.v4_exact.astype(np.uint64) for feed in feeds]
+            keys += [_fold_v6(feed.v6_exact) for feed in feeds if len(feed.v6_exact)]
+            keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+            bloom = BloomFilter(len(keys), self.bloom_error_rate)
+            bloom.add_many(keys)
+
+        return ThreatIntelIndex(feeds, bloom, signature)
+
+    @staticmethod
+    def _memory_bytes(index: ThreatIntelIndex) -> int:
+        total = sum(feed.nbytes for feed in index.feeds)
+        if index.bloom is not None:
+            total += index.bloom.nbytes
+        return total
+
+
+# Global instance
+_threat_intel_service = None
+
+
+def get_threat_intel_service() -> ThreatIntelService:
+    """Get the global ThreatIntelService instance."""
+    global _threat_intel_service
+    if _threat_intel_service is None:
+        _threat_intel_service = ThreatIntelService()
+    return _threat_intel_service
@@ -0,0 +1,374 @@
+"""
+Segmented Threat Log
+Append-only local storage of threats in rolling segment files with sparse time indexes
+"""
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Record header: payload length, timestamp (ms since epoch), CRC32 of payload
+_HEADER = struct.Struct("<IqI")
+
+# One sparse index entry per block of records: (min ts, max ts, offset)
+INDEX_BLOCK_RECORDS = 64
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+_INDEX_ENTRY = struct.Struct("<qqQ")
+
+
+def to_millis(value: Any) -> int:
+    """Timestamp (datetime, ISO string or epoch seconds) -> ms since epoch; naive means UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(float(value) * 1000)
+
+
+def _field(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+def _encode_default(value: Any) -> Any:
+    """JSON fallback for model dumps: datetimes as ISO 8601, enums as their value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return _field(value) if hasattr(value, "value") else str(value)
+
+
+class _Segment:
+    """One segment file and its in-memory sparse index."""
+
+    __slots__ = ("path", "base", "size", "records", "min_ts", "max_ts", "blocks", "_block_count")
+
+    def __init__(self, path: str, base: int):
+        self.path = path
+        self.base = base
+        self.size = 0
+        self.records = 0
+        self.min_ts: Optional[int] = None
+        self.max_ts: Optional[int] = None
+        self.blocks: List[List[int]] = []  # [min ts, max ts, offset] per INDEX_BLOCK_RECORDS records
+        self._block_count = 0
+
+    def note(self, offset: int, ts: int, length: int):
+        """Account for a record written at offset."""
+        if self._block_count == 0:
+            self.blocks.append([ts, ts, offset])
+        else:
+            block = self.blocks[-1]
+            block[0] = min(block[0], ts)
+            block[1] = max(block[1], ts)
+        self._block_count = (self._block_count + 1) % INDEX_BLOCK_RECORDS
+
+        self.records += 1
+        self.size = offset + _HEADER.size + length
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+
+    def map(self, size: int) -> mmap.mmap:
+        """Read-only map of the first `size` bytes (each reader maps its own view)."""
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    def write_index(self):
+        """Persist the sparse index next to a sealed segment."""
+        tmp = self.path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack("<QQ", self.records, self.size))
+            for block in self.blocks:
+                f.write(_INDEX_ENTRY.pack(*block))
+        os.replace(tmp, self.path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX)
+
+    def read_index(self) -> bool:
+        """Load a persisted sparse index; False if missing or stale."""
+        path = self.path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            records, size = struct.unpack_from("<QQ", data)
+        except (OSError, struct.error):
+            return False
+        if size != os.path.getsize(self.path):
+            return False
+
+        self.blocks = [list(entry) for entry in _INDEX_ENTRY.iter_unpack(data[16:])]
+        self.records, self.size = records, size
+        self._block_count = records % INDEX_BLOCK_RECORDS
+        if self.blocks:
+            self.min_ts = min(block[0] for block in self.blocks)
+            self.max_ts = max(block[1] for block in self.blocks)
+        return True
+
+
+class ThreatLog:
+    """
+    Append-only threat log in rolling segment files.
+
+    Each record is a small header (length, timestamp, CRC32) followed by
+    the JSON-encoded threat. Every segment keeps a sparse index with the
+    min/max timestamp and file offset of each block of 64 records, so a
+    time-range scan skips whole segments and blocks outside the range
+    and decodes only the blocks that can match. Reads go through a
+    read-only mmap of the segment. The active segment rolls at
+    THREAT_LOG_SEGMENT_BYTES; sealed segments get their index written
+    next to them and are deleted oldest-first beyond THREAT_LOG_MAX_BYTES
+    or THREAT_LOG_RETENTION_HOURS. A torn record at the end of the
+    active segment (crash mid-write) is truncated on open.
+
+    The log is not thread-safe: FirestoreService runs appends, scans and
+    close on the single-thread "threat-log" executor, which keeps them in
+    submission order and off the event loop. Scans map their own views of
+    the bytes already written when they start.
+    """
+
+    def __init__(self, directory: str = None, segment_bytes: int = None, max_bytes: int = None,
+                 retention_hours: float = None):
+        self.directory = directory or settings.threat_log_dir
+        self.segment_bytes = segment_bytes or settings.threat_log_segment_bytes
+        self.max_bytes = max_bytes or settings.threat_log_max_bytes
+        self.retention_hours = settings.threat_log_retention_hours if retention_hours is None else retention_hours
+        self.fsync = settings.threat_log_fsync
+
+        self.segments: List[_Segment] = []
+        self._file = None
+
+        self.appends = 0
+        self.scans = 0
+        self.blocks_read = 0
+        self.segments_deleted = 0
+        self.truncated_bytes = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+        self.enforce_retention()
+
+    def _open(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        for i, name in enumerate(names):
+            segment = _Segment(os.path.join(self.directory, name), int(name[:-len(SEGMENT_SUFFIX)]))
+            is_active = i == len(names) - 1
+            if is_active or not segment.read_index():
+                self._scan_segment(segment, truncate=is_active)
+                if not is_active:
+                    segment.write_index()
+            self.segments.append(segment)
+
+        if not self.segments:
+            self.segments.append(_Segment(self._segment_path(0), 0))
+        self._file = open(self.segments[-1].path, "ab")
+
+        logger.info(
+            f"📼 Threat log opened at {self.directory}: {len(self.segments)} segments, "
+            f"{sum(s.records for s in self.segments)} threats, {self.total_bytes / 1024 / 1024:.1f} MiB"
+        )
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, f"{base:012d}{SEGMENT_SUFFIX}")
+
+    def _scan_segment(self, segment: _Segment, truncate: bool):
+        """Rebuild a segment's index from its record headers."""
+        size = os.path.getsize(segment.path)
+        valid = 0
+        if size:
+            with open(segment.path, "rb") as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as view:
+                offset = 0
+                while offset + _HEADER.size <= size:
+                    length, ts, crc = _HEADER.unpack_from(view, offset)
+                    end = offset + _HEADER.size + length
+                    if end > size or zlib.crc32(view[offset + _HEADER.size:end]) != crc:
+                        break
+                    segment.note(offset, ts, length)
+                    offset = end
+                valid = offset
+
+        if valid < size:
+            if truncate:
+                with open(segment.path, "r+b") as f:
+                    f.truncate(valid)
+                self.truncated_bytes += size - valid
+                logger.warning(f"⚠️  Truncated {size - valid} bytes of torn records from {segment.path}")
+            else:
+                logger.warning(f"⚠️  Ignoring {size - valid} unreadable bytes at the end of {segment.path}")
+        segment.size = valid
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def append(self, threat: Dict):
+        """
+        Append a threat.
+
+        Args:
+            threat: Threat dict (model dump); its "timestamp" is indexed
+        """
+        payload = json.dumps(threat, default=_encode_default, separators=(",", ":")).encode("utf-8")
+        ts = to_millis(threat.get("timestamp") or time.time())
+
+        segment = self.segments[-1]
+        if segment.size and segment.size + _HEADER.size + len(payload) > self.segment_bytes:
+            self._roll()
+            segment = self.segments[-1]
+
+        offset = segment.size
+        self._file.write(_HEADER.pack(len(payload), ts, zlib.crc32(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        segment.note(offset, ts, len(payload))
+        self.appends += 1
+
+        # Age-based retention also applies when traffic is too low to roll segments
+        if self.appends % 1000 == 0:
+            self.enforce_retention()
+
+    def _roll(self):
+        """Seal the active segment and start a new one."""
+        sealed = self.segments[-1]
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        sealed.write_index()
+
+        base = sealed.base + sealed.records
+        self.segments.append(_Segment(self._segment_path(base), base))
+        self._file = open(self.segments[-1].path, "ab")
+        logger.info(f"📼 Rolled threat log segment {os.path.basename(sealed.path)} ({sealed.records} threats)")
+        self.enforce_retention()
+
+    def enforce_retention(self):
+        """Delete the oldest sealed segments beyond the size or age limits."""
+        cutoff = (time.time() - self.retention_hours * 3600) * 1000 if self.retention_hours > 0 else None
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            if oldest.records == 0:
+                break
+            too_big = self.total_bytes > self.max_bytes
+            too_old = cutoff is not None and oldest.max_ts is not None and oldest.max_ts < cutoff
+            if not (too_big or too_old):
+                break
+            for path in (oldest.path, oldest.path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.segments.pop(0)
+            self.segments_deleted += 1
+            logger.info(f"🗑️  Deleted threat log segment {os.path.basename(oldest.path)} ({'size' if too_big else 'age'})")
+
+    @staticmethod
+    def _records(view: mmap.mmap, start_offset: int, end_offset: int) -> Iterator[Tuple[int, bytes]]:
+        offset = start_offset
+        while offset < end_offset:
+            length, ts, _ = _HEADER.unpack_from(view, offset)
+            payload_start = offset + _HEADER.size
+            yield ts, view[payload_start:payload_start + length]
+            offset = payload_start + length
+
+    def get_threats_between(
+        self,
+        start: Any,
+        end: Any,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Threats with start <= timestamp <= end, in append order.
+
+        Args:
+            start: Range start (datetime, ISO string or epoch seconds)
+            end: Range end (inclusive)
+            filters: Field -> required value (e.g. {"severity": "CRITICAL"})
+            limit: Stop after this many matches
+
+        Returns:
+            Decoded threat dicts
+        """
+        start_ms, end_ms = to_millis(start), to_millis(end)
+        filters = {field: _field(value) for field, value in (filters or {}).items() if value is not None}
+        self.scans += 1
+
+        results = []
+        for segment in list(self.segments):
+            # Snapshot: only records already written when the scan reaches the segment
+            size, blocks = segment.size, [tuple(block) for block in segment.blocks]
+            if not size or segment.max_ts < start_ms or segment.min_ts > end_ms:
+                continue
+            try:
+                view = segment.map(size)
+            except (FileNotFoundError, ValueError):
+                continue  # Deleted by retention mid-scan
+
+            with view:
+                for i, (block_min, block_max, offset) in enumerate(blocks):
+                    if block_max < start_ms or block_min > end_ms:
+                        continue
+                    block_end = blocks[i + 1][2] if i + 1 < len(blocks) else size
+                    self.blocks_read += 1
+                    for ts, payload in self._records(view, offset, block_end):
+                        if not start_ms <= ts <= end_ms:
+                            continue
+                        threat = json.loads(payload)
+                        if all(threat.get(field) == value for field, value in filters.items()):
+                            results.append(threat)
+                            if limit is not None and len(results) >= limit:
+                                return results
+        return results
+
+    def tail(self, limit: int) -> List[Dict]:
+        """The last `limit` appended threats, oldest first."""
+        collected: List[List[Dict]] = []
+        remaining = limit
+        for segment in reversed(self.segments):
+            if remaining <= 0:
+                break
+            if segment.records == 0:
+                continue
+            # Start at the block holding the first record we need
+            skip = max(0, segment.records - remaining)
+            block = min(skip // INDEX_BLOCK_RECORDS, len(segment.blocks) - 1)
+            with segment.map(segment.size) as view:
+                records = [json.loads(payload) for _, payload in self._records(view, segment.blocks[block][2], segment.size)]
+            records = records[max(0, len(records) - remaining):]
+            collected.append(records)
+            remaining -= len(records)
+        return [threat for chunk in reversed(collected) for threat in chunk]
+
+    def close(self):
+        """Flush and close the active segment."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> Dict:
+        """Get segment, size and scan statistics."""
+        return {
+            "directory": self.directory,
+            "segments": len(self.segments),
+            "threats": sum(segment.records for segment in self.segments),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "retention_hours": self.retention_hours,
+            "oldest_timestamp_ms": self.segments[0].min_ts if self.segments and self.segments[0].records else None,
+            "appends": self.appends,
+            "scans": self.scans,
+            "blocks_read": self.blocks_read,
+            "segments_deleted": self.segments_deleted,
+            "truncated_bytes": self.truncated_bytes,
+        }
@@ -2,18 +2,21 @@
 Threat Processor - Main event processing pipeline
 Orchestrates event ingestion, AI analysis, and alert generation
 """
+import asyncio
 import uuid
 import time
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi.encoders import jsonable_encoder
-from app.core.gemini_analyzer import GeminiThreatAnalyzer
+from app.core.ai_budget import AIBudgetAllocator
+from app.core.gemini_analyzer import get_gemini_analyzer
 from app.core.kafka_producer import get_producer
-from app.models.threat import Threat, SecurityEvent, SeverityLevel
+from app.models.threat import Threat, SecurityEvent, SeverityLevel, GeminiAnalysis, ProvisionalClassification
 from app.services.geo_service import get_geo_service
 from app.services.firestore_service import get_firestore_service
 from app.services.metrics_service import get_metrics_service
 from app.services.alert_service import get_alert_service
+from app.services.reputation_service import get_reputation_service
 from app.api.websocket.manager import get_connection_manager
 from app.utils.logger import get_logger
 
@@ -24,13 +27,15 @@ class ThreatProcessor:
     """Main threat processing pipeline orchestrator."""
 
     def __init__(self):
-        self.analyzer = GeminiThreatAnalyzer()
+        self.analyzer = get_gemini_analyzer()
         self.geo = get_geo_service()
         self.db = get_firestore_service()
         self.metrics = get_metrics_service()
         self.alerts = get_alert_service()
         self.producer = get_producer()
         self.ws_manager = get_connection_manager()
+        self.budget = AIBudgetAllocator()
+        self.reputation = get_reputation_service()
 
         self.events_processed = 0
         self.threats_detected = 0
@@ -46,6 +51,7 @@ class ThreatProcessor:
         0. Check scenario epoch (state-aware streaming)
         1. Parse event
         2. Geo enrichment
+        2.5. AI budget admission (preliminary risk)
         3. AI analysis
         4. Risk scoring
         5. Create threat object
@@ -60,126 +66,293 @@ class ThreatProcessor:
         start_time = time.time()
 
         try:
-            # Step 0: State-aware streaming - Drop stale events from old scenarios
-            # Import CURRENT_SCENARIO_ID from main module
-            from app.main import CURRENT_SCENARIO_ID
-
-            event_scenario_id = event_data.get("metadata", {}).get("scenario_id")
-            if event_scenario_id is not None and CURRENT_SCENARIO_ID is not None:
-                if event_scenario_id != CURRENT_SCENARIO_ID:
-                    logger.debug(
-                        f"⏭️  Dropping stale event from old scenario epoch: "
-                        f"{event_scenario_id} (current: {CURRENT_SCENARIO_ID})"
-                    )
-                    return  # Drop event - it's from an old scenario
-
-            # Step 1: Parse event
-            event = SecurityEvent(**event_data)
-            self.events_processed += 1
+            # Steps 0-1: Epoch check, parse
+            event = self._parse_event(event_data)
+            if event is None:
+                return  # Drop event - it's from an old scenario
 
             # Step 2: Geo enrichment
             geo_info = self.geo.lookup_ip(event.source_ip)
 
+            # Step 2.5: Spend Gemini quota only if this event ranks high enough
+            use_ai = self.budget.admit(self.budget.preliminary_risk(event_data, geo_info))
+
             # Step 3: AI analysis
-            analysis = await self.analyzer.analyze(event_data)
-
-            # Step 4: Calculate risk score
-            risk_score = self._calculate_risk_score(analysis, event_data, geo_info)
-
-            # Step 5: Create threat object
-            processing_time = int((time.time() - start_time) * 1000)
-
-            threat = Threat(
-                id=f"THR-{uuid.uuid4().hex[:8].upper()}",
-                event_id=event.event_id,
-                timestamp=event.timestamp,
-                severity=analysis.severity,
-                threat_type=analysis.threat_type,
-                risk_score=risk_score,
-                source_ip=event.source_ip,
-                source_country=geo_info.get("country"),
-                source_country_code=geo_info.get("country_code"),
-                source_zone=geo_info.get("zone"),
-                destination_ip=event.destination_ip,
-                destination_port=event.destination_port,
-                confidence=analysis.confidence,
-                description=analysis.description,
-                contextual_analysis=analysis.contextual_analysis,
-                contributing_signals=analysis.contributing_signals,
-                mitre_attack_id=analysis.mitre_attack_id,
-                mitre_attack_name=analysis.mitre_attack_name,
-                recommended_actions=analysis.recommended_actions,
-                auto_blocked=False,
-                processing_time_ms=processing_time,
-                analyzed_at=datetime.now(timezone.utc),
-                audit_ref=analysis.audit_ref
-            )
+            threat_id = f"THR-{uuid.uuid4().hex[:8].upper()}"
+            analysis, model_called = await self._analyze_event(threat_id, event, event_data, geo_info, use_ai)
 
-            # Step 6: Store in database
-            await self.db.store_threat(threat)
+            # Steps 4-9
+            await self._complete_threat(threat_id, event, event_data, geo_info, analysis, model_called, start_time)
 
-            # Step 6.5: Publish analyzed threat to Kafka
-            if self.producer:
-                threat_dict = threat.model_dump()
-                self.producer.produce_threat(threat_dict)
-                logger.info(f"📡 Published threat {threat.id} to Kafka topic: security.analyzed.threats")
+        except Exception as e:
+            logger.error(f"Failed to process event: {e}", exc_info=True)
+            raise
 
-            # Step 6.6: Broadcast to WebSocket clients
-            await self.ws_manager.broadcast(jsonable_encoder({
-                "type": "new_threat",
-                "data": threat.model_dump()
-            }))
+    async def process_batch(self, batch: List[Dict[str, Any]]):
+        """
+        Process a batch of queued security events.
+
+        The batch is ranked by preliminary risk and only the top slice that
+        fits the remaining AI budget is sent to Gemini (concurrently); the
+        rest get rule-based fallback analysis. Threats are then completed in
+        arrival order. A failing event is logged and does not stop the batch.
+
+        Args:
+            batch: Raw security event data, in arrival order
+        """
+        start_time = time.time()
+
+        # Steps 0-1 for every event
+        parsed = []
+        for event_data in batch:
+            try:
+                event = self._parse_event(event_data)
+            except Exception as e:
+                logger.error(f"Failed to parse event in batch: {e}")
+                continue
+            if event is not None:
+                parsed.append((event_data, event))
+
+        if not parsed:
+            return
+
+        # Step 2: Geo enrichment for the whole batch (vectorized)
+        geo = self.geo.lookup_many([event.source_ip for _, event in parsed])
+        queued = [(event_data, event, geo.row(i)) for i, (event_data, event) in enumerate(parsed)]
+
+        # Step 2.5: Rank by preliminary risk and allocate the AI budget
+        risks = [self.budget.preliminary_risk(event_data, geo_info) for event_data, _, geo_info in queued]
+        selected = self.budget.allocate(risks)
+
+        # Step 3: AI analysis, concurrently
+        threat_ids = [f"THR-{uuid.uuid4().hex[:8].upper()}" for _ in queued]
+        analyses = await asyncio.gather(
+            *(
+                self._analyze_event(threat_ids[i], event, event_data, geo_info, i in selected)
+                for i, (event_data, event, geo_info) in enumerate(queued)
+            ),
+            return_exceptions=True
+        )
+
+        # Steps 4-9, in arrival order
+        for threat_id, (event_data, event, geo_info), outcome in zip(threat_ids, queued, analyses):
+            if isinstance(outcome, Exception):
+                logger.error(f"AI analysis failed for event {event.event_id}: {outcome}")
+                continue
+            analysis, model_called = outcome
+            try:
+                await self._complete_threat(threat_id, event, event_data, geo_info, analysis, model_called, start_time)
+            except Exception as e:
+                logger.error(f"Failed to process event {event.event_id}: {e}", exc_info=True)
+
+        logger.debug(f"Processed batch of {len(queued)} events ({len(selected)} sent to Gemini)")
+
+    def _parse_event(self, event_data: Dict[str, Any]) -> Optional[SecurityEvent]:
+        """
+        Pipeline steps 0-1: epoch check and parse.
 
-            # Step 7: Update metrics
-            await self.metrics.record_event_processed()
+        Returns:
+            The parsed event, or None if it is from a stale scenario
+        """
+        # Step 0: State-aware streaming - Drop stale events from old scenarios
+        # Import CURRENT_SCENARIO_ID from main module
+        from app.main import CURRENT_SCENARIO_ID
+
+        event_scenario_id = event_data.get("metadata", {}).get("scenario_id")
+        if event_scenario_id is not None and CURRENT_SCENARIO_ID is not None:
+            if event_scenario_id != CURRENT_SCENARIO_ID:
+                logger.debug(
+                    f"⏭️  Dropping stale event from old scenario epoch: "
+                    f"{event_scenario_id} (current: {CURRENT_SCENARIO_ID})"
+                )
+                return None
+
+        # Step 1: Parse event
+        event = SecurityEvent(**event_data)
+        self.events_processed += 1
+
+        return event
+
+    async def _analyze_event(
+        self,
+        threat_id: str,
+        event: SecurityEvent,
+        event_data: Dict[str, Any],
+        geo_info: Dict,
+        use_ai: bool
+    ) -> Tuple[GeminiAnalysis, bool]:
+        """
+        Pipeline step 3: AI analysis.
 
-            # Always record threat for risk index calculation (including INFO events with negative contribution)
-            await self.metrics.record_threat(threat)
+        Streamed; a provisional classification is broadcast as soon as
+        severity/type/confidence are parsed. Budget tokens are returned when
+        the analyzer answered without calling the model (caches, healthy
+        flows, no model configured).
 
-            # Only increment threat counter for actual threats (non-INFO)
-            if analysis.severity != SeverityLevel.INFO:
-                self.threats_detected += 1
+        Returns:
+            (analysis, whether a model request was made)
+        """
+        async def on_provisional(provisional: ProvisionalClassification):
+            await self._emit_provisional(threat_id, event, event_data, geo_info, provisional)
+
+        analysis, model_called = await self.analyzer.analyze_with_usage(
+            event_data, on_provisional=on_provisional, allow_model=use_ai
+        )
+
+        if use_ai and not model_called:
+            self.budget.refund()
+
+        return analysis, model_called
+
+    async def _complete_threat(
+        self,
+        threat_id: str,
+        event: SecurityEvent,
+        event_data: Dict[str, Any],
+        geo_info: Dict,
+        analysis: GeminiAnalysis,
+        model_called: bool,
+        start_time: float
+    ):
+        """Pipeline steps 4-9: score, store, publish, broadcast, alert."""
+        # Step 4: Calculate risk score
+        risk_score = self._calculate_risk_score(analysis, event_data, geo_info)
+
+        # Step 5: Create threat object
+        processing_time = int((time.time() - start_time) * 1000)
+
+        threat = Threat(
+            id=threat_id,
+            event_id=event.event_id,
+            timestamp=event.timestamp,
+            severity=analysis.severity,
+            threat_type=analysis.threat_type,
+            risk_score=risk_score,
+            source_ip=event.source_ip,
+            source_country=geo_info.get("country"),
+            source_country_code=geo_info.get("country_code"),
+            source_zone=geo_info.get("zone"),
+            threat_intel_feeds=(geo_info.get("threat_intel") or {}).get("feeds"),
+            destination_ip=event.destination_ip,
+            destination_port=event.destination_port,
+            confidence=analysis.confidence,
+            description=analysis.description,
+            contextual_analysis=analysis.contextual_analysis,
+            contributing_signals=analysis.contributing_signals,
+            mitre_attack_id=analysis.mitre_attack_id,
+            mitre_attack_name=analysis.mitre_attack_name,
+            recommended_actions=analysis.recommended_actions,
+            auto_blocked=False,
+            processing_time_ms=processing_time,
+            analyzed_at=datetime.now(timezone.utc),
+            audit_ref=analysis.audit_ref
+        )
+
+        # Step 5.5: Fold this threat into the source's reputation (after scoring it)
+        self.reputation.record(event.source_ip, analysis.severity)
+
+        # AI coverage accounting for the budget allocator (cache and similarity reuse don't count)
+        self.budget.record_outcome(analysis.severity, model_called)
+
+        # Step 6: Store in database
+        await self.db.store_threat(threat)
+
+        # Step 6.5: Publish analyzed threat to Kafka
+        if self.producer:
+            threat_dict = threat.model_dump()
+            self.producer.produce_threat(threat_dict)
+            logger.info(f"📡 Published threat {threat.id} to Kafka topic: security.analyzed.threats")
+
+        # Step 6.6: Broadcast to WebSocket clients
+        await self.ws_manager.broadcast(jsonable_encoder({
+            "type": "new_threat",
+            "data": threat.model_dump()
+        }))
+
+        # Step 7: Update metrics
+        await self.metrics.record_event_processed()
+
+        # Always record threat for risk index calculation (including INFO events with negative contribution)
+        await self.metrics.record_threat(threat)
+
+        # Only increment threat counter for actual threats (non-INFO)
+        if analysis.severity != SeverityLevel.INFO:
+            self.threats_detected += 1
+
+        # Step 7.5: Broadcast updated risk index to WebSocket clients
+        risk_index = self.metrics.get_current_risk_index()
+        await self.ws_manager.broadcast(jsonable_encoder({
+            "type": "risk_update",
+            "data": risk_index
+        }))
+
+        await self.metrics.record_detection_time(processing_time)
+
+        # Step 8: Generate alert for CRITICAL/HIGH threats
+        if analysis.severity in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]:
+            alert = await self.alerts.create_alert(threat)
+            self.alerts_created += 1
+            await self.metrics.record_alert()
+
+            # Publish critical alert to Kafka alerts topic
+            if self.producer:
+                alert_dict = alert.model_dump()
+                self.producer.produce_alert(alert_dict)
+                logger.info(f"📢 Published alert {alert.id} to Kafka topic: security.critical.alerts")
 
-            # Step 7.5: Broadcast updated risk index to WebSocket clients
-            risk_index = self.metrics.get_current_risk_index()
+            # Broadcast alert to WebSocket clients
             await self.ws_manager.broadcast(jsonable_encoder({
-                "type": "risk_update",
-                "data": risk_index
+                "type": "new_alert",
+                "data": alert.model_dump()
             }))
 
-            await self.metrics.record_detection_time(processing_time)
-
-            # Step 8: Generate alert for CRITICAL/HIGH threats
-            if analysis.severity in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]:
-                alert = await self.alerts.create_alert(threat)
-                self.alerts_created += 1
-                await self.metrics.record_alert()
-
-                # Publish critical alert to Kafka alerts topic
-                if self.producer:
-                    alert_dict = alert.model_dump()
-                    self.producer.produce_alert(alert_dict)
-                    logger.info(f"📢 Published alert {alert.id} to Kafka topic: security.critical.alerts")
-
-                # Broadcast alert to WebSocket clients
-                await self.ws_manager.broadcast(jsonable_encoder({
-                    "type": "new_alert",
-                    "data": alert.model_dump()
-                }))
-
-            # Step 9: Log high-severity threats
-            if analysis.severity in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]:
-                logger.warning(
-                    f"🚨 {analysis.severity.value}: {analysis.threat_type.value} "
-                    f"from {event.source_ip} [{geo_info.get('country_code', 'XX')}] - "
-                    f"{analysis.description}"
-                )
+        # Step 9: Log high-severity threats
+        if analysis.severity in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]:
+            logger.warning(
+                f"🚨 {analysis.severity.value}: {analysis.threat_type.value} "
+                f"from {event.source_ip} [{geo_info.get('country_code', 'XX')}] - "
+                f"{analysis.description}"
+            )
 
-            logger.debug(f"Processed event {event.event_id} in {processing_time}ms")
+        logger.debug(f"Processed event {event.event_id} in {processing_time}ms")
 
-        except Exception as e:
-            logger.error(f"Failed to process event: {e}", exc_info=True)
-            raise
+    async def _emit_provisional(
+        self,
+        threat_id: str,
+        event: SecurityEvent,
+        event_data: Dict[str, Any],
+        geo_info: Dict,
+        provisional: ProvisionalClassification
+    ):
+        """
+        Broadcast an early classification while the full analysis is still generating.
+
+        The provisional risk score uses the same algorithm as the final one,
+        so dashboards and alert triage can react before contextual_analysis
+        arrives. The final new_threat message with the same id supersedes it.
+        """
+        risk_score = self._calculate_risk_score(provisional, event_data, geo_info)
+
+        await self.ws_manager.broadcast(jsonable_encoder({
+            "type": "provisional_threat",
+            "data": {
+                "id": threat_id,
+                "event_id": event.event_id,
+                "timestamp": event.timestamp,
+                "severity": provisional.severity.value,
+                "threat_type": provisional.threat_type.value,
+                "confidence": provisional.confidence,
+                "risk_score": risk_score,
+                "source_ip": event.source_ip,
+                "source_country_code": geo_info.get("country_code"),
+                "alert_expected": provisional.severity in [SeverityLevel.CRITICAL, SeverityLevel.HIGH]
+            }
+        }))
+
+        logger.debug(
+            f"Provisional {provisional.severity.value} {provisional.threat_type.value} "
+            f"for {event.event_id} (risk {risk_score})"
+        )
 
     def _calculate_risk_score(self, analysis, event_data: Dict, geo_info: Dict) -> int:
         """
@@ -189,7 +362,10 @@ class ThreatProcessor:
         - Severity Level:      40% weight (0-40 points)
         - AI Confidence:       20% weight (0-20 points)
         - Attack Type:         20% weight (0-20 points)
-        - Geographic Risk:     20% weight (0-20 points)
+        - Geographic Risk:     20% weight (0-20 points, threat-intel listed
+                               sources score at least 10 + 10 x feed confidence)
+        - Source Reputation:   bonus (0-10 points from the source's decayed
+                               threat history; first-time sources get 0)
 
         Returns:
             Integer risk score from 0 (no risk) to 100 (critical risk)
@@ -220,9 +396,18 @@ class ThreatProcessor:
         else:
             score += 10
 
-        # Component 4: Geographic risk (0-20)
+        # Component 4: Geographic & threat-intel risk (0-20)
         risk_multiplier = geo_info.get("risk_multiplier", 1.0)
-        score += int(risk_multiplier * 10)
+        geo_points = int(risk_multiplier * 10)
+        threat_intel = geo_info.get("threat_intel")
+        if threat_intel:
+            geo_points = max(geo_points, 10 + int(threat_intel["confidence"] * 10))
+        score += min(20, geo_points)
+
+        # Component 5: Source reputation (0-10)
+        source_ip = event_data.get("source_ip")
+        if source_ip:
+            score += self.reputation.risk_points(source_ip)
 
         return min(100, max(0, score))
 
@@ -232,7 +417,8 @@ class ThreatProcessor:
             "events_processed": self.events_processed,
             "threats_detected": self.threats_detected,
             "alerts_created": self.alerts_created,
-            "analyzer_stats": self.analyzer.get_metrics()
+            "analyzer_stats": self.analyzer.get_metrics(),
+            "ai_budget": self.budget.get_stats()
         }
 
 
@@ -0,0 +1,296 @@
+"""
+Columnar Threat Table
+Threat history as NumPy columns with dictionary-encoded categoricals for vectorized aggregation
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.config import settings
+from app.services.threat_log import to_millis
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Categorical dimensions: name -> threat field
+CATEGORICAL_FIELDS = {
+    "severity": "severity",
+    "threat_type": "threat_type",
+    "country": "source_country_code",
+    "zone": "source_zone",
+}
+
+# Time bucket dimensions: name -> bucket width in ms
+TIME_BUCKETS = {
+    "minute": 60 * 1000,
+    "hour": 60 * 60 * 1000,
+    "day": 24 * 60 * 60 * 1000,
+}
+
+GROUP_DIMENSIONS = tuple(TIME_BUCKETS) + tuple(CATEGORICAL_FIELDS)
+
+
+class _Dictionary:
+    """Append-only value <-> code mapping; code 0 is reserved for missing values."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self._codes: Dict[Optional[str], int] = {None: 0}
+
+    def encode(self, value: Any) -> int:
+        value = getattr(value, "value", value)
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def lookup(self, value: Any) -> Optional[int]:
+        """Code of an existing value (None if it was never seen)."""
+        return self._codes.get(getattr(value, "value", value))
+
+    @classmethod
+    def from_values(cls, values: List[Optional[str]]) -> "_Dictionary":
+        dictionary = cls()
+        dictionary.values = list(values)
+        dictionary._codes = {value: code for code, value in enumerate(dictionary.values)}
+        return dictionary
+
+
+class ThreatTable:
+    """
+    Append-only columnar store of threat history.
+
+    Each threat is one row across parallel NumPy columns: timestamp (ms),
+    risk_score and confidence, plus uint16 codes for severity, type,
+    country and zone (see _Dictionary). Columns grow by
+    THREAT_TABLE_CHUNK_ROWS at a time; once THREAT_TABLE_CAPACITY rows are
+    held, the oldest chunk is dropped. Growth always copies into fresh
+    arrays, so a snapshot (slices of the current arrays) stays valid
+    while new rows are appended and queries can run off the event loop.
+    """
+
+    def __init__(self, capacity: int = None, chunk_rows: int = None):
+        self.chunk_rows = max(1, chunk_rows or settings.threat_table_chunk_rows)
+        self.capacity = max(self.chunk_rows, capacity or settings.threat_table_capacity)
+
+        self._lock = threading.Lock()
+        self._dictionaries = {name: _Dictionary() for name in CATEGORICAL_FIELDS}
+        self._columns = self._allocate(self.chunk_rows)
+        self._start = 0  # First live row
+        self._end = 0    # One past the last live row
+
+        self.appended = 0
+        self.dropped = 0
+
+    @staticmethod
+    def _allocate(rows: int) -> Dict[str, np.ndarray]:
+        columns = {
+            "timestamp": np.zeros(rows, dtype=np.int64),
+            "risk_score": np.zeros(rows, dtype=np.float32),
+            "confidence": np.zeros(rows, dtype=np.float32),
+        }
+        for name in CATEGORICAL_FIELDS:
+            columns[name] = np.zeros(rows, dtype=np.uint16)
+        return columns
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def _grow(self):
+        """Make room for at least one more row at _end."""
+        live = self._end - self._start
+        if live >= self.capacity:
+            drop = min(self.chunk_rows, live)
+            self._start += drop
+            self.dropped += drop
+            live -= drop
+
+        rows = min(self.capacity, live + self.chunk_rows)
+        columns = self._allocate(rows)
+        for name, column in self._columns.items():
+            columns[name][:live] = column[self._start:self._end]
+        self._columns = columns
+        self._start, self._end = 0, live
+
+    def append(self, threat: Dict):
+        """
+        Add a threat as the newest row.
+
+        Args:
+            threat: Threat dict (model dump)
+        """
+        codes = {}
+        for name, field in CATEGORICAL_FIELDS.items():
+            dictionary = self._dictionaries[name]
+            if len(dictionary.values) > np.iinfo(np.uint16).max:
+                codes[name] = dictionary.lookup(threat.get(field)) or 0  # Dictionary full: new values count as missing
+            else:
+                codes[name] = dictionary.encode(threat.get(field))
+
+        with self._lock:
+            if self._end == len(self._columns["timestamp"]):
+                self._grow()
+            row = self._end
+            columns = self._columns
+            columns["timestamp"][row] = to_millis(threat["timestamp"])
+            columns["risk_score"][row] = threat.get("risk_score") or 0
+            columns["confidence"][row] = threat.get("confidence") or 0.0
+            for name, code in codes.items():
+                columns[name][row] = code
+            self._end = row + 1
+            self.appended += 1
+
+    def _snapshot(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {name: column[self._start:self._end] for name, column in self._columns.items()}
+
+    def aggregate(
+        self,
+        group_by: Sequence[str],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        filters: Optional[Dict[str, str]] = None,
+        limit: int = 1000
+    ) -> Dict:
+        """
+        Count threats and summarize risk per group.
+
+        Each group-by dimension is turned into an integer code column
+        (time bucket index or dictionary code); the codes are combined
+        into one key per row and reduced with np.unique / np.bincount.
+
+        Args:
+            group_by: Dimensions from GROUP_DIMENSIONS (may be empty)
+            since: Only threats at or after this time
+            until: Only threats at or before this time
+            filters: Categorical dimension -> required value
+            limit: Maximum number of groups to return
+
+        Returns:
+            Dictionary with the matched row count and groups, each with its
+            dimension values, count, avg/max risk_score and avg confidence.
+            Groups are in time order when grouping by a time bucket,
+            otherwise by count descending.
+
+        Raises:
+            ValueError: If a dimension is unknown
+        """
+        group_by = list(dict.fromkeys(group_by))
+        filters = filters or {}
+        unknown = [name for name in group_by if name not in GROUP_DIMENSIONS]
+        unknown += [name for name in filters if name not in CATEGORICAL_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {', '.join(unknown)}")
+
+        columns = self._snapshot()
+        mask = np.ones(len(columns["timestamp"]), dtype=bool)
+        if since is not None:
+            mask &= columns["timestamp"] >= to_millis(since)
+        if until is not None:
+            mask &= columns["timestamp"] <= to_millis(until)
+        for name, value in filters.items():
+            code = self._dictionaries[name].lookup(value)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= columns[name] == code
+
+        timestamps = columns["timestamp"][mask]
+        rows = len(timestamps)
+        if rows == 0:
+            return {"rows": 0, "groups": [], "truncated": False}
+        risk = columns["risk_score"][mask].astype(np.float64)
+        confidence = columns["confidence"][mask].astype(np.float64)
+
+        # Time buckets lead the combined key, so sorted keys are in time order
+        key_dims = [name for name in group_by if name in TIME_BUCKETS]
+        key_dims += [name for name in group_by if name not in TIME_BUCKETS]
+        codes, sizes, origins = [], [], {}
+        for name in key_dims:
+            if name in TIME_BUCKETS:
+                buckets = timestamps // TIME_BUCKETS[name]
+                origins[name] = int(buckets.min())
+                codes.append(buckets - origins[name])
+                sizes.append(int(buckets.max()) - origins[name] + 1)
+            else:
+                codes.append(columns[name][mask].astype(np.int64))
+                sizes.append(len(self._dictionaries[name].values))
+
+        if codes:
+            keys = np.ravel_multi_index(codes, sizes)
+            unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        else:
+            unique_keys = np.zeros(1, dtype=np.int64)
+            inverse = np.zeros(rows, dtype=np.int64)
+            counts = np.array([rows])
+        groups = len(unique_keys)
+
+        risk_sum = np.bincount(inverse, weights=risk, minlength=groups)
+        confidence_sum = np.bincount(inverse, weights=confidence, minlength=groups)
+        risk_max = np.full(groups, -np.inf)
+        np.maximum.at(risk_max, inverse, risk)
+
+        order = np.arange(groups) if origins else np.argsort(-counts, kind="stable")
+        order = order[:limit]
+        group_codes = np.unravel_index(unique_keys[order], sizes) if codes else []
+
+        result = []
+        for position, group in enumerate(order):
+            entry = {}
+            for name, dimension_codes in zip(key_dims, group_codes):
+                code = int(dimension_codes[position])
+                if name in TIME_BUCKETS:
+                    bucket_ms = (origins[name] + code) * TIME_BUCKETS[name]
+                    entry[name] = datetime.fromtimestamp(bucket_ms / 1000, tz=timezone.utc).isoformat()
+                else:
+                    entry[name] = self._dictionaries[name].values[code]
+            count = int(counts[group])
+            entry["count"] = count
+            entry["avg_risk_score"] = round(float(risk_sum[group]) / count, 2)
+            entry["max_risk_score"] = int(risk_max[group])
+            entry["avg_confidence"] = round(float(confidence_sum[group]) / count, 3)
+            result.append(entry)
+
+        return {"rows": rows, "groups": result, "truncated": groups > len(result)}
+
+    def get_state(self) -> Dict:
+        """Copy of the live rows and dictionaries (see load_state)."""
+        with self._lock:
+            return {
+                "columns": {name: column[self._start:self._end].copy() for name, column in self._columns.items()},
+                "dictionaries": {name: list(d.values) for name, d in self._dictionaries.items()},
+                "appended": self.appended,
+                "dropped": self.dropped,
+            }
+
+    def load_state(self, state: Dict):
+        """Replace the table with a get_state() copy, keeping the newest rows that fit."""
+        rows = len(state["columns"]["timestamp"])
+        keep = min(rows, self.capacity)
+        columns = self._allocate(min(self.capacity, keep + self.chunk_rows))
+        for name, column in state["columns"].items():
+            columns[name][:keep] = column[rows - keep:]
+
+        with self._lock:
+            self._dictionaries = {name: _Dictionary.from_values(values) for name, values in state["dictionaries"].items()}
+            self._columns = columns
+            self._start, self._end = 0, keep
+            self.appended = state["appended"]
+            self.dropped = state["dropped"] + rows - keep
+
+    def get_stats(self) -> Dict:
+        """Get row counts and memory usage."""
+        with self._lock:
+            allocated = len(self._columns["timestamp"])
+            row_bytes = sum(column.itemsize for column in self._columns.values())
+        return {
+            "rows": len(self),
+            "capacity": self.capacity,
+            "allocated_rows": allocated,
+            "memory_bytes": allocated * row_bytes,
+            "appended": self.appended,
+            "dropped": self.dropped,
+            "cardinality": {name: len(d.values) - 1 for name, d in self._dictionaries.items()},
+        }
@@ -0,0 +1,94 @@
+"""
+Bloom Filter
+Bit-array membership prefilter for integer keys (IPv4/IPv6 addresses)
+"""
+import math
+from typing import Dict
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finalizer on a Python int (must match _mix64_array)."""
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+    return x ^ (x >> 31)
+
+
+def _mix64_array(x: np.ndarray) -> np.ndarray:
+    """Vectorized splitmix64 finalizer over uint64 (wrapping arithmetic)."""
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def fold_key(key: int) -> int:
+    """Fold an integer of up to 128 bits into 64 bits."""
+    return (key ^ (key >> 64)) & _MASK64
+
+
+class BloomFilter:
+    """
+    Bloom filter over 64-bit integer keys.
+
+    Sized for the expected number of keys and a target false-positive
+    rate. Positions come from double hashing of two splitmix64 mixes, so
+    bulk inserts run vectorized in NumPy and single lookups need only
+    integer arithmetic.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+        self._array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+        self._view = memoryview(self._array)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._array.nbytes)
+
+    def add_many(self, keys: np.ndarray):
+        """Insert 64-bit keys (uint64 array) in bulk."""
+        if not len(keys):
+            return
+        keys = np.asarray(keys, dtype=np.uint64)
+        h1 = _mix64_array(keys)
+        h2 = _mix64_array(h1) | np.uint64(1)
+        bits = np.uint64(self.bits)
+        with np.errstate(over="ignore"):
+            for i in range(self.hashes):
+                positions = (h1 + np.uint64(i) * h2) % bits
+                np.bitwise_or.at(self._array, positions >> np.uint64(3), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(keys)
+
+    def __contains__(self, key: int) -> bool:
+        """Check a 64-bit key; False means definitely absent."""
+        h1 = _mix64(key)
+        h2 = _mix64(h1) | 1
+        bits = self.bits
+        view = self._view
+        for i in range(self.hashes):
+            position = (h1 + i * h2) & _MASK64
+            position %= bits
+            if not view[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def get_stats(self) -> Dict:
+        """Get sizing and expected false-positive rate."""
+        fill = self.count / self.capacity if self.capacity else 0.0
+        expected_fp = (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+        return {
+            "keys": self.count,
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "memory_bytes": self.nbytes,
+            "load": round(fill, 3),
+            "expected_false_positive_rate": round(expected_fp, 5),
+        }
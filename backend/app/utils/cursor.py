@@ -0,0 +1,40 @@
+"""
+Pagination Cursors
+Opaque keyset cursors over (timestamp, id)
+"""
+import base64
+from typing import Tuple
+
+
+def encode_cursor(timestamp_ms: int, item_id: str) -> str:
+    """
+    Build an opaque cursor for an item.
+
+    Args:
+        timestamp_ms: Item timestamp in ms since epoch
+        item_id: Item id (tie-breaker for equal timestamps)
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = f"{int(timestamp_ms)}|{item_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    Parse a cursor from encode_cursor().
+
+    Returns:
+        (timestamp_ms, item_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, item_id = raw.split("|", 1)
+        return int(timestamp), item_id
+    except (ValueError, UnicodeDecodeError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
@@ -0,0 +1,110 @@
+"""
+Dedicated Thread Pools
+Named, bounded executors for blocking work with utilization tracking
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class InstrumentedExecutor:
+    """
+    Bounded thread pool that reports its own utilization.
+
+    Each blocking subsystem (Vertex AI calls, Kafka polling, ...) gets its
+    own pool so a burst of slow work in one cannot starve the others the way
+    a shared default executor does.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"ts-{name}"
+        )
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._started_at = time.monotonic()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Submit a callable to the pool."""
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._busy_seconds += time.monotonic() - start
+            return result
+
+        return self._executor.submit(run)
+
+    def shutdown(self, wait: bool = False):
+        """Shut the pool down."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        """Get pool utilization statistics."""
+        with self._lock:
+            uptime = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "utilization": round(self._active / self.max_workers, 3),
+                "avg_utilization": round(self._busy_seconds / (uptime * self.max_workers), 3),
+            }
+
+
+# Registry of named pools
+_executors: Dict[str, InstrumentedExecutor] = {}
+
+
+def get_executor(name: str, max_workers: int) -> InstrumentedExecutor:
+    """Get (or create) the named process-wide executor."""
+    executor = _executors.get(name)
+    if executor is None:
+        executor = InstrumentedExecutor(name, max_workers)
+        _executors[name] = executor
+        logger.info(f"Executor '{name}' initialized with {executor.max_workers} workers")
+    return executor
+
+
+def get_executor_stats() -> Dict[str, Dict]:
+    """Get utilization statistics for every named executor."""
+    return {name: executor.get_stats() for name, executor in _executors.items()}
+
+
+def shutdown_executors():
+    """Shut down every named executor."""
+    for executor in _executors.values():
+        executor.shutdown(wait=False)
+    _executors.clear()
@@ -0,0 +1,230 @@
+"""
+GeoIP Range Database
+Sorted IPv4 range table in memory-mapped NumPy arrays with binary-search lookup
+"""
+import bisect
+import csv
+import hashlib
+import os
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "geoip_ranges.csv")
+
+UNKNOWN_COUNTRY = "ZZ"
+
+_CACHE_FILES = ("starts.npy", "ends.npy", "countries.npy", "index.npy", "codes.txt")
+
+# Ranges are bucketed by the top 16 address bits to narrow each binary search
+INDEX_SHIFT = 16
+
+_unpack_ipv4 = struct.Struct("!I").unpack
+_inet_aton = socket.inet_aton
+
+
+def ip_to_int(ip: str) -> Optional[int]:
+    """
+    Convert a dotted IPv4 address to an unsigned 32-bit integer.
+
+    Returns:
+        Integer address, or None if ip is not an IPv4 address
+    """
+    try:
+        return _unpack_ipv4(_inet_aton(ip))[0]
+    except (OSError, TypeError):
+        return None
+
+
+def _parse_bound(value: str) -> int:
+    """Parse a range bound given as a dotted IPv4 address or an integer."""
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    address = ip_to_int(value)
+    if address is None or value.count(".") != 3:
+        raise ValueError(f"Invalid IPv4 bound: {value!r}")
+    return address
+
+
+def load_ranges_csv(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """
+    Parse a start,end,country_code CSV into sorted parallel arrays.
+
+    Bounds may be dotted IPv4 addresses or integers (DB-IP / IP2Location
+    lite layouts). IPv6 rows, comments and a header row are skipped.
+
+    Returns:
+        (starts uint32, ends uint32, country index uint16, country codes)
+    """
+    rows = []
+    code_index: Dict[str, int] = {}
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for line_no, row in enumerate(csv.reader(f), start=1):
+            # Skip comments, the header row and IPv6 rows
+            if len(row) < 3 or not row[0].strip()[:1].isdigit() or ":" in row[0]:
+                continue
+            try:
+                start, end = _parse_bound(row[0]), _parse_bound(row[1])
+            except ValueError:
+                raise ValueError(f"{path}:{line_no}: invalid range {row[:2]}")
+            if start > end:
+                raise ValueError(f"{path}:{line_no}: start {row[0]} is after end {row[1]}")
+
+            code = row[2].strip().upper() or UNKNOWN_COUNTRY
+            rows.append((start, end, code_index.setdefault(code, len(code_index))))
+
+    rows.sort()
+    for (_, prev_end, _), (start, _, _) in zip(rows, rows[1:]):
+        if start <= prev_end:
+            raise ValueError(f"{path}: overlapping ranges at {socket.inet_ntoa(start.to_bytes(4, 'big'))}")
+
+    starts = np.fromiter((r[0] for r in rows), dtype=np.uint32, count=len(rows))
+    ends = np.fromiter((r[1] for r in rows), dtype=np.uint32, count=len(rows))
+    countries = np.fromiter((r[2] for r in rows), dtype=np.uint16, count=len(rows))
+    return starts, ends, countries, list(code_index)
+
+
+def build_prefix_index(starts: np.ndarray) -> np.ndarray:
+    """
+    First range index per /16 bucket.
+
+    index[k] is the position of the first range starting at or after
+    k << INDEX_SHIFT, so the range containing an address in bucket k lies
+    in [index[k] - 1, index[k + 1] - 1].
+    """
+    boundaries = np.arange((1 << (32 - INDEX_SHIFT)) + 1, dtype=np.uint64) << INDEX_SHIFT
+    return np.searchsorted(np.asarray(starts, dtype=np.uint64), boundaries, side="left").astype(np.uint32)
+
+
+class GeoIPDatabase:
+    """
+    Read-only IPv4 range -> country table.
+
+    The CSV is compiled once into .npy files under the cache directory
+    (keyed on the source file's path, size and mtime) and opened with
+    mmap_mode='r', so every worker process maps the same pages instead of
+    holding its own copy. Lookups use a /16 bucket index to narrow the
+    window, then bisect over a memoryview of the mapped start array: no
+    Python objects per range and no NumPy call overhead per lookup.
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_dir: Optional[str] = None):
+        self.path = path or DEFAULT_DATABASE_PATH
+        self.cache_dir = cache_dir
+
+        self.starts, self.ends, self.countries, self.index, self.codes = self._load()
+        self.mmapped = isinstance(self.starts, np.memmap)
+
+        # Plain memoryviews: indexing yields Python ints without NumPy scalar overhead
+        self._starts = memoryview(self.starts)
+        self._ends = memoryview(self.ends)
+        self._countries = memoryview(self.countries)
+        self._index = memoryview(self.index)
+
+        self.lookups = 0
+        self.misses = 0
+
+        logger.info(
+            f"🌍 GeoIP database loaded: {len(self.starts)} ranges, {len(self.codes)} countries, "
+            f"{self.nbytes / 1024:.1f} KiB ({'memory-mapped' if self.mmapped else 'in memory'})"
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the range table and bucket index arrays."""
+        return int(self.starts.nbytes + self.ends.nbytes + self.countries.nbytes + self.index.nbytes)
+
+    def lookup_int(self, address: int) -> Optional[str]:
+        """Country code for an integer IPv4 address, or None if not covered."""
+        self.lookups += 1
+        bucket = address >> INDEX_SHIFT
+        i = bisect.bisect_right(self._starts, address, self._index[bucket], self._index[bucket + 1]) - 1
+        if i >= 0 and address <= self._ends[i]:
+            return self.codes[self._countries[i]]
+        self.misses += 1
+        return None
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """
+        Lookup the country code for an IPv4 address.
+
+        Args:
+            ip: Dotted IPv4 address
+
+        Returns:
+            Two-letter country code, or None if invalid or not covered
+        """
+        address = ip_to_int(ip)
+        if address is None:
+            return None
+        return self.lookup_int(address)
+
+    def get_stats(self) -> Dict:
+        """Get table size and lookup statistics."""
+        return {
+            "path": self.path,
+            "ranges": len(self.starts),
+            "countries": len(self.codes),
+            "memory_bytes": self.nbytes,
+            "memory_mapped": self.mmapped,
+            "lookups": self.lookups,
+            "misses": self.misses,
+        }
+
+    def _load(self):
+        """Load from the compiled cache, rebuilding it when the source changed."""
+        if not self.cache_dir:
+            return self._load_in_memory()
+
+        stat = os.stat(self.path)
+        key = hashlib.blake2b(
+            f"{os.path.abspath(self.path)}:{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=8
+        ).hexdigest()
+        directory = os.path.join(self.cache_dir, key)
+
+        if not all(os.path.exists(os.path.join(directory, name)) for name in _CACHE_FILES):
+            self._build_cache(directory)
+
+        try:
+            starts = np.load(os.path.join(directory, "starts.npy"), mmap_mode="r")
+            ends = np.load(os.path.join(directory, "ends.npy"), mmap_mode="r")
+            countries = np.load(os.path.join(directory, "countries.npy"), mmap_mode="r")
+            index = np.load(os.path.join(directory, "index.npy"), mmap_mode="r")
+            with open(os.path.join(directory, "codes.txt"), "r", encoding="utf-8") as f:
+                codes = f.read().split()
+            return starts, ends, countries, index, codes
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  GeoIP cache unreadable ({e}), loading {self.path} into memory")
+            return self._load_in_memory()
+
+    def _load_in_memory(self):
+        starts, ends, countries, codes = load_ranges_csv(self.path)
+        return starts, ends, countries, build_prefix_index(starts), codes
+
+    def _build_cache(self, directory: str):
+        """Compile the CSV into .npy files; written to a temp dir and renamed atomically."""
+        starts, ends, countries, codes = load_ranges_csv(self.path)
+
+        tmp = f"{directory}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        np.save(os.path.join(tmp, "starts.npy"), starts)
+        np.save(os.path.join(tmp, "ends.npy"), ends)
+        np.save(os.path.join(tmp, "countries.npy"), countries)
+        np.save(os.path.join(tmp, "index.npy"), build_prefix_index(starts))
+        with open(os.path.join(tmp, "codes.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(codes))
+
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            # Another worker finished first - use its copy
+            for name in _CACHE_FILES:
+                os.remove(os.path.join(tmp, name))
+            os.rmdir(tmp)
+        logger.info(f"Compiled GeoIP ranges from {self.path} into {directory}")
@@ -0,0 +1,260 @@
+"""
+Inverted Index
+Incremental term -> posting list index over sequence-numbered documents, with boolean and prefix queries
+"""
+import bisect
+import heapq
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Letters/digits, keeping dotted and dashed identifiers (T1110.001, 10.0.0.1, cve-2024-1234) whole
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "with",
+})
+
+# A prefix query expands to at most this many terms
+MAX_PREFIX_TERMS = 256
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of a text, without stopwords and single characters."""
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+class _Postings:
+    """Ascending sequence numbers of one term; the oldest are dropped from the front."""
+
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs = array("q")
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def append(self, seq: int):
+        self.seqs.append(seq)
+
+    def drop_oldest(self, seq: int):
+        if self.head < len(self.seqs) and self.seqs[self.head] == seq:
+            self.head += 1
+            # Compact once the dead prefix is half the array (amortized O(1))
+            if self.head > 64 and self.head * 2 > len(self.seqs):
+                del self.seqs[:self.head]
+                self.head = 0
+
+    def __contains__(self, seq: int) -> bool:
+        i = bisect.bisect_left(self.seqs, seq, self.head)
+        return i < len(self.seqs) and self.seqs[i] == seq
+
+    def iter_newest(self) -> Iterator[int]:
+        seqs = self.seqs
+        for i in range(len(seqs) - 1, self.head - 1, -1):
+            yield seqs[i]
+
+
+class _Clause:
+    """A term or prefix* matched against the index (several postings for a prefix)."""
+
+    def __init__(self, postings: List[_Postings]):
+        self.postings = postings
+        self.size = sum(len(p) for p in postings)
+
+    def __contains__(self, seq: int) -> bool:
+        return any(seq in p for p in self.postings)
+
+    def iter_newest(self) -> Iterator[int]:
+        if len(self.postings) == 1:
+            return self.postings[0].iter_newest()
+        merged = heapq.merge(*(p.iter_newest() for p in self.postings), reverse=True)
+        return _unique(merged)
+
+
+def _unique(seqs: Iterable[int]) -> Iterator[int]:
+    """Drop repeats from a sorted stream."""
+    last = None
+    for seq in seqs:
+        if seq != last:
+            yield seq
+            last = seq
+
+
+def parse_query(query: str) -> List[Tuple[List[str], List[str]]]:
+    """
+    Parse a search query into OR-ed groups of AND-ed terms.
+
+    Syntax: whitespace-separated terms are AND-ed, the upper-case word OR
+    separates alternatives, a leading '-' (or NOT) negates a term and a
+    trailing '*' makes it a prefix match. Example:
+    "brute force -internal OR t1110*".
+
+    Returns:
+        [(positive terms, negative terms), ...]; prefix terms keep their '*'
+
+    Raises:
+        ValueError: If a group has no positive term
+    """
+    groups: List[Tuple[List[str], List[str]]] = [([], [])]
+    negate = False
+    for word in query.split():
+        if word == "OR":
+            groups.append(([], []))
+            continue
+        if word == "NOT":
+            negate = True
+            continue
+        if word.startswith("-") and len(word) > 1:
+            negate, word = True, word[1:]
+
+        prefix = word.endswith("*")
+        terms = tokenize(word.rstrip("*"))
+        if prefix and terms:
+            terms[-1] += "*"
+        positives, negatives = groups[-1]
+        (negatives if negate else positives).extend(terms)
+        negate = False
+
+    groups = [group for group in groups if group[0] or group[1]]
+    if not groups:
+        raise ValueError("Empty search query")
+    if any(not positives for positives, _ in groups):
+        raise ValueError("Every OR branch needs at least one non-negated term")
+    return groups
+
+
+class InvertedIndex:
+    """
+    Term -> posting list index over documents numbered by increasing seq.
+
+    Documents must be added in seq order and removed oldest first (ring
+    buffer eviction order), so each posting list stays sorted, appends
+    at the end and drops from the front. Queries walk the shortest
+    posting list of each AND group newest-first and check the other
+    terms by binary search, so they stop after `limit` hits instead of
+    materializing every match.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, _Postings] = {}
+        self._terms: List[str] = []  # Sorted vocabulary for prefix lookups
+        self.documents = 0
+
+    def __len__(self) -> int:
+        return self.documents
+
+    def add(self, seq: int, terms: Iterable[str]):
+        """
+        Index a document.
+
+        Args:
+            seq: Document sequence number (greater than any indexed so far)
+            terms: Document terms (duplicates are ignored)
+        """
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+                bisect.insort(self._terms, term)
+            postings.append(seq)
+        self.documents += 1
+
+    def remove(self, seq: int, terms: Iterable[str]):
+        """
+        Drop the oldest indexed document.
+
+        Args:
+            seq: Its sequence number
+            terms: The terms it was added with
+        """
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.drop_oldest(seq)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+        self.documents -= 1
+
+    def _clause(self, term: str) -> _Clause:
+        if not term.endswith("*"):
+            postings = self._postings.get(term)
+            return _Clause([postings] if postings else [])
+
+        prefix = term[:-1]
+        start = bisect.bisect_left(self._terms, prefix)
+        matches = []
+        for candidate in self._terms[start:start + MAX_PREFIX_TERMS]:
+            if not candidate.startswith(prefix):
+                break
+            matches.append(self._postings[candidate])
+        return _Clause(matches)
+
+    def _iter_group(self, positives: List[str], negatives: List[str]) -> Iterator[int]:
+        required = sorted((self._clause(term) for term in positives), key=lambda clause: clause.size)
+        if not required[0].size:
+            return iter(())
+        excluded = [self._clause(term) for term in negatives]
+        driver, others = required[0], required[1:]
+        return (
+            seq for seq in driver.iter_newest()
+            if all(seq in clause for clause in others) and not any(seq in clause for clause in excluded)
+        )
+
+    def search(self, query: str, limit: int = 50, min_seq: int = 0) -> List[int]:
+        """
+        Find documents matching a query (see parse_query for the syntax).
+
+        Args:
+            query: Search query
+            limit: Maximum number of results
+            min_seq: Ignore documents below this sequence number
+
+        Returns:
+            Matching sequence numbers, newest first
+
+        Raises:
+            ValueError: If the query is empty or invalid
+        """
+        groups = parse_query(query)
+        streams = [self._iter_group(positives, negatives) for positives, negatives in groups]
+        seqs = streams[0] if len(streams) == 1 else _unique(heapq.merge(*streams, reverse=True))
+
+        results: List[int] = []
+        for seq in seqs:
+            if seq < min_seq or len(results) >= limit:
+                break
+            results.append(seq)
+        return results
+
+    def get_state(self) -> Dict:
+        """Copy of the posting lists (see load_state)."""
+        return {
+            "documents": self.documents,
+            "postings": {term: postings.seqs[postings.head:] for term, postings in self._postings.items()},
+        }
+
+    def load_state(self, state: Dict):
+        """Replace the index with a get_state() copy."""
+        self._postings = {}
+        for term, seqs in state["postings"].items():
+            postings = self._postings[term] = _Postings()
+            postings.seqs = array("q", seqs)
+        self._terms = sorted(self._postings)
+        self.documents = state["documents"]
+
+    def get_stats(self) -> Dict:
+        """Get document, term and posting counts."""
+        return {
+            "documents": self.documents,
+            "terms": len(self._postings),
+            "postings": sum(len(p) for p in self._postings.values()),
+        }
@@ -1,13 +1,13 @@
 """
 IP Address Utilities
 """
-import ipaddress
 from typing import Tuple, Optional
+from app.utils.prefix_trie import INTERNAL_LABELS, get_prefix_table, parse_ip
 
 
 def is_private_ip(ip: str) -> bool:
     """
-    Check if an IP address is private (RFC 1918).
+    Check if an IP address is private or otherwise non-routable (IPv4 or IPv6).
 
     Args:
         ip: IP address string
@@ -15,11 +15,7 @@ def is_private_ip(ip: str) -> bool:
     Returns:
         True if private, False otherwise
     """
-    try:
-        ip_obj = ipaddress.ip_address(ip)
-        return ip_obj.is_private
-    except ValueError:
-        return False
+    return get_prefix_table().lookup(ip) in INTERNAL_LABELS
 
 
 def is_valid_ip(ip: str) -> bool:
@@ -32,11 +28,7 @@ def is_valid_ip(ip: str) -> bool:
     Returns:
         True if valid, False otherwise
     """
-    try:
-        ipaddress.ip_address(ip)
-        return True
-    except ValueError:
-        return False
+    return parse_ip(ip) is not None
 
 
 def get_ip_type(ip: str) -> str:
@@ -49,50 +41,69 @@ def get_ip_type(ip: str) -> str:
     Returns:
         String: 'private', 'public', 'loopback', or 'invalid'
     """
-    try:
-        ip_obj = ipaddress.ip_address(ip)
-
-        if ip_obj.is_loopback:
-            return "loopback"
-        elif ip_obj.is_private:
-            return "private"
-        else:
-            return "public"
-    except ValueError:
+    parsed = parse_ip(ip)
+    if parsed is None:
         return "invalid"
 
+    label = get_prefix_table().lookup_int(*parsed)
+    if label == "LOOPBACK":
+        return "loopback"
+    elif label in INTERNAL_LABELS:
+        return "private"
+    else:
+        return "public"
+
+
+# High-risk countries
+HOSTILE_COUNTRIES = frozenset({"RU", "CN", "KP", "IR"})
 
-def classify_source_zone(ip: str, country_code: Optional[str] = None) -> str:
+# Trusted partners
+TRUSTED_COUNTRIES = frozenset()  # Add your trusted partner countries
+
+
+def classify_country_zone(country_code: Optional[str], threat_intel_listed: bool = False) -> str:
+    """
+    Classify a public source into a threat zone by country and threat intel.
+
+    Args:
+        country_code: Two-letter country code
+        threat_intel_listed: Source appears on a threat-intel blocklist
+
+    Returns:
+        Zone classification: EXTERNAL, HOSTILE, TRUSTED
+    """
+    if threat_intel_listed:
+        return "HOSTILE_ZONE"
+
+    if country_code:
+        if country_code in HOSTILE_COUNTRIES:
+            return "HOSTILE_ZONE"
+        elif country_code in TRUSTED_COUNTRIES:
+            return "TRUSTED_ZONE"
+
+    return "EXTERNAL_ZONE"
+
+
+def classify_source_zone(ip: str, country_code: Optional[str] = None, threat_intel_listed: bool = False) -> str:
     """
     Classify the source into a threat zone.
 
     Args:
         ip: Source IP address
         country_code: Two-letter country code
+        threat_intel_listed: Source appears on a threat-intel blocklist
 
     Returns:
         Zone classification: INTERNAL, EXTERNAL, HOSTILE, TRUSTED
     """
-    # High-risk countries
-    HOSTILE_COUNTRIES = ["RU", "CN", "KP", "IR"]
-
-    # Trusted partners
-    TRUSTED_COUNTRIES = []  # Add your trusted partner countries
-
     # Check IP type
     ip_type = get_ip_type(ip)
 
     if ip_type == "private" or ip_type == "loopback":
         return "INTERNAL_ZONE"
 
-    # Check country
-    if country_code:
-        if country_code in HOSTILE_COUNTRIES:
-            return "HOSTILE_ZONE"
-        elif country_code in TRUSTED_COUNTRIES:
-            return "TRUSTED_ZONE"
-
-    return "EXTERNAL_ZONE"
+    # Check threat intel, then country
+    return classify_country_zone(country_code, threat_intel_listed)
 
 
 def get_country_risk_multiplier(country_code: str) -> float:
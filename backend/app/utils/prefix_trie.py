@@ -0,0 +1,354 @@
+"""
+IP Prefix Trie
+Path-compressed binary radix (Patricia) trie for IPv4/IPv6 longest-prefix match
+"""
+import os
+import socket
+import struct
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PREFIX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ip_prefixes.txt")
+
+# Special-use labels treated as internal (non-routable) address space
+INTERNAL_LABELS = frozenset({
+    "PRIVATE", "LOOPBACK", "LINK_LOCAL", "CGNAT", "UNIQUE_LOCAL",
+    "UNSPECIFIED", "RESERVED", "DOCUMENTATION",
+})
+
+# Labels of the form CC:<country code> carry geolocation
+COUNTRY_LABEL_PREFIX = "CC:"
+
+_unpack_ipv4 = struct.Struct("!I").unpack
+_unpack_ipv6 = struct.Struct("!QQ").unpack
+_inet_pton = socket.inet_pton
+_AF_INET = socket.AF_INET
+_AF_INET6 = socket.AF_INET6
+
+
+def parse_ip(ip: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse an IPv4 or IPv6 address.
+
+    IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) are returned as IPv4 and
+    zone ids (fe80::1%eth0) are ignored.
+
+    Returns:
+        (version, integer address), or None if ip is not an IP address
+    """
+    try:
+        if ":" not in ip:
+            return 4, _unpack_ipv4(_inet_pton(_AF_INET, ip))[0]
+        high, low = _unpack_ipv6(_inet_pton(_AF_INET6, ip.split("%", 1)[0]))
+    except (OSError, TypeError, ValueError):
+        return None
+
+    if high == 0 and (low >> 32) == 0xFFFF:
+        return 4, low & 0xFFFFFFFF
+    return 6, (high << 64) | low
+
+
+def parse_prefix(prefix: str) -> Tuple[int, int, int]:
+    """
+    Parse CIDR notation.
+
+    Returns:
+        (version, network address as int, prefix length)
+
+    Raises:
+        ValueError: If the prefix is malformed
+    """
+    address, _, length = prefix.strip().partition("/")
+    parsed = parse_ip(address)
+    if parsed is None or ("." in address and ":" in address):
+        raise ValueError(f"Invalid prefix: {prefix!r}")
+
+    version, value = parsed
+    width = 32 if version == 4 else 128
+    bits = int(length) if length else width
+    if not 0 <= bits <= width:
+        raise ValueError(f"Invalid prefix length: {prefix!r}")
+
+    # Clear host bits
+    return version, (value >> (width - bits)) << (width - bits) if bits else 0, bits
+
+
+class _Node:
+    """Trie node: the top `length` bits of its prefix, right-aligned in `key`."""
+
+    __slots__ = ("key", "length", "value", "zero", "one")
+
+    def __init__(self, key: int, length: int, value: Any = None):
+        self.key = key
+        self.length = length
+        self.value = value
+        self.zero = None
+        self.one = None
+
+
+class PrefixTrie:
+    """
+    Binary radix trie with path compression over fixed-width integer keys.
+
+    Each edge skips any run of bits without a branch or stored prefix, so
+    a lookup visits at most one node per distinct prefix on the path
+    rather than one per bit.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.root = _Node(0, 0)
+        self.size = 0
+        self.nodes = 1
+
+    def insert(self, network: int, length: int, value: Any):
+        """
+        Store a value for a prefix (replacing any existing value).
+
+        Args:
+            network: Network address as an integer of `width` bits
+            length: Prefix length in bits
+            value: Value returned for addresses under this prefix
+        """
+        width = self.width
+        key = network >> (width - length) if length else 0
+        node = self.root
+
+        while True:
+            if node.length == length:
+                if node.value is None:
+                    self.size += 1
+                node.value = value
+                return
+
+            bit = (network >> (width - 1 - node.length)) & 1
+            child = node.one if bit else node.zero
+
+            if child is None:
+                self._attach(node, bit, self._new_node(key, length, value))
+                return
+
+            # Length of the prefix shared by the new key and the child's key
+            span = min(child.length, length)
+            diff = (child.key >> (child.length - span)) ^ (key >> (length - span))
+            common = span - diff.bit_length()
+
+            if common == child.length:
+                node = child
+                continue
+
+            # Split the edge at the first differing bit
+            if common == length:
+                middle = self._new_node(key, length, value)
+            else:
+                middle = self._new_node(key >> (length - common), common)
+                self._attach(middle, (key >> (length - common - 1)) & 1, self._new_node(key, length, value))
+            self._attach(middle, (child.key >> (child.length - common - 1)) & 1, child)
+            self._attach(node, bit, middle)
+            return
+
+    def _new_node(self, key: int, length: int, value: Any = None) -> _Node:
+        self.nodes += 1
+        if value is not None:
+            self.size += 1
+        return _Node(key, length, value)
+
+    @staticmethod
+    def _attach(parent: _Node, bit: int, child: _Node):
+        if bit:
+            parent.one = child
+        else:
+            parent.zero = child
+
+    def lookup(self, address: int) -> Any:
+        """
+        Longest-prefix match.
+
+        Args:
+            address: Address as an integer of `width` bits
+
+        Returns:
+            Value of the longest stored prefix containing address, or None
+        """
+        width = self.width
+        node = self.root
+        best = node.value
+
+        while node.length < width:
+            node = node.one if (address >> (width - 1 - node.length)) & 1 else node.zero
+            if node is None or (address >> (width - node.length)) != node.key:
+                break
+            if node.value is not None:
+                best = node.value
+
+        return best
+
+    def __len__(self) -> int:
+        return self.size
+
+    def values(self) -> Iterator[Any]:
+        """Iterate over stored values (prefix order is not guaranteed)."""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.value is not None:
+                yield node.value
+            stack.extend(child for child in (node.zero, node.one) if child is not None)
+
+    def flatten(self) -> List[Tuple[int, int, Any]]:
+        """
+        Expand longest-prefix-match results into disjoint address ranges.
+
+        Returns:
+            Sorted (first, last, value) ranges; adjacent ranges with equal
+            values are merged and uncovered space is omitted
+        """
+        ranges: List[List] = []
+
+        def emit(first: int, last: int, value: Any):
+            if value is None:
+                return
+            if ranges and ranges[-1][2] == value and ranges[-1][1] + 1 == first:
+                ranges[-1][1] = last
+            else:
+                ranges.append([first, last, value])
+
+        def visit(node: _Node, inherited: Any):
+            value = node.value if node.value is not None else inherited
+            shift = self.width - node.length
+            cursor = node.key << shift
+            for child in (node.zero, node.one):
+                if child is None:
+                    continue
+                child_shift = self.width - child.length
+                child_first = child.key << child_shift
+                if cursor < child_first:
+                    emit(cursor, child_first - 1, value)
+                visit(child, value)
+                cursor = child_first + (1 << child_shift)
+            last = ((node.key + 1) << shift) - 1
+            if cursor <= last:
+                emit(cursor, last, value)
+
+        visit(self.root, None)
+        return [tuple(r) for r in ranges]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by nodes and their keys."""
+        total = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node) + sys.getsizeof(node.key)
+            stack.extend(child for child in (node.zero, node.one) if child is not None)
+        return total
+
+
+class IPPrefixTable:
+    """
+    Dual-stack prefix table: one PrefixTrie per address family.
+
+    Values are labels from the prefix file, e.g. PRIVATE, LOOPBACK or
+    CC:JP. Lookups accept address strings or pre-parsed integers.
+    """
+
+    def __init__(self, prefixes: Iterable[Tuple[str, Any]] = ()):
+        self.v4 = PrefixTrie(32)
+        self.v6 = PrefixTrie(128)
+        self.source: Optional[str] = None
+        self.build_ms = 0.0
+        for prefix, label in prefixes:
+            self.insert(prefix, label)
+
+    def insert(self, prefix: str, label: Any):
+        """Add a CIDR prefix (IPv4 or IPv6) with its label."""
+        version, network, length = parse_prefix(prefix)
+        (self.v4 if version == 4 else self.v6).insert(network, length, label)
+
+    def lookup(self, ip: str) -> Any:
+        """
+        Longest-prefix match for an address string.
+
+        Returns:
+            Label of the most specific matching prefix, or None if the
+            address is invalid or not covered
+        """
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return None
+        return self.lookup_int(*parsed)
+
+    def lookup_int(self, version: int, address: int) -> Any:
+        """Longest-prefix match for a parsed (version, address) pair."""
+        return (self.v4 if version == 4 else self.v6).lookup(address)
+
+    def labels(self) -> Set[Any]:
+        """Distinct labels stored in either trie."""
+        return set(self.v4.values()) | set(self.v6.values())
+
+    def get_stats(self) -> Dict:
+        """Get prefix counts, node counts, memory and build time."""
+        return {
+            "source": self.source,
+            "ipv4_prefixes": len(self.v4),
+            "ipv6_prefixes": len(self.v6),
+            "nodes": self.v4.nodes + self.v6.nodes,
+            "memory_bytes": self.v4.nbytes + self.v6.nbytes,
+            "build_ms": round(self.build_ms, 2),
+        }
+
+
+def load_prefix_file(path: str) -> IPPrefixTable:
+    """
+    Build an IPPrefixTable from a prefix file.
+
+    Each non-comment line is "<cidr> <label>"; later lines override
+    earlier ones for the same prefix.
+
+    Raises:
+        ValueError: If a line is malformed
+    """
+    started = time.perf_counter()
+    table = IPPrefixTable()
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                raise ValueError(f"{path}:{line_no}: expected '<cidr> <label>'")
+            try:
+                table.insert(parts[0], parts[1])
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from e
+
+    table.source = path
+    table.build_ms = (time.perf_counter() - started) * 1000
+    return table
+
+
+# Global instance
+_prefix_table = None
+
+
+def get_prefix_table() -> IPPrefixTable:
+    """Get the global IPPrefixTable, built from IP_PREFIXES_PATH on first use."""
+    global _prefix_table
+    if _prefix_table is None:
+        from app.config import settings
+
+        path = settings.ip_prefixes_path or DEFAULT_PREFIX_PATH
+        _prefix_table = load_prefix_file(path)
+        stats = _prefix_table.get_stats()
+        logger.info(
+            f"Loaded IP prefix trie from {path}: {stats['ipv4_prefixes']} IPv4 / "
+            f"{stats['ipv6_prefixes']} IPv6 prefixes in {stats['build_ms']}ms"
+        )
+    return _prefix_table
@@ -0,0 +1,135 @@
+"""
+Indexed Ring Buffer
+Fixed-capacity newest-first store with O(1) append, eviction and lookup by id
+"""
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class IndexedRingBuffer:
+    """
+    Fixed-capacity ring buffer with a key -> sequence number index.
+
+    Every appended item gets a monotonically increasing sequence number;
+    its slot is seq % capacity. Once full, each append overwrites the
+    oldest item and drops its key from the index, so append, lookup by
+    key or seq, and reading the newest k items never touch the rest of
+    the buffer.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._items: List[Any] = [None] * capacity
+        self._keys: List[Optional[Hashable]] = [None] * capacity
+        self._index: Dict[Hashable, int] = {}
+        self._next_seq = 0
+
+    def __len__(self) -> int:
+        return min(self._next_seq, self.capacity)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    @property
+    def next_seq(self) -> int:
+        """Sequence number the next append will get."""
+        return self._next_seq
+
+    @property
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest retained item."""
+        return max(0, self._next_seq - self.capacity)
+
+    def append(self, key: Hashable, item: Any) -> Tuple[int, Optional[Any]]:
+        """
+        Add an item as the newest entry.
+
+        A key that is already present is re-pointed at the new entry; the
+        older copy stays in its slot until it ages out.
+
+        Args:
+            key: Unique id for lookups
+            item: Item to store
+
+        Returns:
+            (sequence number of the new item, evicted item or None)
+        """
+        seq = self._next_seq
+        slot = seq % self.capacity
+        evicted = None
+
+        if seq >= self.capacity:
+            evicted = self._items[slot]
+            evicted_key = self._keys[slot]
+            # Only drop the index entry if it still points at the evicted copy
+            if self._index.get(evicted_key) == seq - self.capacity:
+                del self._index[evicted_key]
+
+        self._items[slot] = item
+        self._keys[slot] = key
+        self._index[key] = seq
+        self._next_seq = seq + 1
+        return seq, evicted
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Item stored under key, or None if absent or evicted."""
+        seq = self._index.get(key)
+        if seq is None:
+            return None
+        return self._items[seq % self.capacity]
+
+    def seq_of(self, key: Hashable) -> Optional[int]:
+        """Sequence number of the item stored under key."""
+        return self._index.get(key)
+
+    def get_seq(self, seq: int) -> Optional[Any]:
+        """Item with the given sequence number, or None if not retained."""
+        if self.oldest_seq <= seq < self._next_seq:
+            return self._items[seq % self.capacity]
+        return None
+
+    def iter_newest(self, before: Optional[int] = None) -> Iterator[Any]:
+        """
+        Iterate items newest-first.
+
+        Args:
+            before: Only yield items with a sequence number below this
+        """
+        start = self._next_seq if before is None else min(before, self._next_seq)
+        items = self._items
+        capacity = self.capacity
+        for seq in range(start - 1, self.oldest_seq - 1, -1):
+            yield items[seq % capacity]
+
+    def get_state(self) -> Dict:
+        """Copy of the buffer contents (see load_state)."""
+        return {
+            "capacity": self.capacity,
+            "items": list(self._items),
+            "keys": list(self._keys),
+            "next_seq": self._next_seq,
+        }
+
+    def load_state(self, state: Dict):
+        """
+        Replace the contents with a get_state() copy.
+
+        Raises:
+            ValueError: If the state was taken at a different capacity
+        """
+        if state["capacity"] != self.capacity:
+            raise ValueError(f"capacity mismatch ({state['capacity']} != {self.capacity})")
+        self._items = list(state["items"])
+        self._keys = list(state["keys"])
+        self._next_seq = state["next_seq"]
+        self._index = {}
+        for seq in range(self.oldest_seq, self._next_seq):
+            self._index[self._keys[seq % self.capacity]] = seq
+
+    def newest(self, limit: int) -> List[Any]:
+        """The newest `limit` items, newest first."""
+        items = self._items
+        capacity = self.capacity
+        stop = max(self.oldest_seq, self._next_seq - limit)
+        return [items[seq % capacity] for seq in range(self._next_seq - 1, stop - 1, -1)]
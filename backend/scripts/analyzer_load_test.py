@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Analyzer Load Test Script
+Drives GeminiThreatAnalyzer against the local mock model (no Vertex AI project needed)
+
+Usage:
+    python scripts/analyzer_load_test.py --events 2000 --concurrency 100 \
+        --latency-ms 600 --error-rate 0.05 --timeout-rate 0.01
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+EVENT_TYPES = ['brute_force', 'sql_injection', 'ddos', 'port_scan', 'malware', 'authentication', 'api_request']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the analyzer against the mock Gemini model")
+    parser.add_argument('--events', type=int, default=1000, help='Total events to analyze')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent analyze() calls')
+    parser.add_argument('--unique-sources', type=int, default=200, help='Distinct attacker IPs (drives cache reuse)')
+    parser.add_argument('--latency-ms', type=float, default=800, help='Median mock latency')
+    parser.add_argument('--distribution', default='lognormal', choices=['fixed', 'uniform', 'lognormal'])
+    parser.add_argument('--jitter', type=float, default=0.5, help='Uniform spread / lognormal sigma')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with 429')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Fraction of calls hanging until timeout')
+    parser.add_argument('--timeout-ms', type=float, default=5000, help='Injected timeout duration')
+    parser.add_argument('--stream', action='store_true', help='Use the streaming path with provisional callbacks')
+    parser.add_argument('--seed', type=int, default=7)
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Point settings at the mock model before the app is imported."""
+    os.environ['GEMINI_MOCK_ENABLED'] = 'true'
+    os.environ['GEMINI_MOCK_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['GEMINI_MOCK_LATENCY_DISTRIBUTION'] = args.distribution
+    os.environ['GEMINI_MOCK_LATENCY_JITTER'] = str(args.jitter)
+    os.environ['GEMINI_MOCK_ERROR_RATE'] = str(args.error_rate)
+    os.environ['GEMINI_MOCK_TIMEOUT_RATE'] = str(args.timeout_rate)
+    os.environ['GEMINI_MOCK_TIMEOUT_MS'] = str(args.timeout_ms)
+    os.environ.setdefault('ANALYSIS_CACHE_PATH', '')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def make_event(rng: random.Random, i: int, unique_sources: int) -> dict:
+    """Create a synthetic security event."""
+    event_type = rng.choice(EVENT_TYPES)
+    source = rng.randrange(unique_sources)
+    return {
+        'event_id': f'load-{i}',
+        'timestamp': '2025-01-01T00:00:00Z',
+        'event_type': event_type,
+        'source_ip': f'185.{source // 250}.{source % 250}.{rng.randrange(1, 4)}',
+        'destination_ip': '10.0.0.10',
+        'destination_port': rng.choice([22, 80, 443, 3306]),
+        'protocol': 'TCP',
+        'payload': {
+            'attempts': rng.randrange(10, 500),
+            'usernames': rng.sample(['admin', 'root', 'user', 'test', 'oracle'], 2),
+        },
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(args):
+    from app.core.gemini_analyzer import get_gemini_analyzer
+
+    analyzer = get_gemini_analyzer()
+    rng = random.Random(args.seed)
+    events = [make_event(rng, i, args.unique_sources) for i in range(args.events)]
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    audit_refs = Counter()
+    provisional_count = 0
+
+    async def on_provisional(_):
+        nonlocal provisional_count
+        provisional_count += 1
+
+    async def one(event):
+        async with semaphore:
+            started = time.perf_counter()
+            analysis = await analyzer.analyze(event, on_provisional=on_provisional if args.stream else None)
+            latencies.append((time.perf_counter() - started) * 1000)
+            audit_refs[analysis.audit_ref] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(e) for e in events))
+    elapsed = time.perf_counter() - started
+
+    metrics = analyzer.get_metrics()
+
+    print("=" * 60)
+    print("🧪 ThreatStream Analyzer Load Test (mock Gemini)")
+    print("=" * 60)
+    print(f"   Events:        {args.events} @ concurrency {args.concurrency}")
+    print(f"   Throughput:    {args.events / elapsed:.1f} events/s ({elapsed:.2f}s)")
+    print(f"   Latency p50:   {percentile(latencies, 0.50):.1f} ms")
+    print(f"   Latency p95:   {percentile(latencies, 0.95):.1f} ms")
+    print(f"   Latency p99:   {percentile(latencies, 0.99):.1f} ms")
+    if args.stream:
+        print(f"   Provisional:   {provisional_count}")
+    print("\n📋 Results by audit_ref:")
+    for ref, count in audit_refs.most_common():
+        print(f"   {ref:<28} {count}")
+    print("\n📊 Analyzer metrics:")
+    print(f"   Model calls:   {metrics['mock']}")
+    print(f"   Cache:         {metrics['cache']}")
+    print(f"   Similarity:    {metrics['similarity']}")
+    print(f"   Executor:      {metrics['executor']}")
+    print(f"   Streaming:     {metrics['streaming']}")
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+IP Lookup Benchmark
+Measures build time, memory and lookup throughput of the prefix trie and GeoIP range database
+
+Usage:
+    python scripts/benchmark_ip_lookup.py --lookups 200000
+    python scripts/benchmark_ip_lookup.py --synthetic-prefixes 100000
+"""
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.geo_service import GeoService
+from app.utils.geoip_database import GeoIPDatabase
+from app.utils.prefix_trie import IPPrefixTable, load_prefix_file, parse_ip, DEFAULT_PREFIX_PATH
+
+
+def random_ipv4(rng: random.Random) -> str:
+    return str(ipaddress.IPv4Address(rng.getrandbits(32)))
+
+
+def random_ipv6(rng: random.Random) -> str:
+    # Mostly global unicast (2000::/3), where the geo prefixes live
+    return str(ipaddress.IPv6Address((0x2 << 125) | rng.getrandbits(125)))
+
+
+def measure_build(build):
+    """Run a builder and return (result, seconds, traced bytes)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def measure_lookups(lookup, keys) -> float:
+    """Return lookups per second."""
+    started = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return len(keys) / (time.perf_counter() - started)
+
+
+def build_synthetic(count: int, rng: random.Random) -> IPPrefixTable:
+    """Random IPv4 /16-/32 and IPv6 /29-/64 prefixes (roughly BGP-table shaped)."""
+    table = IPPrefixTable()
+    for i in range(count):
+        if rng.random() < 0.8:
+            length = rng.choice([16, 20, 22, 24, 24, 24, 28, 32])
+            table.v4.insert((rng.getrandbits(32) >> (32 - length)) << (32 - length), length, f"CC:{i % 200}")
+        else:
+            length = rng.choice([29, 32, 32, 36, 48, 48, 64])
+            network = ((0x2 << 125) | rng.getrandbits(125)) >> (128 - length) << (128 - length)
+            table.v6.insert(network, length, f"CC:{i % 200}")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IP prefix trie and GeoIP lookups")
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--prefixes', default=DEFAULT_PREFIX_PATH, help='Prefix file for the trie')
+    parser.add_argument('--synthetic-prefixes', type=int, default=0,
+                        help='Also build a trie of N random prefixes to show scaling')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    ipv4 = [random_ipv4(rng) for _ in range(args.lookups)]
+    ipv6 = [random_ipv6(rng) for _ in range(args.lookups)]
+    parsed_v4 = [parse_ip(ip)[1] for ip in ipv4]
+    parsed_v6 = [parse_ip(ip)[1] for ip in ipv6]
+
+    print("=" * 60)
+    print("🌐 ThreatStream IP Lookup Benchmark")
+    print("=" * 60)
+
+    table, build_s, traced = measure_build(lambda: load_prefix_file(args.prefixes))
+    stats = table.get_stats()
+    print(f"\n📂 Prefix trie ({args.prefixes})")
+    print(f"   Prefixes:      {stats['ipv4_prefixes']} IPv4 / {stats['ipv6_prefixes']} IPv6 ({stats['nodes']} nodes)")
+    print(f"   Build:         {build_s * 1000:.2f} ms")
+    print(f"   Memory:        {stats['memory_bytes'] / 1024:.1f} KiB (traced {traced / 1024:.1f} KiB)")
+    print(f"   IPv4 str:      {measure_lookups(table.lookup, ipv4):,.0f} lookups/s")
+    print(f"   IPv6 str:      {measure_lookups(table.lookup, ipv6):,.0f} lookups/s")
+    print(f"   IPv4 int:      {measure_lookups(table.v4.lookup, parsed_v4):,.0f} lookups/s")
+    print(f"   IPv6 int:      {measure_lookups(table.v6.lookup, parsed_v6):,.0f} lookups/s")
+
+    if args.synthetic_prefixes:
+        synthetic, build_s, traced = measure_build(lambda: build_synthetic(args.synthetic_prefixes, rng))
+        stats = synthetic.get_stats()
+        print(f"\n🧪 Synthetic trie ({args.synthetic_prefixes} random prefixes)")
+        print(f"   Prefixes:      {stats['ipv4_prefixes']} IPv4 / {stats['ipv6_prefixes']} IPv6 ({stats['nodes']} nodes)")
+        print(f"   Build:         {build_s * 1000:.2f} ms ({args.synthetic_prefixes / build_s:,.0f} inserts/s)")
+        print(f"   Memory:        {stats['memory_bytes'] / 1024 / 1024:.2f} MiB (traced {traced / 1024 / 1024:.2f} MiB)")
+        print(f"   IPv4 int:      {measure_lookups(synthetic.v4.lookup, parsed_v4):,.0f} lookups/s")
+        print(f"   IPv6 int:      {measure_lookups(synthetic.v6.lookup, parsed_v6):,.0f} lookups/s")
+
+    database, build_s, _ = measure_build(lambda: GeoIPDatabase())
+    stats = database.get_stats()
+    print(f"\n🌍 GeoIP range database ({stats['path']})")
+    print(f"   Ranges:        {stats['ranges']} ({stats['countries']} countries)")
+    print(f"   Load:          {build_s * 1000:.2f} ms")
+    print(f"   Memory:        {stats['memory_bytes'] / 1024:.1f} KiB")
+    print(f"   IPv4 str:      {measure_lookups(database.lookup, ipv4):,.0f} lookups/s")
+    print(f"   IPv4 int:      {measure_lookups(database.lookup_int, parsed_v4):,.0f} lookups/s")
+
+    geo = GeoService()
+    mixed = ipv4[: args.lookups // 2] + ipv6[: args.lookups // 2]
+    print("\n📍 GeoService.lookup_ip (IPv4 + IPv6, includes zone and risk)")
+    print(f"   Throughput:    {measure_lookups(geo.lookup_ip, mixed):,.0f} lookups/s")
+
+    print("\n📦 GeoService.lookup_many (batches of 100, columnar)")
+    batches = [mixed[i:i + 100] for i in range(0, len(mixed), 100)]
+    started = time.perf_counter()
+    for batch in batches:
+        geo.lookup_many(batch)
+    print(f"   Throughput:    {len(mixed) / (time.perf_counter() - started):,.0f} lookups/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Threat Store Benchmark
+Compares the in-memory threat store against the previous list-based store at large capacity
+
+Usage:
+    python scripts/benchmark_threat_store.py --capacity 100000 --inserts 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.firestore_service import FirestoreService
+
+SEVERITIES = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INFO']
+THREAT_TYPES = ['BRUTE_FORCE', 'SQL_INJECTION', 'DDOS_ATTACK', 'PORT_SCAN', 'MALWARE', 'NORMAL']
+
+
+class _Stored:
+    """Stand-in for a Threat model: store_threat only needs .id and .dict()."""
+
+    __slots__ = ('id', '_data')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self._data = data
+
+    def dict(self):
+        return self._data
+
+
+def make_threats(count: int, seed: int = 7):
+    """Generate synthetic threat dicts."""
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(seconds=count)
+    return [
+        {
+            'id': f'threat-{i}',
+            'timestamp': start + timedelta(seconds=i),
+            'severity': rng.choice(SEVERITIES),
+            'threat_type': rng.choice(THREAT_TYPES),
+            'source_ip': f'185.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}',
+            'source_country_code': rng.choice(['CN', 'RU', 'US', 'DE', 'BR']),
+            'risk_score': rng.randrange(101),
+        }
+        for i in range(count)
+    ]
+
+
+class ListStore:
+    """The previous store: insert at the front, slice to capacity, scan for ids."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.threats = []
+
+    def store(self, threat):
+        self.threats.insert(0, threat)
+        if len(self.threats) > self.capacity:
+            self.threats = self.threats[:self.capacity]
+
+    def get(self, threat_id):
+        for threat in self.threats:
+            if threat['id'] == threat_id:
+                return threat
+        return None
+
+    def recent(self, limit, severity=None):
+        threats = self.threats
+        if severity:
+            threats = [t for t in threats if t['severity'] == severity]
+        return threats[:limit]
+
+
+def rate(count: int, elapsed: float) -> str:
+    return f"{count / elapsed:>12,.0f} ops/s  ({elapsed / count * 1e6:8.2f} µs/op)"
+
+
+async def bench_service(threats, capacity, lookups, queries):
+    db = FirestoreService(max_threats=capacity)
+    stored = [_Stored(t) for t in threats]
+
+    started = time.perf_counter()
+    for threat in stored:
+        await db.store_threat(threat)
+    insert = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for threat_id in lookups:
+        await db.get_threat(threat_id)
+    lookup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for severity in queries:
+        await db.get_recent_threats(limit=50, severity=severity)
+    recent = time.perf_counter() - started
+
+    return insert, lookup, recent
+
+
+def bench_list(threats, capacity, lookups, queries, insert_limit):
+    store = ListStore(capacity)
+    subset = threats[:insert_limit]
+
+    started = time.perf_counter()
+    for threat in subset:
+        store.store(threat)
+    insert = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for threat_id in lookups:
+        store.get(threat_id)
+    lookup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for severity in queries:
+        store.recent(50, severity)
+    recent = time.perf_counter() - started
+
+    return insert, lookup, recent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory threat store")
+    parser.add_argument('--capacity', type=int, default=100000)
+    parser.add_argument('--inserts', type=int, default=0, help='Threats to insert (default: 2x capacity)')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--legacy-inserts', type=int, default=20000,
+                        help='Inserts for the list-based store (it is O(n) per insert)')
+    args = parser.parse_args()
+
+    inserts = args.inserts or args.capacity * 2
+    rng = random.Random(11)
+    threats = make_threats(inserts)
+    retained = [t['id'] for t in threats[-args.capacity:]]
+    lookups = [rng.choice(retained) for _ in range(args.lookups)]
+    queries = [rng.choice([None] + SEVERITIES) for _ in range(args.queries)]
+
+    print("=" * 60)
+    print(f"🗄️  ThreatStream Threat Store Benchmark (capacity {args.capacity:,})")
+    print("=" * 60)
+
+    insert, lookup, recent = asyncio.run(bench_service(threats, args.capacity, lookups, queries))
+    print(f"\n⚡ Ring buffer + id index ({inserts:,} inserts)")
+    print(f"   Insert:        {rate(inserts, insert)}")
+    print(f"   Get by id:     {rate(len(lookups), lookup)}")
+    print(f"   Recent 50:     {rate(len(queries), recent)}")
+
+    legacy_lookups = [t['id'] for t in rng.sample(threats[:args.legacy_inserts], min(200, args.lookups))]
+    insert, lookup, recent = bench_list(
+        threats, args.capacity, legacy_lookups, queries[:200], args.legacy_inserts
+    )
+    print(f"\n🐢 List store (insert at front + slice, linear id scan; {args.legacy_inserts:,} inserts)")
+    print(f"   Insert:        {rate(args.legacy_inserts, insert)}")
+    print(f"   Get by id:     {rate(len(legacy_lookups), lookup)}")
+    print(f"   Recent 50:     {rate(200, recent)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Threat dicts and pre-filled stores shared by the FirestoreService tests."""
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.models.threat import Threat
+from app.services.firestore_service import FirestoreService
+
+CAPACITY = 150
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SEVERITIES = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+THREAT_TYPES = ["BRUTE_FORCE", "PORT_SCAN", "MALWARE", "DATA_EXFILTRATION"]
+WORDS = ["ssh", "login", "scan", "beacon", "tor", "dns", "exfiltration", "internal"]
+
+
+def make_threats(count, seed=1):
+    """Threat dicts one second apart with random categorical fields."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"threat-{i}",
+            "timestamp": START + timedelta(seconds=i),
+            "severity": rng.choice(SEVERITIES),
+            "threat_type": rng.choice(THREAT_TYPES),
+            "source_ip": f"203.0.113.{rng.randrange(6)}",
+            "source_country_code": rng.choice(["CN", "RU", "US", None]),
+            "risk_score": rng.randrange(101),
+            "confidence": 0.5,
+            "description": " ".join(rng.sample(WORDS, 3)),
+            "contextual_analysis": "",
+            "contributing_signals": [],
+            "mitre_attack_id": rng.choice(["T1110.001", "T1046", None]),
+        }
+        for i in range(count)
+    ]
+
+
+def make_threat_models(count, seed=1):
+    """make_threats() as Threat models, for the store_threat() write path."""
+    return [
+        Threat(
+            **threat, event_id=f"event-{threat['id']}", recommended_actions=[],
+            processing_time_ms=5, analyzed_at=threat["timestamp"]
+        )
+        for threat in make_threats(count, seed)
+    ]
+
+
+def filled_store(threats, capacity=CAPACITY):
+    """In-memory FirestoreService with the threats cached in order."""
+    store = FirestoreService(max_threats=capacity)
+    for threat in threats:
+        store._cache_threat(threat)
+    return store
@@ -0,0 +1,103 @@
+"""Tests for the AI budget token bucket and its risk-ranked allocation."""
+import random
+
+import pytest
+
+from app.core import ai_budget
+from app.core.ai_budget import AIBudgetAllocator
+from app.models.threat import SeverityLevel
+
+
+class Clock:
+    """Manually advanced stand-in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_budget.time, "monotonic", clock)
+    return clock
+
+
+def test_admit_spends_the_burst_then_refills(clock):
+    budget = AIBudgetAllocator(per_minute=60, burst=5, min_risk=0.1)
+    assert [budget.admit(1.0) for _ in range(7)] == [True] * 5 + [False] * 2
+    assert (budget.granted, budget.denied) == (5, 2)
+
+    clock.now += 2.0  # 1 token per second
+    assert budget.admit(1.0) and budget.admit(1.0)
+    assert not budget.admit(1.0)
+
+    clock.now += 3600  # Refill is capped at the burst capacity
+    assert budget.get_stats()["tokens_available"] == 5
+
+
+def test_admit_threshold_rises_as_the_bucket_drains(clock):
+    budget = AIBudgetAllocator(per_minute=60, burst=10, min_risk=0.1)
+    assert not budget.admit(0.05)  # Below min_risk even when full
+    assert budget.admit(0.2)
+
+    # Drain with high-risk events; moderate risk is turned away before the bucket is empty
+    while budget.admit(1.0) and budget._tokens > 3:
+        pass
+    assert budget._tokens >= 1
+    assert not budget.admit(0.2)
+    assert budget.admit(0.95)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_allocate_picks_the_riskiest_that_fit(clock, seed):
+    rng = random.Random(seed)
+    budget = AIBudgetAllocator(per_minute=600, burst=8, min_risk=0.2)
+    budget.admit(1.0)  # 7 tokens left
+    risks = [rng.random() for _ in range(20)]
+
+    selected = budget.allocate(risks)
+    expected = sorted(range(len(risks)), key=lambda i: risks[i], reverse=True)
+    expected = {i for i in expected[:7] if risks[i] >= 0.2}
+    assert selected == expected
+    assert budget.granted == 1 + len(expected)
+    assert budget.denied == len(risks) - len(expected)
+    assert budget.allocate([1.0]) == (set() if len(expected) == 7 else {0})
+
+
+def test_refund_returns_tokens_up_to_capacity(clock):
+    budget = AIBudgetAllocator(per_minute=60, burst=2, min_risk=0.0)
+    assert budget.allocate([1.0, 1.0, 1.0]) == {0, 1}
+    budget.refund()
+    assert budget.admit(1.0)
+    budget.refund()
+    budget.refund()
+    budget.refund()
+    assert budget.refunded == 4
+    assert budget.get_stats()["tokens_available"] == 2
+
+
+def test_preliminary_risk_uses_rules_and_geo():
+    budget = AIBudgetAllocator(per_minute=60)
+    hostile = budget.preliminary_risk({"event_type": "brute_force"}, {"risk_multiplier": ai_budget.MAX_RISK_MULTIPLIER})
+    neutral = budget.preliminary_risk({"event_type": "brute_force"}, {"risk_multiplier": 1.0})
+    benign = budget.preliminary_risk({"event_type": "login_attempt"}, {})
+    assert hostile == 1.0
+    assert benign < neutral < hostile
+
+
+def test_coverage_stats_by_severity():
+    budget = AIBudgetAllocator(per_minute=60)
+    for severity, ai in [
+        (SeverityLevel.CRITICAL, True), (SeverityLevel.CRITICAL, False),
+        (SeverityLevel.HIGH, True), (SeverityLevel.HIGH, True), (SeverityLevel.LOW, False),
+    ]:
+        budget.record_outcome(severity, ai)
+
+    stats = budget.get_stats()
+    assert stats["critical_high_ai_share"] == 0.75
+    assert stats["ai_coverage_by_severity"]["CRITICAL"] == {"ai_analyzed": 1, "total": 2, "share": 0.5}
+    assert stats["ai_coverage_by_severity"]["LOW"]["share"] == 0.0
+    assert stats["ai_coverage_by_severity"]["INFO"]["share"] is None
@@ -0,0 +1,157 @@
+"""Tests for the bounded alert store against a reference model of the alert lifecycle."""
+import asyncio
+import random
+from datetime import timedelta
+
+import pytest
+
+from app.config import settings
+from app.models.alert import Alert
+from app.services.firestore_service import ACTIVE_ALERT_STATUSES, ALERT_PRIORITIES, FirestoreService
+from tests.factories import START
+
+ACTIVE_CAPACITY = 20
+HISTORY_CAPACITY = 15
+STATUSES = ["NEW", "ACKNOWLEDGED", "INVESTIGATING", "RESOLVED", "FALSE_POSITIVE"]
+
+
+class ReferenceAlerts:
+    """Straightforward model: activation order, closing order and last status change per alert."""
+
+    def __init__(self):
+        self.alerts = {}
+        self.activated = {}   # id -> activation number (active alerts only)
+        self.history = []     # closed ids, oldest first
+        self.changed = []     # ids by last status change, oldest first
+        self.counter = 0
+
+    def store(self, alert):
+        self.alerts[alert["id"]] = alert
+        self.changed.append(alert["id"])
+        self._activate(alert["id"])
+
+    def update(self, alert_id, status):
+        alert = self.alerts.get(alert_id)
+        if alert is None:
+            return False
+        previous = alert["status"]
+        alert["status"] = status
+        if previous == status:
+            return True
+        self.changed.remove(alert_id)
+        self.changed.append(alert_id)
+        if previous in ACTIVE_ALERT_STATUSES and status not in ACTIVE_ALERT_STATUSES:
+            del self.activated[alert_id]
+            self.history.append(alert_id)
+            if len(self.history) > HISTORY_CAPACITY:
+                self._forget(self.history.pop(0))
+        elif previous not in ACTIVE_ALERT_STATUSES and status in ACTIVE_ALERT_STATUSES:
+            self.history.remove(alert_id)
+            self._activate(alert_id)
+        return True
+
+    def _activate(self, alert_id):
+        self.counter += 1
+        self.activated[alert_id] = self.counter
+        if len(self.activated) > ACTIVE_CAPACITY:
+            lowest = max(self.alerts[i]["priority"] for i in self.activated)
+            self._forget(min((n, i) for i, n in self.activated.items() if self.alerts[i]["priority"] == lowest)[1])
+
+    def _forget(self, alert_id):
+        self.activated.pop(alert_id, None)
+        self.changed.remove(alert_id)
+        del self.alerts[alert_id]
+
+    def recent(self):
+        return sorted(self.activated, key=self.activated.get, reverse=True)
+
+    def by_priority(self):
+        return sorted(self.activated, key=lambda i: (self.alerts[i]["priority"], -self.activated[i]))
+
+    def by_status(self, status):
+        return [i for i in reversed(self.changed) if self.alerts[i]["status"] == status]
+
+
+def make_alert(i, priority):
+    return Alert(
+        id=f"alert-{i}",
+        threat_id=f"threat-{i}",
+        title="Brute force",
+        description="Repeated failed logins",
+        severity="HIGH",
+        priority=priority,
+        created_at=START + timedelta(seconds=i),
+        source_ip="203.0.113.7",
+    )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "alert_active_capacity", ACTIVE_CAPACITY)
+    monkeypatch.setattr(settings, "alert_history_capacity", HISTORY_CAPACITY)
+    return FirestoreService(max_threats=10)
+
+
+def ids(alerts):
+    return [alert["id"] for alert in alerts]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_lifecycle_matches_reference(store, seed):
+    rng = random.Random(seed)
+    reference = ReferenceAlerts()
+
+    async def run():
+        created = 0
+        for _ in range(400):
+            if created == 0 or rng.random() < 0.4:
+                priority = rng.choice(ALERT_PRIORITIES)
+                await store.store_alert(make_alert(created, priority))
+                reference.store({"id": f"alert-{created}", "status": "NEW", "priority": priority})
+                created += 1
+            else:
+                alert_id = f"alert-{rng.randrange(created)}"
+                status = rng.choice(STATUSES)
+                assert await store.update_alert_status(alert_id, status) == reference.update(alert_id, status)
+
+            assert ids(await store.get_active_alerts(limit=100)) == reference.recent()
+            assert ids(await store.get_active_alerts(limit=100, order="priority")) == reference.by_priority()
+            assert ids(await store.get_alert_history(limit=100)) == list(reversed(reference.history))
+            for status in STATUSES:
+                assert ids(await store.get_alerts_by_status(status, limit=100)) == reference.by_status(status)
+            assert set(store.alerts) == set(reference.alerts)
+
+    asyncio.run(run())
+    stats = store.get_alert_stats()
+    assert stats["stored"] == len(reference.alerts) <= ACTIVE_CAPACITY + HISTORY_CAPACITY
+    assert sum(stats["active_by_priority"].values()) == len(reference.activated)
+
+
+def test_resolving_stamps_and_reopening_clears(store):
+    async def run():
+        await store.store_alert(make_alert(0, "P2"))
+        assert await store.update_alert_status("alert-0", "RESOLVED", analyst_id="analyst-1")
+        alert = await store.get_alert("alert-0")
+        assert alert["resolved_at"] is not None and alert["assigned_to"] == "analyst-1"
+        assert await store.get_active_alerts() == []
+
+        assert await store.update_alert_status("alert-0", "INVESTIGATING")
+        assert alert["resolved_at"] is None
+        assert ids(await store.get_active_alerts()) == ["alert-0"]
+        assert await store.get_alert_history() == []
+        assert not await store.update_alert_status("alert-missing", "RESOLVED")
+
+    asyncio.run(run())
+
+
+def test_overflow_drops_the_oldest_lowest_priority(store):
+    async def run():
+        for i in range(ACTIVE_CAPACITY):
+            await store.store_alert(make_alert(i, "P1" if i else "P4"))
+        await store.store_alert(make_alert(ACTIVE_CAPACITY, "P1"))
+        assert "alert-0" not in store.alerts
+        await store.store_alert(make_alert(ACTIVE_CAPACITY + 1, "P1"))
+        assert "alert-1" not in store.alerts
+        assert store.get_alert_stats()["dropped"] == 2
+
+    asyncio.run(run())
@@ -0,0 +1,266 @@
+"""Tests for the Firestore write-behind buffer against an in-memory client, and the emulator when available."""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from app.config import settings
+from app.models.threat import SeverityLevel
+from app.services.firestore_backend import FirestoreWriteBehind, to_document
+from app.services.firestore_service import FirestoreService
+from tests.factories import make_threat_models
+
+
+class MemorySnapshot:
+    def __init__(self, data):
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class MemoryDocument:
+    def __init__(self, client, collection, document_id):
+        self.client = client
+        self.key = (collection, document_id)
+
+    async def get(self):
+        return MemorySnapshot(self.client.documents.get(self.key))
+
+
+class MemoryQuery:
+    def __init__(self, client, collection, field=None, limit=None):
+        self.client = client
+        self.collection = collection
+        self.field = field
+        self.count = limit
+
+    def document(self, document_id):
+        return MemoryDocument(self.client, self.collection, document_id)
+
+    def order_by(self, field, direction):
+        assert direction == "DESCENDING"
+        return MemoryQuery(self.client, self.collection, field, self.count)
+
+    def limit(self, count):
+        return MemoryQuery(self.client, self.collection, self.field, count)
+
+    async def stream(self):
+        documents = [data for (collection, _), data in self.client.documents.items() if collection == self.collection]
+        documents.sort(key=lambda data: data[self.field], reverse=True)
+        for data in documents[:self.count]:
+            yield MemorySnapshot(data)
+
+
+class MemoryBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, document, data):
+        self.writes.append((document.key, data))
+
+    async def commit(self):
+        if self.client.failures:
+            self.client.failures -= 1
+            raise ConnectionError("unavailable")
+        self.client.commits.append([key for key, _ in self.writes])
+        self.client.documents.update(self.writes)
+
+
+class MemoryClient:
+    """The slice of firestore.AsyncClient the write-behind buffer uses."""
+
+    def __init__(self):
+        self.documents = {}
+        self.commits = []
+        self.failures = 0
+
+    def batch(self):
+        return MemoryBatch(self)
+
+    def collection(self, name):
+        return MemoryQuery(self, name)
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    def configure(batch_size=500, flush_interval=60.0, max_pending=50000):
+        monkeypatch.setattr(settings, "firestore_batch_size", batch_size)
+        monkeypatch.setattr(settings, "firestore_flush_interval", flush_interval)
+        monkeypatch.setattr(settings, "firestore_max_pending", max_pending)
+    return configure
+
+
+def test_full_batches_flush_immediately(configure):
+    configure(batch_size=3)
+    client = MemoryClient()
+
+    async def run():
+        backend = FirestoreWriteBehind(client=client)
+        await backend.start()
+        for i in range(7):
+            backend.enqueue("threats", f"t{i}", {"n": i})
+        await asyncio.sleep(0.05)
+        assert [len(keys) for keys in client.commits] == [3, 3]
+        assert backend.get_stats()["pending"] == 1  # The partial batch waits for the interval
+        await backend.close()
+
+    asyncio.run(run())
+    assert [len(keys) for keys in client.commits] == [3, 3, 1]
+    assert [key[1] for keys in client.commits for key in keys] == [f"t{i}" for i in range(7)]
+
+
+def test_partial_batches_flush_on_the_interval(configure):
+    configure(flush_interval=0.02)
+    client = MemoryClient()
+
+    async def run():
+        backend = FirestoreWriteBehind(client=client)
+        await backend.start()
+        backend.enqueue("alerts", "a1", {"status": "NEW"})
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if client.commits:
+                break
+        await backend.close()
+        return backend.get_stats()
+
+    stats = asyncio.run(run())
+    assert client.documents == {("alerts", "a1"): {"status": "NEW"}}
+    assert stats["flushes"] == 1 and stats["documents_written"] == 1 and stats["batch_size_max"] == 1
+
+
+def test_writes_to_one_document_coalesce(configure):
+    configure()
+    client = MemoryClient()
+    backend = FirestoreWriteBehind(client=client)
+    backend.enqueue("alerts", "a1", {"status": "NEW"})
+    backend.enqueue("alerts", "a2", {"status": "NEW"})
+    backend.enqueue("alerts", "a1", {"status": "RESOLVED"})
+    assert backend.pending_document("alerts", "a1") == {"status": "RESOLVED"}
+
+    assert asyncio.run(backend.flush())
+    assert client.commits == [[("alerts", "a2"), ("alerts", "a1")]]
+    assert client.documents[("alerts", "a1")] == {"status": "RESOLVED"}
+    assert backend.get_stats()["coalesced"] == 1
+
+
+def test_failed_batches_are_retried_in_order(configure):
+    configure(batch_size=4)
+    client = MemoryClient()
+    backend = FirestoreWriteBehind(client=client)
+    for i in range(6):
+        backend.enqueue("threats", f"t{i}", {"n": i})
+
+    client.failures = 1
+    assert not asyncio.run(backend.flush())
+    assert backend.flush_errors == 1 and backend.get_stats()["pending"] == 6
+
+    # A newer write that arrived during the failed commit wins over the re-queued one
+    backend.enqueue("threats", "t1", {"n": 100})
+    assert asyncio.run(backend.flush()) and asyncio.run(backend.flush())
+    assert [key[1] for keys in client.commits for key in keys] == ["t0", "t2", "t3", "t4", "t5", "t1"]
+    assert client.documents[("threats", "t1")] == {"n": 100}
+
+
+def test_flusher_backs_off_and_recovers(configure):
+    configure(batch_size=2, flush_interval=0.01)
+    client = MemoryClient()
+    client.failures = 2
+
+    async def run():
+        backend = FirestoreWriteBehind(client=client)
+        await backend.start()
+        for i in range(5):
+            backend.enqueue("threats", f"t{i}", {"n": i})
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if len(client.documents) == 5:
+                break
+        await backend.close()
+        return backend
+
+    backend = asyncio.run(run())
+    assert len(client.documents) == 5
+    assert backend.flush_errors == 2 and backend.get_stats()["pending"] == 0
+
+
+def test_pending_writes_are_bounded(configure):
+    configure(max_pending=3)
+    client = MemoryClient()
+    backend = FirestoreWriteBehind(client=client)
+    for i in range(5):
+        backend.enqueue("threats", f"t{i}", {"n": i})
+    assert backend.dropped == 2
+    while asyncio.run(backend.flush()) and backend.get_stats()["pending"]:
+        pass
+    assert sorted(key[1] for key in client.documents) == ["t2", "t3", "t4"]
+
+
+def test_reads_prefer_pending_writes(configure):
+    configure()
+    client = MemoryClient()
+    client.documents[("alerts", "a1")] = {"status": "NEW", "created_at": 1}
+    client.documents[("alerts", "a2")] = {"status": "NEW", "created_at": 2}
+    backend = FirestoreWriteBehind(client=client)
+    backend.enqueue("alerts", "a1", {"status": "RESOLVED"})
+
+    assert asyncio.run(backend.get("alerts", "a1")) == {"status": "RESOLVED"}
+    assert asyncio.run(backend.get("alerts", "a2"))["created_at"] == 2
+    assert asyncio.run(backend.get("alerts", "missing")) is None
+    assert [d["created_at"] for d in asyncio.run(backend.query_recent("alerts", "created_at", 5))] == [2, 1]
+
+
+def test_to_document_unwraps_enums():
+    assert to_document({"severity": SeverityLevel.HIGH, "tags": [SeverityLevel.LOW], "n": 1}) == {
+        "severity": "HIGH", "tags": ["LOW"], "n": 1
+    }
+
+
+def test_store_writes_behind_and_warms_from_firestore(configure):
+    configure()
+    client = MemoryClient()
+    threats = make_threat_models(30)
+
+    async def run():
+        store = FirestoreService(max_threats=20)
+        store.backend = FirestoreWriteBehind(client=client)
+        for threat in threats:
+            await store.store_threat(threat)
+        await store.close()
+
+        # A restarted store reads through on a cache miss and warms from the newest documents
+        restarted = FirestoreService(max_threats=20)
+        restarted.backend = FirestoreWriteBehind(client=client)
+        assert (await restarted.get_threat("threat-3"))["id"] == "threat-3"
+        await restarted.start()
+        recent = await restarted.get_recent_threats(limit=50)
+        await restarted.close()
+        return recent
+
+    recent = asyncio.run(run())
+    assert len(client.documents) == 30
+    assert client.documents[("threats", "threat-0")]["severity"] == threats[0].severity.value
+    assert [t["id"] for t in recent] == [t.id for t in reversed(threats[-20:])]
+
+
+@pytest.mark.skipif(not os.environ.get("FIRESTORE_EMULATOR_HOST"), reason="FIRESTORE_EMULATOR_HOST is not set")
+def test_round_trip_through_the_emulator(configure, monkeypatch):
+    pytest.importorskip("google.cloud.firestore")
+    configure(batch_size=10)
+    monkeypatch.setattr(settings, "firestore_emulator_host", os.environ["FIRESTORE_EMULATOR_HOST"])
+    collection = f"test-{uuid.uuid4().hex}"
+
+    async def run():
+        backend = FirestoreWriteBehind()
+        for i in range(25):
+            backend.enqueue(collection, f"d{i}", {"n": i})
+        await backend.close()
+        assert backend.get_stats()["documents_written"] == 25
+        assert (await backend.get(collection, "d7")) == {"n": 7}
+        return [d["n"] for d in await backend.query_recent(collection, "n", 3)]
+
+    assert asyncio.run(run()) == [24, 23, 22]
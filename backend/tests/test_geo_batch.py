@@ -0,0 +1,72 @@
+"""Tests for batched GeoService.lookup_many() against per-address lookup_ip()."""
+import asyncio
+import random
+import socket
+
+import pytest
+
+from app.config import settings
+from app.services.geo_service import GeoService, ZONES
+from app.services.threat_intel_service import ThreatIntelService
+
+LISTED = [
+    "185.220.101.7", "45.155.205.233", "5.188.206.17", "45.143.203.250", "179.43.190.1",
+    "2a0e:fd87::1", "2001:67c:2e8:22::c100:68b",
+]
+SPECIAL = [
+    "10.0.0.5", "127.0.0.1", "192.168.1.1", "203.0.113.9", "100.64.0.1", "255.255.255.255",
+    "::1", "fe80::1", "fd12:3456::1", "2001:db8::1", "::ffff:8.8.8.8", "::ffff:10.0.0.1",
+    "2001:4860:4860::8888", "2600:1f18::1", "2001:200::1",
+    "unknown", "", "1.2.3", "1.2.3.256", "gggg::1",
+]
+
+
+def random_ips(count, seed):
+    rng = random.Random(seed)
+    return [socket.inet_ntoa(rng.getrandbits(32).to_bytes(4, "big")) for _ in range(count)]
+
+
+@pytest.fixture(params=[False, True], ids=["exact", "bloom"])
+def geo(request, monkeypatch):
+    monkeypatch.setattr(settings, "geoip_cache_dir", "")
+    monkeypatch.setattr(settings, "threat_intel_bloom_enabled", request.param)
+    geo = GeoService()
+    intel = ThreatIntelService()
+    assert asyncio.run(intel.reload())
+    geo.threat_intel = intel
+    return geo
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_lookup_many_matches_lookup_ip(geo, seed):
+    ips = random_ips(500, seed) + LISTED + SPECIAL
+    random.Random(seed).shuffle(ips)
+    ips += ips[:50]  # Duplicates share one resolution
+
+    batch = geo.lookup_many(ips)
+    assert len(batch) == len(ips)
+    for i, ip in enumerate(ips):
+        assert batch.row(i) == geo.lookup_ip(ip), ip
+
+
+def test_threat_intel_hits_are_hostile(geo):
+    batch = geo.lookup_many(LISTED + ["8.8.8.8"])
+    for i in range(len(LISTED)):
+        assert ZONES[batch.zone_index[i]] == "HOSTILE_ZONE"
+        assert batch.threat_intel[i]["categories"] == ["botnet"]
+    assert len(LISTED) not in batch.threat_intel
+
+
+def test_country_counts_follow_the_rows(geo):
+    ips = random_ips(200, 5) + SPECIAL
+    batch = geo.lookup_many(ips)
+    counts = batch.country_counts()
+    assert counts.sum() == len(ips)
+    for slot, code in enumerate(batch.country_codes):
+        assert counts[slot] == sum(geo.lookup_ip(ip)["country_code"] == code for ip in ips)
+
+
+def test_empty_batch(geo):
+    batch = geo.lookup_many([])
+    assert len(batch) == 0
+    assert batch.country_counts().sum() == 0
@@ -0,0 +1,83 @@
+"""Tests for the GeoService enrichment LRU and its invalidation."""
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app.config import settings
+from app.services.geo_service import GeoService
+from app.services.threat_intel_service import ThreatIntelService
+
+IPS = [f"8.8.{i}.{i}" for i in range(10)]
+
+
+@pytest.fixture
+def make_geo(monkeypatch):
+    monkeypatch.setattr(settings, "geoip_cache_dir", "")
+
+    def make(cache_size):
+        monkeypatch.setattr(settings, "geo_cache_size", cache_size)
+        return GeoService()
+    return make
+
+
+def test_lru_matches_reference_order(make_geo):
+    geo = make_geo(4)
+    reference = OrderedDict()
+    hits = misses = evictions = 0
+    for ip in [IPS[i] for i in (0, 1, 2, 0, 3, 4, 1, 5, 0, 0, 6, 2, 7, 3, 8)]:
+        result = geo.lookup_ip(ip)
+        if ip in reference:
+            reference.move_to_end(ip)
+            hits += 1
+        else:
+            reference[ip] = result
+            misses += 1
+            if len(reference) > 4:
+                reference.popitem(last=False)
+                evictions += 1
+        assert list(geo._cache) == list(reference)
+
+    stats = geo.get_stats()["cache"]
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (hits, misses, evictions)
+    assert stats["size"] == 4
+
+
+def test_hits_return_the_cached_result(make_geo):
+    geo = make_geo(4)
+    first = geo.lookup_ip("8.8.8.8")
+    assert geo.lookup_ip("8.8.8.8") is first
+    assert first == geo._resolve("8.8.8.8")
+
+
+def test_disabled_cache_keeps_nothing(make_geo):
+    geo = make_geo(0)
+    for ip in IPS + IPS:
+        geo.lookup_ip(ip)
+    stats = geo.get_stats()["cache"]
+    assert stats["size"] == 0 and stats["hits"] == 0 and stats["misses"] == 20
+
+
+def test_database_reload_invalidates(make_geo):
+    geo = make_geo(4)
+    geo.lookup_ip("8.8.8.8")
+    generation = geo.cache_generation
+    assert geo.reload()
+    assert geo.cache_generation == generation + 1
+    assert not geo._cache
+
+
+def test_threat_intel_swap_invalidates(make_geo, tmp_path):
+    feeds = tmp_path / "feeds"
+    feeds.mkdir()
+    intel = ThreatIntelService(feed_dir=str(feeds))
+    geo = make_geo(4)
+    geo.threat_intel = intel
+    intel.add_reload_listener(lambda: geo.invalidate_cache("threat-intel feeds reloaded"))
+
+    assert geo.lookup_ip("8.8.8.8")["zone"] == "EXTERNAL_ZONE"
+    (feeds / "listed.txt").write_text("8.8.8.8\n")
+    assert asyncio.run(intel.reload())
+    result = geo.lookup_ip("8.8.8.8")
+    assert result["zone"] == "HOSTILE_ZONE"
+    assert result["threat_intel"]["feeds"] == ["listed"]
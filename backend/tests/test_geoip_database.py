@@ -0,0 +1,144 @@
+"""Tests for the GeoIP range database against a linear scan, and GeoService database reloads."""
+import asyncio
+import os
+import random
+import socket
+
+import pytest
+
+from app.config import settings
+from app.services.geo_service import GeoService
+from app.utils.geoip_database import GeoIPDatabase, UNKNOWN_COUNTRY, ip_to_int, load_ranges_csv
+
+CODES = ["US", "DE", "CN", "RU", "BR", "JP"]
+
+
+def dotted(address):
+    return socket.inet_ntoa(address.to_bytes(4, "big"))
+
+
+def make_ranges(count, seed=2):
+    """Disjoint random ranges with gaps, some touching /16 bucket boundaries."""
+    rng = random.Random(seed)
+    bounds = sorted(rng.sample(range(1, (1 << 32) - 1), count * 2))
+    bounds[:4] = [0x0A000000, 0x0A00FFFF, 0x0A010000, 0x0A01FFFF]  # Adjacent ranges on bucket edges
+    bounds.sort()
+    return [(bounds[i], bounds[i + 1], rng.choice(CODES)) for i in range(0, len(bounds), 2)]
+
+
+def write_csv(path, ranges, integer_bounds=False):
+    lines = ["# test ranges", "start_ip,end_ip,country_code"]
+    for start, end, code in reversed(ranges):  # Unsorted input
+        lines.append(f"{start},{end},{code}" if integer_bounds else f"{dotted(start)},{dotted(end)},{code}")
+    lines.append("2001:db8::,2001:db8::ffff,US")  # IPv6 rows are skipped
+    path.write_text("\n".join(lines) + "\n")
+
+
+def reference(ranges, address):
+    for start, end, code in ranges:
+        if start <= address <= end:
+            return code
+    return None
+
+
+@pytest.fixture(scope="module")
+def ranges():
+    return make_ranges(500)
+
+
+@pytest.mark.parametrize("cached", [False, True])
+@pytest.mark.parametrize("integer_bounds", [False, True])
+def test_lookups_match_linear_scan(tmp_path, ranges, cached, integer_bounds):
+    path = tmp_path / "ranges.csv"
+    write_csv(path, ranges, integer_bounds)
+    database = GeoIPDatabase(path=str(path), cache_dir=str(tmp_path / "cache") if cached else None)
+    assert database.mmapped == cached
+    assert len(database.starts) == len(ranges)
+
+    rng = random.Random(7)
+    probes = [0, (1 << 32) - 1]
+    for start, end, _ in ranges[::5]:
+        probes += [start - 1, start, (start + end) // 2, end, end + 1]
+    probes += [rng.randrange(1 << 32) for _ in range(2000)]
+    for address in probes:
+        if 0 <= address < 1 << 32:
+            assert database.lookup_int(address) == reference(ranges, address)
+            assert database.lookup(dotted(address)) == reference(ranges, address)
+
+
+def test_cache_is_reused_and_rebuilt_on_change(tmp_path, ranges):
+    path = tmp_path / "ranges.csv"
+    cache_dir = tmp_path / "cache"
+    write_csv(path, ranges)
+    GeoIPDatabase(path=str(path), cache_dir=str(cache_dir))
+    GeoIPDatabase(path=str(path), cache_dir=str(cache_dir))
+    assert len(os.listdir(cache_dir)) == 1
+
+    write_csv(path, ranges[:10])
+    os.utime(path, (2_000_000, 2_000_000))
+    assert len(GeoIPDatabase(path=str(path), cache_dir=str(cache_dir)).starts) == 10
+    assert len(os.listdir(cache_dir)) == 2
+
+
+@pytest.mark.parametrize("body, message", [
+    ("1.0.0.0,1.0.0.255,US\n1.0.0.128,1.0.1.0,DE\n", "overlapping"),
+    ("1.0.1.0,1.0.0.0,US\n", "after end"),
+    ("1.0.0,1.0.0.255,US\n", "invalid range"),
+])
+def test_malformed_csv_is_rejected(tmp_path, body, message):
+    path = tmp_path / "ranges.csv"
+    path.write_text(body)
+    with pytest.raises(ValueError, match=message):
+        load_ranges_csv(str(path))
+
+
+def test_ip_to_int():
+    assert ip_to_int("0.0.0.0") == 0
+    assert ip_to_int("255.255.255.255") == (1 << 32) - 1
+    assert ip_to_int("10.1.2.3") == 0x0A010203
+    for invalid in ("2001:db8::1", "unknown", "", None, "1.2.3.256"):
+        assert ip_to_int(invalid) is None
+
+
+@pytest.fixture
+def geo_database(tmp_path, monkeypatch):
+    path = tmp_path / "ranges.csv"
+    path.write_text("start_ip,end_ip,country_code\n8.0.0.0,8.255.255.255,US\n")
+    os.utime(path, (1_000_000, 1_000_000))
+    monkeypatch.setattr(settings, "geoip_database_path", str(path))
+    monkeypatch.setattr(settings, "geoip_cache_dir", str(tmp_path / "cache"))
+    return path
+
+
+def test_geo_service_reloads_off_the_lookup_path(geo_database, monkeypatch):
+    monkeypatch.setattr(settings, "geoip_check_interval", 0.01)
+    geo = GeoService()
+    assert geo.lookup_ip("8.8.8.8")["country_code"] == "US"
+
+    geo_database.write_text("start_ip,end_ip,country_code\n8.0.0.0,8.255.255.255,DE\n")
+    os.utime(geo_database, (1_000_100, 1_000_100))
+    # Lookups keep serving the loaded database until the watcher swaps the new one in
+    assert geo.lookup_ip("8.8.8.8")["country_code"] == "US"
+    assert geo.lookup_many(["8.8.8.8"]).row(0)["country_code"] == "US"
+
+    async def watch_until_reloaded():
+        generation = geo.cache_generation
+        task = asyncio.create_task(geo.watch())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if geo.cache_generation > generation:
+                break
+        geo.stop()
+        task.cancel()
+
+    asyncio.run(watch_until_reloaded())
+    assert geo.lookup_ip("8.8.8.8")["country_code"] == "DE"
+    assert geo.lookup_many(["8.8.8.8"]).row(0)["country_code"] == "DE"
+
+
+def test_geo_service_keeps_the_database_when_a_reload_fails(geo_database):
+    geo = GeoService()
+    geo_database.write_text("start_ip,end_ip,country_code\n8.0.0.0,7.0.0.0,DE\n")
+    assert not geo.reload()
+    assert geo.lookup_ip("8.8.8.8")["country_code"] == "US"
+    assert geo.lookup_ip("9.9.9.9")["country_code"] == UNKNOWN_COUNTRY
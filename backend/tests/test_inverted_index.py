@@ -0,0 +1,98 @@
+"""Tests for InvertedIndex queries against a linear scan of the live documents."""
+import random
+
+import pytest
+
+from app.utils.inverted_index import InvertedIndex, parse_query, tokenize
+
+VOCABULARY = [
+    "brute", "force", "ssh", "login", "scan", "port", "malware", "beacon", "internal",
+    "t1110", "t1110.001", "t1110.003", "t1046", "exfil", "exfiltration", "dns", "tor",
+]
+
+
+def matches(terms, query):
+    """Reference evaluation of a parsed query against one document's terms."""
+    def has(term):
+        if term.endswith("*"):
+            return any(t.startswith(term[:-1]) for t in terms)
+        return term in terms
+
+    return any(
+        all(has(term) for term in positives) and not any(has(term) for term in negatives)
+        for positives, negatives in parse_query(query)
+    )
+
+
+def build(count, capacity, seed=3):
+    """Index random documents, evicting the oldest beyond capacity like the threat store."""
+    rng = random.Random(seed)
+    index = InvertedIndex()
+    documents = []
+    for seq in range(count):
+        terms = rng.sample(VOCABULARY, rng.randint(1, 5))
+        documents.append(terms)
+        index.add(seq, terms)
+        if seq >= capacity:
+            index.remove(seq - capacity, documents[seq - capacity])
+    live = {seq: set(documents[seq]) for seq in range(max(0, count - capacity), count)}
+    return index, live
+
+
+QUERIES = [
+    "ssh",
+    "brute force",
+    "brute -internal",
+    "brute NOT internal",
+    "ssh OR dns",
+    "scan port OR malware beacon -tor",
+    "t1110*",
+    "t1110.00*",
+    "exfil*",
+    "exfil",
+    "t1110* -t1110.001",
+    "tor OR exfil* internal",
+    "nosuchterm",
+    "nosuch*",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_linear_scan(query):
+    index, live = build(count=600, capacity=200)
+    expected = sorted((seq for seq, terms in live.items() if matches(terms, query)), reverse=True)
+
+    assert index.search(query, limit=10_000) == expected
+    assert index.search(query, limit=7) == expected[:7]
+    min_seq = max(live) - 50
+    assert index.search(query, limit=10_000, min_seq=min_seq) == [seq for seq in expected if seq >= min_seq]
+
+
+def test_eviction_keeps_counts_consistent():
+    index, live = build(count=1000, capacity=150)
+    stats = index.get_stats()
+    assert stats["documents"] == len(live)
+    assert stats["postings"] == sum(len(terms) for terms in live.values())
+    assert stats["terms"] == len(set().union(*live.values()))
+
+
+def test_state_round_trip():
+    index, live = build(count=400, capacity=120)
+    restored = InvertedIndex()
+    restored.load_state(index.get_state())
+    for query in QUERIES:
+        assert restored.search(query, limit=10_000) == index.search(query, limit=10_000)
+    assert restored.get_stats() == index.get_stats()
+
+
+def test_parse_query():
+    assert parse_query("Brute force -internal OR T1110*") == [
+        (["brute", "force"], ["internal"]),
+        (["t1110*"], []),
+    ]
+    assert tokenize("Failed SSH login from 10.0.0.1 (T1110.001)") == [
+        "failed", "ssh", "login", "10.0.0.1", "t1110.001"
+    ]
+    for query in ("", "   ", "the and", "-ssh", "ssh OR -dns"):
+        with pytest.raises(ValueError):
+            parse_query(query)
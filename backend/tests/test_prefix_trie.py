@@ -0,0 +1,138 @@
+"""Tests for the radix trie longest-prefix match against a linear scan of the inserted prefixes."""
+import random
+
+import pytest
+
+from app.config import settings
+from app.services.geo_service import GeoService
+from app.utils.prefix_trie import IPPrefixTable, PrefixTrie, load_prefix_file, parse_ip, parse_prefix
+
+
+def random_prefixes(width, count, seed):
+    """Random prefixes clustered under a few parents, so many of them nest."""
+    rng = random.Random(seed)
+    parents = [rng.getrandbits(width) for _ in range(4)]
+    prefixes = {}
+    for i in range(count):
+        length = rng.choice([0, 1, width, width]) if i < 4 else rng.randint(1, width)
+        base = rng.choice(parents) ^ (rng.getrandbits(width) >> rng.randint(width // 4, width))
+        network = (base >> (width - length)) << (width - length) if length else 0
+        prefixes[(network, length)] = f"label-{i}"
+    return prefixes
+
+
+def reference(prefixes, width, address):
+    best, best_length = None, -1
+    for (network, length), value in prefixes.items():
+        if length > best_length and (address >> (width - length) if length else 0) == (network >> (width - length) if length else 0):
+            best, best_length = value, length
+    return best
+
+
+def probes(prefixes, width, seed):
+    rng = random.Random(seed)
+    addresses = [0, (1 << width) - 1] + [rng.getrandbits(width) for _ in range(300)]
+    for network, length in list(prefixes)[:150]:
+        last = network | ((1 << (width - length)) - 1)
+        addresses += [network, last, max(0, network - 1), min((1 << width) - 1, last + 1)]
+    return addresses
+
+
+@pytest.mark.parametrize("width", [32, 128])
+@pytest.mark.parametrize("seed", range(3))
+def test_lookup_matches_linear_scan(width, seed):
+    prefixes = random_prefixes(width, 300, seed)
+    trie = PrefixTrie(width)
+    for (network, length), value in prefixes.items():
+        trie.insert(network, length, value)
+
+    assert len(trie) == len(prefixes)
+    assert sorted(trie.values()) == sorted(prefixes.values())
+    for address in probes(prefixes, width, seed):
+        assert trie.lookup(address) == reference(prefixes, width, address)
+
+
+@pytest.mark.parametrize("width", [32, 128])
+def test_flatten_matches_lookup(width):
+    prefixes = {key: value for key, value in random_prefixes(width, 200, 9).items() if key[1] > 0}
+    trie = PrefixTrie(width)
+    for (network, length), value in prefixes.items():
+        trie.insert(network, length, value)
+
+    ranges = trie.flatten()
+    for (_, last, value), (first, _, next_value) in zip(ranges, ranges[1:]):
+        assert last < first
+        assert last + 1 < first or value != next_value  # Adjacent equal ranges are merged
+    for first, last, value in ranges:
+        assert trie.lookup(first) == trie.lookup(last) == value
+
+    def covering(address):
+        return next((value for first, last, value in ranges if first <= address <= last), None)
+
+    for address in probes(prefixes, width, 4):
+        assert covering(address) == trie.lookup(address)
+
+
+def test_reinsert_replaces_value():
+    trie = PrefixTrie(32)
+    trie.insert(0x0A000000, 8, "a")
+    trie.insert(0x0A000000, 8, "b")
+    trie.insert(0x0A010000, 16, "c")
+    assert len(trie) == 2
+    assert trie.lookup(0x0A020304) == "b"
+    assert trie.lookup(0x0A010304) == "c"
+    assert trie.lookup(0x0B000000) is None
+
+
+def test_parse_ip_and_prefix():
+    assert parse_ip("10.1.2.3") == (4, 0x0A010203)
+    assert parse_ip("::ffff:10.1.2.3") == (4, 0x0A010203)
+    assert parse_ip("fe80::1%eth0") == (6, (0xFE80 << 112) | 1)
+    for invalid in ("10.1.2", "gggg::1", "", None, "unknown"):
+        assert parse_ip(invalid) is None
+
+    assert parse_prefix("10.1.2.3/8") == (4, 0x0A000000, 8)
+    assert parse_prefix("2001:db8::1/32") == (6, 0x20010DB8 << 96, 32)
+    assert parse_prefix("0.0.0.0/0") == (4, 0, 0)
+    assert parse_prefix("192.0.2.7") == (4, 0xC0000207, 32)
+    for invalid in ("10.0.0.0/33", "::/129", "10.0.0.0/-1", "nope/8"):
+        with pytest.raises(ValueError):
+            parse_prefix(invalid)
+
+
+def test_prefix_file(tmp_path):
+    path = tmp_path / "prefixes.txt"
+    path.write_text("# comment\n10.0.0.0/8 PRIVATE\n10.9.0.0/16 CC:DE  # inline comment\n2001:db8::/32 DOCUMENTATION\n")
+    table = load_prefix_file(str(path))
+    assert table.lookup("10.1.1.1") == "PRIVATE"
+    assert table.lookup("10.9.1.1") == "CC:DE"
+    assert table.lookup("2001:db8::5") == "DOCUMENTATION"
+    assert table.lookup("11.0.0.1") is None
+    assert table.labels() == {"PRIVATE", "CC:DE", "DOCUMENTATION"}
+
+    path.write_text("10.0.0.0/8\n")
+    with pytest.raises(ValueError, match=":1:"):
+        load_prefix_file(str(path))
+
+
+def test_dual_stack_table():
+    table = IPPrefixTable([("0.0.0.0/0", "V4"), ("::/0", "V6"), ("::1/128", "LOOPBACK")])
+    assert table.lookup("8.8.8.8") == "V4"
+    assert table.lookup("::ffff:8.8.8.8") == "V4"
+    assert table.lookup("2001:4860::8888") == "V6"
+    assert table.lookup("::1") == "LOOPBACK"
+
+
+@pytest.mark.parametrize("ip, country_code, zone", [
+    ("2001:4860:4860::8888", "US", "EXTERNAL_ZONE"),
+    ("2a02:6b8::1", "RU", "HOSTILE_ZONE"),
+    ("::1", "XX", "INTERNAL_ZONE"),
+    ("fd12:3456::1", "XX", "INTERNAL_ZONE"),
+    ("2001:db8::1", "XX", "INTERNAL_ZONE"),
+    ("10.0.0.5", "XX", "INTERNAL_ZONE"),
+])
+def test_geo_service_classifies_ipv6(monkeypatch, ip, country_code, zone):
+    monkeypatch.setattr(settings, "geoip_cache_dir", "")
+    result = GeoService().lookup_ip(ip)
+    assert result["country_code"] == country_code
+    assert result["zone"] == zone
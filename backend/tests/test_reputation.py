@@ -0,0 +1,114 @@
+"""Tests for decayed per-source reputation scores against a direct recomputation."""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.models.threat import SeverityLevel
+from app.services import reputation_service
+from app.services.reputation_service import MAX_REPUTATION_POINTS, SEVERITY_WEIGHTS, ReputationService
+
+HALF_LIFE = 600.0
+START = 1_700_000_000.0
+
+
+def make_history(count, sources, seed):
+    rng = random.Random(seed)
+    now = START
+    history = []
+    for _ in range(count):
+        now += rng.expovariate(1 / 30)
+        history.append((f"198.51.100.{rng.randrange(sources)}", rng.choice(list(SeverityLevel)), now))
+    return history
+
+
+def reference_score(history, source_ip, now):
+    """Sum of every threat's weight halved once per elapsed half life."""
+    return sum(
+        SEVERITY_WEIGHTS[severity] * 0.5 ** ((now - at) / HALF_LIFE)
+        for ip, severity, at in history if ip == source_ip
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [START]
+    monkeypatch.setattr(reputation_service.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_scores_match_recomputation(clock, seed):
+    history = make_history(400, 20, seed)
+    reputation = ReputationService(capacity=64, half_life=HALF_LIFE, saturation=50.0)
+    for source_ip, severity, at in history:
+        reputation.record(source_ip, severity, now=at)
+
+    clock[0] = history[-1][2] + 120
+    sources = {ip for ip, _, _ in history}
+    for source_ip in sources:
+        assert reputation.get_score(source_ip) == pytest.approx(reference_score(history, source_ip, clock[0]))
+    assert reputation.get_score("192.0.2.1") == 0.0
+
+    expected = sorted(sources, key=lambda ip: reference_score(history, ip, clock[0]), reverse=True)
+    top = reputation.top_sources(limit=5)
+    assert [entry["source_ip"] for entry in top] == expected[:5]
+    for entry in top:
+        events = [h for h in history if h[0] == entry["source_ip"]]
+        assert entry["events"] == len(events)
+        assert entry["critical_events"] == sum(h[1] == SeverityLevel.CRITICAL for h in events)
+        assert (entry["first_seen"], entry["last_seen"]) == (events[0][2], events[-1][2])
+    assert len(reputation.top_sources(limit=100)) == len(sources)
+
+
+def test_score_halves_every_half_life(clock):
+    reputation = ReputationService(capacity=4, half_life=HALF_LIFE, saturation=50.0)
+    reputation.record("198.51.100.1", SeverityLevel.CRITICAL, now=START)
+    for half_lives, expected in [(0, 10.0), (1, 5.0), (2, 2.5), (10, 10.0 / 1024)]:
+        assert reputation.get_score("198.51.100.1", now=START + half_lives * HALF_LIFE) == pytest.approx(expected)
+
+
+def test_risk_points_saturate(clock):
+    reputation = ReputationService(capacity=4, half_life=HALF_LIFE, saturation=50.0)
+    assert reputation.risk_points("198.51.100.1") == 0
+    points = []
+    for _ in range(100):
+        reputation.record("198.51.100.1", SeverityLevel.CRITICAL, now=START)
+        points.append(reputation.risk_points("198.51.100.1"))
+    assert points == sorted(points)
+    assert points[0] == int(MAX_REPUTATION_POINTS * (1 - math.exp(-10 / 50)))
+    assert points[-1] == MAX_REPUTATION_POINTS - 1  # Approaches but never reaches the maximum
+
+    reputation.record("198.51.100.2", SeverityLevel.INFO, now=START)
+    assert reputation.risk_points("198.51.100.2") == 0
+
+
+def test_eviction_keeps_the_worst_sources(clock):
+    reputation = ReputationService(capacity=50, half_life=HALF_LIFE, saturation=50.0)
+    reputation._rng = np.random.default_rng(0)
+    for i in range(5):
+        for _ in range(20):
+            reputation.record(f"203.0.113.{i}", SeverityLevel.CRITICAL, now=START)
+    for i in range(500):
+        reputation.record(f"198.51.{i // 256}.{i % 256}", SeverityLevel.LOW, now=START + i)
+
+    stats = reputation.get_stats()
+    assert stats["sources"] == 50
+    assert stats["evictions"] == 455
+    assert stats["updates"] == 600
+    assert len(set(reputation._slots.values())) == 50
+    assert all(reputation._ips[slot] == ip for ip, slot in reputation._slots.items())
+
+    clock[0] = START + 500
+    assert {entry["source_ip"] for entry in reputation.top_sources(limit=5)} == {f"203.0.113.{i}" for i in range(5)}
+
+
+def test_new_source_in_an_evicted_slot_starts_clean(clock):
+    reputation = ReputationService(capacity=1, half_life=HALF_LIFE, saturation=50.0)
+    reputation.record("198.51.100.1", SeverityLevel.CRITICAL, now=START)
+    reputation.record("198.51.100.2", SeverityLevel.LOW, now=START + 1)
+    assert reputation.get_score("198.51.100.1") == 0.0
+    assert reputation.get_score("198.51.100.2", now=START + 1) == 1.0
+    [entry] = reputation.top_sources()
+    assert (entry["events"], entry["critical_events"], entry["first_seen"]) == (1, 0, START + 1)
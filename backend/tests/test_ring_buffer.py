@@ -0,0 +1,84 @@
+"""Tests for IndexedRingBuffer against a plain list of everything appended."""
+import random
+
+import pytest
+
+from app.utils.ring_buffer import IndexedRingBuffer
+
+
+def retained(appended, capacity):
+    """(seq, key, item) of the items a ring of this capacity still holds."""
+    start = max(0, len(appended) - capacity)
+    return [(seq, key, item) for seq, (key, item) in enumerate(appended) if seq >= start]
+
+
+def check_against(ring, appended):
+    expected = retained(appended, ring.capacity)
+    assert len(ring) == len(expected)
+    assert ring.next_seq == len(appended)
+    assert ring.oldest_seq == (expected[0][0] if expected else 0)
+    assert ring.newest(len(appended) + 5) == [item for _, _, item in reversed(expected)]
+    assert list(ring.iter_newest()) == [item for _, _, item in reversed(expected)]
+
+    # The newest copy of each retained key wins; evicted keys are gone
+    latest = {}
+    for seq, key, item in expected:
+        latest[key] = (seq, item)
+    for key, _ in appended:
+        if key in latest:
+            assert key in ring
+            assert ring.seq_of(key) == latest[key][0]
+            assert ring.get(key) == latest[key][1]
+        else:
+            assert key not in ring
+            assert ring.get(key) is None
+    for seq in range(len(appended)):
+        in_ring = expected and seq >= expected[0][0]
+        assert ring.get_seq(seq) == (appended[seq][1] if in_ring else None)
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        IndexedRingBuffer(0)
+
+
+@pytest.mark.parametrize("capacity", [1, 7, 64])
+def test_random_appends_match_brute_force(capacity):
+    rng = random.Random(capacity)
+    ring = IndexedRingBuffer(capacity)
+    appended = []
+    for i in range(capacity * 5):
+        # Reuse keys now and then: re-pointed keys must survive the older copy's eviction
+        key = f"k{rng.randrange(i + 1)}" if i and rng.random() < 0.2 else f"k{i}"
+        item = {"id": key, "n": i}
+        seq, evicted = ring.append(key, item)
+        assert seq == i
+        assert evicted == (appended[i - capacity][1] if i >= capacity else None)
+        appended.append((key, item))
+        check_against(ring, appended)
+
+
+def test_iter_newest_before_and_newest_limit():
+    ring = IndexedRingBuffer(10)
+    for i in range(25):
+        ring.append(i, i)
+    assert list(ring.iter_newest(before=20)) == list(range(19, 14, -1))
+    assert list(ring.iter_newest(before=100)) == list(range(24, 14, -1))
+    assert list(ring.iter_newest(before=3)) == []
+    assert ring.newest(3) == [24, 23, 22]
+    assert ring.newest(0) == []
+
+
+def test_state_round_trip():
+    ring = IndexedRingBuffer(8)
+    appended = []
+    for i in range(21):
+        ring.append(f"k{i % 11}", i)
+        appended.append((f"k{i % 11}", i))
+
+    restored = IndexedRingBuffer(8)
+    restored.load_state(ring.get_state())
+    check_against(restored, appended)
+
+    with pytest.raises(ValueError):
+        IndexedRingBuffer(9).load_state(ring.get_state())
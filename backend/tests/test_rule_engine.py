@@ -0,0 +1,170 @@
+"""Tests for the compiled fallback rule engine and its hot reload."""
+import asyncio
+import json
+import os
+
+import pytest
+import yaml
+
+from app.core.rule_engine import RuleEngine, compile_rules
+from app.models.threat import SeverityLevel, ThreatType
+
+# The hard-coded maps _fallback_analysis used before the rule engine
+LEGACY_SEVERITY = {
+    "brute_force": SeverityLevel.CRITICAL,
+    "sql_injection": SeverityLevel.CRITICAL,
+    "ddos": SeverityLevel.CRITICAL,
+    "ransomware": SeverityLevel.CRITICAL,
+    "malware": SeverityLevel.CRITICAL,
+    "port_scan": SeverityLevel.HIGH,
+    "authentication": SeverityLevel.MEDIUM,
+    "login_attempt": SeverityLevel.INFO,
+    "api_request": SeverityLevel.INFO,
+    "firewall_event": SeverityLevel.INFO,
+    "normal_traffic": SeverityLevel.INFO,
+    "data_access": SeverityLevel.INFO,
+    "network_traffic": SeverityLevel.INFO,
+}
+LEGACY_THREAT_TYPE = {
+    "brute_force": ThreatType.BRUTE_FORCE,
+    "sql_injection": ThreatType.SQL_INJECTION,
+    "ddos": ThreatType.DDOS_ATTACK,
+    "ransomware": ThreatType.RANSOMWARE,
+    "malware": ThreatType.MALWARE,
+    "port_scan": ThreatType.PORT_SCAN,
+    "authentication": ThreatType.AUTHENTICATION,
+    "login_attempt": ThreatType.AUTHENTICATION,
+    "api_request": ThreatType.API_REQUEST,
+    "firewall_event": ThreatType.FIREWALL_EVENT,
+    "normal_traffic": ThreatType.NORMAL_TRAFFIC,
+    "data_access": ThreatType.API_REQUEST,
+    "network_traffic": ThreatType.NETWORK_ANOMALY,
+}
+
+
+@pytest.fixture(scope="module")
+def bundled():
+    return RuleEngine(check_interval=0)
+
+
+@pytest.mark.parametrize("event_type", sorted(LEGACY_SEVERITY) + ["something_new", "BRUTE_FORCE"])
+def test_bundled_rules_reproduce_legacy_maps(bundled, event_type):
+    match = bundled.evaluate({"event_type": event_type, "source_ip": "203.0.113.9"})
+    assert match.severity == LEGACY_SEVERITY.get(event_type.lower(), SeverityLevel.MEDIUM)
+    assert match.threat_type == LEGACY_THREAT_TYPE.get(event_type.lower(), ThreatType.AUTHENTICATION)
+
+
+def test_payload_rules_take_precedence(bundled):
+    sustained = bundled.evaluate({"event_type": "brute_force", "payload": {"attempts": 500}})
+    single = bundled.evaluate({"event_type": "brute_force", "payload": {"attempts": 3}})
+    assert sustained.rule_id == "brute-force-sustained"
+    assert single.rule_id == "brute-force"
+    assert bundled.evaluate({"event_type": "unknown_thing"}).rule_id == "default"
+
+
+DOCUMENT = {
+    "defaults": {"severity": "LOW", "threat_type": "API_REQUEST"},
+    "rules": [
+        {"id": "big", "event_type": "api_request",
+         "when": [{"field": "payload.bytes", "op": "gt", "value": 1000}], "severity": "HIGH"},
+        {"id": "admin", "event_type": ["api_request", "data_access"],
+         "when": [{"field": "payload.path", "op": "regex", "value": "^/admin"}], "severity": "MEDIUM"},
+        {"id": "listed", "event_type": "*",
+         "when": [{"field": "payload.country", "op": "in", "value": ["KP", "IR"]},
+                  {"field": "payload.tags", "op": "contains", "value": "tor"}], "severity": "CRITICAL"},
+        {"id": "flagged", "event_type": "*",
+         "when": [{"field": "payload.flag", "op": "exists"}], "severity": "INFO"},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def document_engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp("rules") / "rules.json"
+    path.write_text(json.dumps(DOCUMENT))
+    return RuleEngine(path=str(path), check_interval=0)
+
+
+def reference(event):
+    """First matching rule by walking DOCUMENT's conditions directly (type-specific before wildcard)."""
+    payload = event.get("payload", {})
+    event_type = event["event_type"]
+    if event_type == "api_request" and isinstance(payload.get("bytes"), int) and payload["bytes"] > 1000:
+        return "big"
+    if event_type in ("api_request", "data_access") and str(payload.get("path", "")).startswith("/admin"):
+        return "admin"
+    if payload.get("country") in ("KP", "IR") and "tor" in payload.get("tags", []):
+        return "listed"
+    if "flag" in payload:
+        return "flagged"
+    return "default"
+
+
+@pytest.mark.parametrize("event_type", ["api_request", "data_access", "port_scan"])
+@pytest.mark.parametrize("payload", [
+    {},
+    {"bytes": 5000},
+    {"bytes": True},
+    {"bytes": 10, "path": "/admin/users"},
+    {"path": "/api/admin"},
+    {"country": "KP", "tags": ["tor", "vpn"]},
+    {"country": "KP", "tags": ["vpn"], "flag": None},
+    {"country": "US", "tags": ["tor"]},
+])
+def test_compiled_conditions_match_reference(document_engine, event_type, payload):
+    event = {"event_type": event_type, "payload": payload}
+    assert document_engine.evaluate(event).rule_id == reference(event)
+
+
+def test_invalid_rules_are_rejected():
+    for rule in (
+        {"id": "bad-op", "when": [{"field": "x", "op": "between", "value": 1}]},
+        {"id": "bad-regex", "when": [{"field": "x", "op": "regex", "value": "("}]},
+        {"id": "bad-severity", "severity": "SEVERE"},
+        {"id": "bad-template", "description": "{unknown}"},
+    ):
+        with pytest.raises(ValueError, match=rule["id"]):
+            compile_rules({"rules": [rule]})
+
+
+def write_rules(path, severity, mtime):
+    path.write_text(yaml.safe_dump({"rules": [{"id": "r", "event_type": "ddos", "severity": severity}]}))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_swaps_rules_and_keeps_them_on_errors(tmp_path):
+    path = tmp_path / "rules.yaml"
+    write_rules(path, "LOW", 1_000_000)
+    engine = RuleEngine(path=str(path), check_interval=0)
+    assert engine.evaluate({"event_type": "ddos"}).severity == SeverityLevel.LOW
+    assert not engine.maybe_reload()
+
+    write_rules(path, "HIGH", 1_000_100)
+    assert engine.maybe_reload()
+    assert engine.evaluate({"event_type": "ddos"}).severity == SeverityLevel.HIGH
+
+    path.write_text("rules: [{id: broken, severity: SEVERE}]")
+    os.utime(path, (1_000_200, 1_000_200))
+    assert not engine.maybe_reload()
+    assert engine.reload_errors == 1
+    assert engine.evaluate({"event_type": "ddos"}).severity == SeverityLevel.HIGH
+
+
+def test_evaluate_does_not_touch_the_rules_file(tmp_path):
+    path = tmp_path / "rules.yaml"
+    write_rules(path, "LOW", 1_000_000)
+    engine = RuleEngine(path=str(path), check_interval=0.01)
+    write_rules(path, "HIGH", 1_000_100)
+    assert engine.evaluate({"event_type": "ddos"}).severity == SeverityLevel.LOW
+
+    async def watch_until_reloaded():
+        task = asyncio.create_task(engine.watch())
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if engine.reloads == 2:
+                break
+        engine.stop()
+        task.cancel()
+
+    asyncio.run(watch_until_reloaded())
+    assert engine.evaluate({"event_type": "ddos"}).severity == SeverityLevel.HIGH
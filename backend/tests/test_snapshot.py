@@ -0,0 +1,143 @@
+"""Tests for snapshot save/restore of the FirestoreService state and its warm-up from the threat log."""
+import asyncio
+import copy
+import pickle
+from collections import Counter
+from datetime import timedelta
+
+import pytest
+
+from app.config import settings
+from app.services import snapshot_service
+from app.services.firestore_service import FirestoreService
+from app.services.snapshot_service import SnapshotService
+from tests.factories import CAPACITY, START, filled_store, make_threat_models, make_threats
+from tests.test_threat_indexes import check_indexes
+
+
+def check_consistency(store, retained):
+    """Counters, secondary indexes and search index match a recomputation over the retained threats."""
+    assert [t["id"] for t in store.threats.newest(len(retained))] == [t["id"] for t in reversed(retained)]
+    assert store._severity_counts == Counter(t["severity"] for t in retained)
+    assert store._type_counts == Counter(t["threat_type"] for t in retained)
+    check_indexes(store, retained)
+    assert store.search_index.get_stats()["documents"] == len(retained)
+
+
+@pytest.mark.parametrize("capacity", [CAPACITY, CAPACITY // 2])
+def test_snapshot_round_trip(capacity):
+    threats = make_threats(CAPACITY * 2 + 3)
+    state = copy.deepcopy(filled_store(threats).get_state())
+
+    store = FirestoreService(max_threats=capacity)
+    store.load_state(state)
+    check_consistency(store, threats[-capacity:])
+    assert len(store.threat_table) == len(threats)
+
+    store._cache_threat(make_threats(1, seed=2)[0] | {"id": "threat-new", "timestamp": START + timedelta(days=1)})
+    check_consistency(store, threats[-capacity + 1:] + [store.threats.get("threat-new")])
+
+
+@pytest.mark.parametrize("corrupt", ["missing_table", "missing_alerts", "bad_counts"])
+def test_failed_snapshot_load_leaves_a_fresh_store(corrupt):
+    state = copy.deepcopy(filled_store(make_threats(CAPACITY)).get_state())
+    if corrupt == "missing_table":
+        del state["threat_table"]
+    elif corrupt == "missing_alerts":
+        del state["alert_history"]
+    else:
+        state["severity_counts"] = {"HIGH": 1}
+
+    store = filled_store(make_threats(10, seed=3))
+    with pytest.raises((KeyError, ValueError)):
+        store.load_state(state)
+    assert len(store.threats) == 0 and not store.alerts
+    assert store._restored_until_ms is None and len(store.threat_table) == 0
+    check_consistency(store, [])
+
+
+def test_warm_up_keeps_out_of_order_threats_from_the_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "storage_backend", "local")
+    monkeypatch.setattr(settings, "threat_log_dir", str(tmp_path / "threat_log"))
+    threats = make_threat_models(40)
+    # Written after the snapshot, but with an event time older than anything restored
+    late = make_threat_models(1, seed=4)[0]
+    late.id, late.timestamp = "threat-late", START - timedelta(hours=1)
+
+    async def run():
+        store = FirestoreService(max_threats=CAPACITY)
+        for threat in threats[:30]:
+            await store.store_threat(threat)
+        state = store.get_state()
+        for threat in threats[30:] + [late]:
+            await store.store_threat(threat)
+        await store.close()
+
+        restarted = FirestoreService(max_threats=CAPACITY)
+        restarted.load_state(state)
+        await restarted.start()
+        recent = await restarted.get_recent_threats(limit=CAPACITY)
+        await restarted.close()
+        return recent
+
+    recent = asyncio.run(run())
+    assert [t["id"] for t in recent] == ["threat-late"] + [t.id for t in reversed(threats)]
+
+
+class Component:
+    def __init__(self, value=None, fail=False):
+        self.value = value
+        self.fail = fail
+
+    def get_state(self):
+        return {"value": self.value}
+
+    def load_state(self, state):
+        if self.fail:
+            raise ValueError("bad state")
+        self.value = state["value"]
+
+
+def test_service_saves_and_restores_components(tmp_path):
+    path = tmp_path / "snapshot" / "state.pkl"
+    saver = SnapshotService(path=str(path), interval=0)
+    saver.register("store", filled_store(make_threats(CAPACITY + 5)))
+    saver.register("counter", Component(7))
+    saver.register("broken", Component(1))
+    assert asyncio.run(saver.save())
+    assert path.exists() and not path.with_name("state.pkl.tmp").exists()
+    assert saver.get_stats()["snapshots"] == 1 and saver.last_bytes == path.stat().st_size
+
+    store, counter, broken, missing = FirestoreService(max_threats=CAPACITY), Component(), Component(fail=True), Component(3)
+    loader = SnapshotService(path=str(path), interval=0)
+    for name, component in [("store", store), ("counter", counter), ("broken", broken), ("missing", missing)]:
+        loader.register(name, component)
+    assert asyncio.run(loader.restore())
+    check_consistency(store, make_threats(CAPACITY + 5)[-CAPACITY:])
+    assert counter.value == 7
+    assert broken.value is None  # Failed to load: keeps its fresh state
+    assert missing.value == 3  # Not in the snapshot
+    assert loader.restored_from == saver.last_snapshot_at
+
+
+def test_stale_or_foreign_snapshots_are_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "state.pkl"
+    assert not asyncio.run(SnapshotService(path=str(path)).restore())
+
+    saver = SnapshotService(path=str(path))
+    saver.register("counter", Component(7))
+    assert asyncio.run(saver.save())
+
+    monkeypatch.setattr(snapshot_service.time, "time", lambda: saver.last_snapshot_at + 48 * 3600)
+    loader = SnapshotService(path=str(path))
+    counter = Component()
+    loader.register("counter", counter)
+    assert not asyncio.run(loader.restore())
+    monkeypatch.undo()
+
+    with open(path, "wb") as f:
+        pickle.dump({"version": snapshot_service.SNAPSHOT_VERSION + 1, "created_at": 0, "components": {}}, f)
+    assert not asyncio.run(loader.restore())
+    path.write_bytes(b"not a pickle")
+    assert not asyncio.run(loader.restore())
+    assert counter.value is None
@@ -0,0 +1,58 @@
+"""Tests for the FirestoreService secondary indexes against a linear scan of the retained threats."""
+import asyncio
+
+import pytest
+
+from app.services.firestore_service import THREAT_INDEX_FIELDS
+from tests.factories import CAPACITY, filled_store, make_threats
+
+
+def check_indexes(store, retained):
+    """Each index maps a value to the sequence numbers of the retained threats with it, oldest first."""
+    oldest = store.threats.oldest_seq
+    for name, field in THREAT_INDEX_FIELDS.items():
+        expected = {}
+        for seq, threat in enumerate(retained, start=oldest):
+            if threat.get(field) is not None:
+                expected.setdefault(threat[field], []).append(seq)
+        assert {key: list(seqs) for key, seqs in store._threat_indexes[name].items()} == expected
+
+
+@pytest.mark.parametrize("count", [0, 1, CAPACITY, CAPACITY + 1, CAPACITY * 4 + 7])
+def test_indexes_survive_eviction(count):
+    threats = make_threats(count)
+    check_indexes(filled_store(threats), threats[-CAPACITY:] if count else [])
+
+
+FILTERS = [
+    {},
+    {"severity": "HIGH"},
+    {"severity": "CRITICAL", "threat_type": "MALWARE"},
+    {"source_ip": "203.0.113.2", "country": "RU"},
+    {"threat_type": "PORT_SCAN", "country": "US", "severity": "LOW"},
+    {"severity": "UNKNOWN"},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("limit", [1, 10, CAPACITY])
+def test_filtered_recent_matches_linear_scan(filters, limit):
+    threats = make_threats(CAPACITY * 3)
+    store = filled_store(threats)
+    expected = [
+        t["id"] for t in reversed(threats[-CAPACITY:])
+        if all(t.get(THREAT_INDEX_FIELDS[name]) == value for name, value in filters.items())
+    ]
+    found = asyncio.run(store.get_recent_threats(limit=limit, **filters))
+    assert [t["id"] for t in found] == expected[:limit]
+
+
+def test_missing_fields_are_not_indexed():
+    threats = make_threats(20)
+    for threat in threats[::2]:
+        threat["source_country_code"] = None
+    store = filled_store(threats)
+    assert sum(len(seqs) for seqs in store._threat_indexes["country"].values()) == sum(
+        t["source_country_code"] is not None for t in threats
+    )
+    check_indexes(store, threats)
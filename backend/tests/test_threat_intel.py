@@ -0,0 +1,155 @@
+"""Tests for compiled threat-intel feeds, their reload, and the Bloom prefilter."""
+import asyncio
+import ipaddress
+import random
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services import threat_intel_service
+from app.services.threat_intel_service import ThreatIntelService, compile_feed
+from app.utils.bloom_filter import BloomFilter, fold_key
+
+
+def make_feed(seed):
+    """Random exact addresses and CIDRs of both families, including addresses ending in zero bytes."""
+    rng = random.Random(seed)
+    v4 = [ipaddress.IPv4Address(rng.getrandbits(32)) for _ in range(200)]
+    v6 = [ipaddress.IPv6Address(rng.getrandbits(128)) for _ in range(100)]
+    v6 += [ipaddress.IPv6Address(rng.getrandbits(112) << 16) for _ in range(20)]
+    v6 += [ipaddress.IPv6Address("2001:db8::100"), ipaddress.IPv6Address("2001:db8::")]
+    nets = [ipaddress.ip_network(f"{ipaddress.IPv4Address(rng.getrandbits(32))}/{rng.randint(8, 30)}", strict=False)
+            for _ in range(30)]
+    nets += [ipaddress.ip_network(f"{ipaddress.IPv6Address(rng.getrandbits(128))}/{rng.randint(16, 64)}", strict=False)
+             for _ in range(10)]
+    return v4 + v6, nets
+
+
+def write_feed(path, addresses, networks, header="# category: scanner\n# confidence: 0.7\n"):
+    lines = [str(a) for a in addresses] + [f"{n}  # inline comment" for n in networks]
+    path.write_text(header + "\n".join(lines) + "\n; trailing comment\nnot-an-ip\n10.0.0.0/40\n")
+
+
+def probes(addresses, networks, seed):
+    """Listed addresses, their neighbours, CIDR edges and random addresses of both families."""
+    rng = random.Random(seed)
+    edges = [(type(a), int(a)) for a in addresses]
+    for network in networks:
+        edges += [(type(network.network_address), int(network.network_address)),
+                  (type(network.network_address), int(network.broadcast_address))]
+    candidates = []
+    for cls, value in edges:
+        top = (1 << cls(0).max_prefixlen) - 1
+        candidates += [cls(v) for v in (value - 1, value, value + 1) if 0 <= v <= top]
+    candidates += [ipaddress.IPv4Address(rng.getrandbits(32)) for _ in range(300)]
+    candidates += [ipaddress.IPv6Address(rng.getrandbits(128)) for _ in range(300)]
+    return candidates
+
+
+def listed(addresses, networks, address):
+    return address in addresses or any(address in network for network in networks)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_compiled_feed_matches_reference(tmp_path, seed):
+    addresses, networks = make_feed(seed)
+    path = tmp_path / "feed.txt"
+    write_feed(path, addresses, networks)
+    feed = compile_feed(str(path))
+
+    assert (feed.category, feed.confidence) == ("scanner", 0.7)
+    assert feed.invalid_lines == 2
+    assert len(feed.v4_exact) + len(feed.v6_exact) == len(set(addresses))
+
+    exact = set(addresses)
+    for address in probes(addresses, networks, seed):
+        contains = feed.contains_v4 if address.version == 4 else feed.contains_v6
+        assert contains(int(address)) == listed(exact, networks, address), address
+
+    v4 = np.array([int(a) for a in probes(addresses, networks, seed) if a.version == 4], dtype=np.uint32)
+    assert feed.contains_v4_many(v4).tolist() == [feed.contains_v4(int(a)) for a in v4]
+
+
+def test_ipv6_addresses_ending_in_zero_bytes(tmp_path):
+    path = tmp_path / "feed.txt"
+    path.write_text("2001:db8::100\n2001:db8::\n2001:db8::1:0:0\n")
+    feed = compile_feed(str(path))
+    for ip in ("2001:db8::100", "2001:db8::", "2001:db8::1:0:0"):
+        assert feed.contains_v6(int(ipaddress.IPv6Address(ip)))
+    for ip in ("2001:db8::1", "2001:db8::101", "2001:db8::1:0:1"):
+        assert not feed.contains_v6(int(ipaddress.IPv6Address(ip)))
+
+
+@pytest.fixture
+def feed_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "threat_intel_bloom_error_rate", 0.01)
+    directory = tmp_path / "feeds"
+    directory.mkdir()
+    return directory
+
+
+@pytest.mark.parametrize("bloom", [False, True])
+def test_service_lookup_matches_reference(feed_dir, monkeypatch, bloom):
+    monkeypatch.setattr(settings, "threat_intel_bloom_enabled", bloom)
+    feeds = {name: make_feed(seed) for seed, name in enumerate(["alpha", "beta"])}
+    for name, (addresses, networks) in feeds.items():
+        write_feed(feed_dir / f"{name}.txt", addresses, networks)
+    (feed_dir / "ignored.csv").write_text("8.8.8.8\n")
+
+    intel = ThreatIntelService(feed_dir=str(feed_dir))
+    assert asyncio.run(intel.reload())
+    assert (intel._index.bloom is not None) == bloom
+
+    for address in probes(*feeds["alpha"], 7) + probes(*feeds["beta"], 8) + [ipaddress.ip_address("2001:db8::100")]:
+        expected = [name for name, (a, n) in feeds.items() if listed(set(a), n, address)]
+        match = intel.lookup(str(address))
+        assert (match["feeds"] if match else []) == expected, address
+
+
+def test_reload_follows_the_directory(feed_dir):
+    intel = ThreatIntelService(feed_dir=str(feed_dir))
+    calls = []
+    intel.add_reload_listener(lambda: calls.append(1))
+    assert not asyncio.run(intel.reload())  # Empty directory: nothing to install
+    assert intel.lookup("8.8.8.8") is None
+
+    (feed_dir / "a.txt").write_text("8.8.8.8\n")
+    assert asyncio.run(intel.reload())
+    assert intel.lookup("8.8.8.8")["feeds"] == ["a"]
+    assert not asyncio.run(intel.reload())
+    assert asyncio.run(intel.reload(force=True))
+
+    (feed_dir / "a.txt").unlink()
+    assert asyncio.run(intel.reload())
+    assert intel.lookup("8.8.8.8") is None
+    assert len(calls) == 3
+
+
+def test_failed_reload_keeps_the_index(feed_dir, monkeypatch):
+    (feed_dir / "a.txt").write_text("8.8.8.8\n")
+    intel = ThreatIntelService(feed_dir=str(feed_dir))
+    assert asyncio.run(intel.reload())
+
+    def unreadable(path):
+        raise OSError(f"cannot read {path}")
+
+    (feed_dir / "b.txt").mkdir()  # Not a regular file: skipped by the scan
+    (feed_dir / "c.txt").write_text("1.1.1.1\n")
+    monkeypatch.setattr(threat_intel_service, "compile_feed", unreadable)
+    assert not asyncio.run(intel.reload())
+    assert intel.reload_errors == 1
+    assert intel.lookup("8.8.8.8")["feeds"] == ["a"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    rng = random.Random(3)
+    keys = [rng.getrandbits(128) for _ in range(5000)]
+    bloom = BloomFilter(len(keys), error_rate=0.01)
+    bloom.add_many(np.array([fold_key(k) for k in keys], dtype=np.uint64))
+    assert all(fold_key(k) in bloom for k in keys)
+
+    false_positives = sum(fold_key(rng.getrandbits(128)) in bloom for _ in range(20000))
+    assert false_positives / 20000 < 0.03
+    stats = bloom.get_stats()
+    assert stats["keys"] == len(keys) and stats["load"] == 1.0
@@ -0,0 +1,152 @@
+"""Tests for ThreatLog range scans, tail and crash recovery against the appended list."""
+import asyncio
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import settings
+from app.services.firestore_service import FirestoreService
+from app.services.threat_log import SEGMENT_SUFFIX, ThreatLog, to_millis
+from tests.factories import make_threat_models
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_threats(count, seed=5):
+    """Threats whose timestamps mostly increase, with some arriving out of order."""
+    rng = random.Random(seed)
+    threats = []
+    for i in range(count):
+        offset = i * 10 - (rng.randrange(600) if rng.random() < 0.1 else 0)
+        threats.append({
+            "id": f"threat-{i}",
+            "timestamp": (START + timedelta(seconds=offset)).isoformat(),
+            "severity": rng.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"]),
+            "source_ip": f"10.0.{rng.randrange(4)}.{rng.randrange(256)}",
+        })
+    return threats
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    return str(tmp_path / "threat_log")
+
+
+def open_log(directory, segment_bytes=4096):
+    return ThreatLog(directory=directory, segment_bytes=segment_bytes, max_bytes=1 << 30, retention_hours=0)
+
+
+def write(directory, threats, **kwargs):
+    log = open_log(directory, **kwargs)
+    for threat in threats:
+        log.append(threat)
+    return log
+
+
+def ids(threats):
+    return [threat["id"] for threat in threats]
+
+
+def test_range_scans_match_linear_filter(log_dir):
+    threats = make_threats(1500)
+    log = write(log_dir, threats)
+    assert len(log.segments) > 5
+
+    rng = random.Random(11)
+    for _ in range(40):
+        a, b = sorted(rng.randrange(-100, 16000) for _ in range(2))
+        start, end = START + timedelta(seconds=a), START + timedelta(seconds=b)
+        expected = [t for t in threats if to_millis(start) <= to_millis(t["timestamp"]) <= to_millis(end)]
+        assert ids(log.get_threats_between(start, end)) == ids(expected)
+
+        severity = rng.choice(["LOW", "HIGH"])
+        filtered = [t for t in expected if t["severity"] == severity]
+        assert ids(log.get_threats_between(start, end, filters={"severity": severity})) == ids(filtered)
+        assert ids(log.get_threats_between(start, end, limit=5)) == ids(expected[:5])
+    log.close()
+
+
+def test_tail_returns_last_appended_in_order(log_dir):
+    threats = make_threats(700)
+    log = write(log_dir, threats)
+    for limit in (0, 1, 63, 64, 65, 200, 699, 700, 1000):
+        assert ids(log.tail(limit)) == ids(threats[len(threats) - min(limit, len(threats)):])
+    log.close()
+
+
+def test_reopen_reads_sealed_indexes(log_dir):
+    threats = make_threats(900)
+    write(log_dir, threats).close()
+
+    log = open_log(log_dir)
+    assert log.get_stats()["threats"] == len(threats)
+    assert ids(log.tail(len(threats))) == ids(threats)
+    assert ids(log.get_threats_between(START, START + timedelta(days=1))) == ids(
+        [t for t in threats if to_millis(t["timestamp"]) >= to_millis(START)]
+    )
+    log.close()
+
+
+@pytest.mark.parametrize("torn", ["partial_header", "partial_payload", "bad_crc"])
+def test_torn_tail_record_is_truncated(log_dir, torn):
+    threats = make_threats(300)
+    write(log_dir, threats, segment_bytes=1 << 20).close()
+
+    active = sorted(name for name in os.listdir(log_dir) if name.endswith(SEGMENT_SUFFIX))[-1]
+    path = os.path.join(log_dir, active)
+    good_size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        if torn == "partial_header":
+            f.seek(0, os.SEEK_END)
+            f.write(b"\x10\x00\x00")
+        elif torn == "partial_payload":
+            f.truncate(good_size - 7)
+        else:
+            f.seek(good_size - 3)
+            f.write(b"XYZ")
+
+    log = open_log(log_dir, segment_bytes=1 << 20)
+    survivors = threats if torn == "partial_header" else threats[:-1]
+    assert log.truncated_bytes > 0
+    assert ids(log.tail(1000)) == ids(survivors)
+
+    # Appends continue cleanly after the truncation point
+    extra = make_threats(301, seed=9)[-1]
+    log.append(extra)
+    log.close()
+    log = open_log(log_dir, segment_bytes=1 << 20)
+    assert ids(log.tail(1000)) == ids(survivors + [extra])
+    assert log.truncated_bytes == 0
+    log.close()
+
+
+def test_store_appends_on_the_threat_log_thread(log_dir, monkeypatch):
+    monkeypatch.setattr(settings, "storage_backend", "local")
+    monkeypatch.setattr(settings, "threat_log_dir", log_dir)
+    threads = []
+    append = ThreatLog.append
+
+    def recording_append(self, threat):
+        threads.append(threading.current_thread().name)
+        append(self, threat)
+
+    monkeypatch.setattr(ThreatLog, "append", recording_append)
+    threats = make_threat_models(50)
+
+    async def run():
+        store = FirestoreService(max_threats=20)
+        for threat in threats:
+            await store.store_threat(threat)
+        found = await store.get_threats_between(START, START + timedelta(hours=1), limit=100)
+        await store.close()
+        return found
+
+    found = asyncio.run(run())
+    assert threads and all(name.startswith("ts-threat-log") for name in threads)
+    assert ids(found) == [t.id for t in threats]
+    log = open_log(log_dir)
+    assert ids(log.tail(100)) == [t.id for t in threats]
+    log.close()
@@ -0,0 +1,161 @@
+"""Tests for keyset pagination, time windows and polling on threat and alert listings."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import threats as threat_routes
+from app.models.alert import Alert
+from app.services import firestore_service
+from app.services.firestore_service import THREAT_INDEX_FIELDS
+from app.utils.cursor import encode_cursor
+from tests.factories import CAPACITY, START, filled_store, make_threats
+
+FILTERS = [
+    {},
+    {"severity": "HIGH"},
+    {"severity": "CRITICAL", "threat_type": "MALWARE"},
+    {"source_ip": "203.0.113.2", "country": "RU"},
+    {"severity": "UNKNOWN"},
+]
+
+
+def reference(retained, filters, since=None, until=None):
+    return [
+        t for t in reversed(retained)
+        if all(t.get(THREAT_INDEX_FIELDS[name]) == value for name, value in filters.items())
+        and (since is None or t["timestamp"] >= since)
+        and (until is None or t["timestamp"] <= until)
+    ]
+
+
+def walk(store, **query):
+    """Follow next_cursor to the end, checking page bounds."""
+    async def run():
+        pages, cursor = [], None
+        while True:
+            page = await store.get_threat_page(limit=9, cursor=cursor, **query)
+            assert len(page["threats"]) <= 9
+            pages.extend(page["threats"])
+            if not page["has_more"]:
+                assert page["next_cursor"] is None
+                return pages
+            cursor = page["next_cursor"]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_cursor_walk_matches_linear_scan(filters):
+    threats = make_threats(CAPACITY * 3)
+    store = filled_store(threats)
+    retained = threats[-CAPACITY:]
+    window = {"since": retained[20]["timestamp"], "until": retained[-30]["timestamp"]}
+
+    for query in ({}, window):
+        expected = reference(retained, filters, **query)
+        assert [t["id"] for t in walk(store, **filters, **query)] == [t["id"] for t in expected]
+
+
+def test_cursor_for_an_evicted_threat_falls_back_to_its_key():
+    threats = make_threats(CAPACITY * 2)
+    store = filled_store(threats)
+    evicted = threats[CAPACITY - 1]
+    cursor = encode_cursor(int(evicted["timestamp"].timestamp() * 1000), evicted["id"])
+
+    page = asyncio.run(store.get_threat_page(limit=5, since_cursor=cursor))
+    assert [t["id"] for t in page["threats"]] == [t["id"] for t in reversed(threats[CAPACITY:CAPACITY + 5])]
+    # Equal timestamps are ordered by id: "threat-297" < "threat-missing"
+    page = asyncio.run(store.get_threat_page(limit=5, cursor=encode_cursor(
+        int(threats[-3]["timestamp"].timestamp() * 1000), "threat-missing"
+    )))
+    assert [t["id"] for t in page["threats"]] == [t["id"] for t in reversed(threats[-7:-2])]
+
+
+def test_polling_returns_only_newer_threats():
+    threats = make_threats(CAPACITY * 2)
+    store = filled_store(threats[:-25])
+    latest = asyncio.run(store.get_threat_page(limit=1))["latest_cursor"]
+    for threat in threats[-25:]:
+        store._cache_threat(threat)
+
+    seen = []
+    while True:
+        page = asyncio.run(store.get_threat_page(limit=10, since_cursor=latest))
+        if not page["threats"]:
+            assert page["latest_cursor"] == latest
+            break
+        seen = [t["id"] for t in page["threats"]] + seen
+        latest = page["latest_cursor"]
+    assert seen == [t["id"] for t in reversed(threats[-25:])]
+
+
+def test_malformed_cursor_is_rejected():
+    store = filled_store(make_threats(5))
+    with pytest.raises(ValueError):
+        asyncio.run(store.get_threat_page(cursor="not-a-cursor"))
+
+
+def test_alert_cursor_walk_and_polling():
+    store = filled_store([])
+
+    async def run():
+        for i in range(30):
+            await store.store_alert(Alert(
+                id=f"alert-{i}", threat_id=f"threat-{i}", title="t", description="d", severity="HIGH",
+                priority=["P1", "P2", "P3", "P4"][i % 4], created_at=START + timedelta(seconds=i),
+                source_ip="203.0.113.7",
+            ))
+        walked, cursor = [], None
+        while True:
+            page = await store.get_alert_page(limit=7, cursor=cursor)
+            walked.extend(a["id"] for a in page["alerts"])
+            if not page["has_more"]:
+                break
+            cursor = page["next_cursor"]
+        assert walked == [f"alert-{i}" for i in range(29, -1, -1)]
+
+        latest = (await store.get_alert_page(limit=1))["latest_cursor"]
+        await store.update_alert_status("alert-3", "RESOLVED")
+        await store.update_alert_status("alert-3", "NEW")  # Reopened: active again, newest activation
+        page = await store.get_alert_page(limit=10, since_cursor=latest)
+        assert [a["id"] for a in page["alerts"]] == ["alert-3"]
+
+        window = await store.get_alert_page(limit=50, since=START + timedelta(seconds=10),
+                                            until=START + timedelta(seconds=12))
+        assert sorted(a["id"] for a in window["alerts"]) == ["alert-10", "alert-11", "alert-12"]
+        with pytest.raises(ValueError):
+            await store.get_alert_page(order="priority", cursor=latest)
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    threats = make_threats(CAPACITY)
+    monkeypatch.setattr(firestore_service, "_firestore_service", filled_store(threats))
+    app = FastAPI()
+    app.include_router(threat_routes.router, prefix="/api/threats")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("start, end, status", [
+    ("2024-01-01T00:00:10+00:00", "2024-01-01T00:00:20", 200),
+    ("2024-01-01T00:00:10", "2024-01-01T00:00:20+00:00", 200),
+    ("2024-01-01T00:00:20", "2024-01-01T00:00:10+00:00", 400),
+    ("2024-01-01T02:00:20+02:00", "2024-01-01T00:00:10", 400),
+    ("2024-01-01T02:00:10+02:00", "2024-01-01T00:00:20", 200),
+])
+def test_range_accepts_mixed_timezones(client, start, end, status):
+    response = client.get("/api/threats/range", params={"start": start, "end": end})
+    assert response.status_code == status
+    if status == 200:
+        assert [t["id"] for t in response.json()["threats"]] == [f"threat-{i}" for i in range(10, 21)]
+
+
+def test_recent_rejects_both_cursors(client):
+    latest = client.get("/api/threats/recent", params={"limit": 1}).json()["latest_cursor"]
+    response = client.get("/api/threats/recent", params={"cursor": latest, "since_cursor": latest})
+    assert response.status_code == 400
+    assert client.get("/api/threats/recent", params={"cursor": "garbage"}).status_code == 400
@@ -0,0 +1,69 @@
+"""Tests for FirestoreService full-text search against a linear scan of the retained threats."""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.utils.inverted_index import tokenize
+from tests.factories import CAPACITY, filled_store, make_threats
+
+
+def terms_of(threat):
+    terms = tokenize(threat["description"]) + tokenize(threat["contextual_analysis"])
+    for signal in threat["contributing_signals"]:
+        terms += tokenize(signal)
+    return terms + tokenize(threat["mitre_attack_id"] or "")
+
+
+def has(threat, term):
+    terms = terms_of(threat)
+    return any(t.startswith(term[:-1]) for t in terms) if term.endswith("*") else term in terms
+
+
+def make_searchable(count):
+    threats = make_threats(count)
+    for i, threat in enumerate(threats[::7]):
+        threat["contextual_analysis"] = "Lateral movement over SMB"
+        threat["contributing_signals"] = ["tor exit node", f"burst-{i % 3}"]
+    return threats
+
+
+@pytest.mark.parametrize("query", ["ssh", "beacon -tor", "exfil*", "t1110*", "dns OR internal login", "smb", "burst-1"])
+def test_search_matches_linear_scan(query):
+    threats = make_searchable(CAPACITY * 3)
+    store = filled_store(threats)
+    retained = threats[-CAPACITY:]
+
+    branches = [branch.split() for branch in query.split(" OR ")]
+    expected = [
+        t["id"] for t in reversed(retained)
+        if any(
+            all(has(t, w) for w in words if not w.startswith("-"))
+            and not any(has(t, w[1:]) for w in words if w.startswith("-"))
+            for words in branches
+        )
+    ]
+    assert [t["id"] for t in asyncio.run(store.search_threats(query, limit=CAPACITY))] == expected
+    assert [t["id"] for t in asyncio.run(store.search_threats(query, limit=3))] == expected[:3]
+
+
+@pytest.mark.parametrize("count", [0, CAPACITY, CAPACITY * 4 + 7])
+def test_search_index_follows_eviction(count):
+    threats = make_searchable(count)
+    store = filled_store(threats)
+    retained = threats[-CAPACITY:] if count else []
+    stats = store.search_index.get_stats()
+    assert stats["documents"] == len(retained)
+    assert stats["postings"] == sum(len(set(terms_of(t))) for t in retained)
+
+
+def test_invalid_and_disabled_search(monkeypatch):
+    store = filled_store(make_threats(10))
+    with pytest.raises(ValueError):
+        asyncio.run(store.search_threats("-ssh"))
+
+    monkeypatch.setattr(settings, "threat_search_enabled", False)
+    store = filled_store(make_threats(10))
+    assert store.search_index is None
+    with pytest.raises(ValueError, match="disabled"):
+        asyncio.run(store.search_threats("ssh"))
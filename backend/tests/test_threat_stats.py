@@ -0,0 +1,41 @@
+"""Tests for the incrementally maintained threat statistics against a recount of the retained threats."""
+import asyncio
+from collections import Counter
+
+import pytest
+
+from tests.factories import CAPACITY, filled_store, make_threats
+
+
+@pytest.mark.parametrize("count", [0, 1, CAPACITY, CAPACITY + 1, CAPACITY * 4 + 7])
+def test_stats_match_a_recount(count):
+    threats = make_threats(count)
+    retained = threats[-CAPACITY:] if count else []
+    stats = asyncio.run(filled_store(threats).get_threat_stats())
+
+    assert stats["total_threats"] == len(retained)
+    assert stats["severity_distribution"] == Counter(t["severity"] for t in retained)
+    assert stats["type_distribution"] == Counter(t["threat_type"] for t in retained)
+    assert all(stats["severity_distribution"].values())  # Categories evicted to zero are dropped
+
+
+def test_stats_after_every_insert():
+    threats = make_threats(CAPACITY + 40, seed=4)
+    store = filled_store([])
+    for i, threat in enumerate(threats):
+        store._cache_threat(threat)
+        retained = threats[max(0, i + 1 - CAPACITY):i + 1]
+        assert store._severity_counts == Counter(t["severity"] for t in retained)
+        assert store._type_counts == Counter(t["threat_type"] for t in retained)
+
+
+def test_missing_category_counts_as_unknown():
+    threats = make_threats(CAPACITY + 5)
+    for threat in threats[:3]:
+        del threat["severity"]
+    store = filled_store(threats[:10])
+    assert store._severity_counts["UNKNOWN"] == 3
+
+    for threat in threats[10:]:
+        store._cache_threat(threat)
+    assert "UNKNOWN" not in store._severity_counts
@@ -0,0 +1,41 @@
+"""Tests for the FirestoreService ring-buffer threat store and its id index."""
+import asyncio
+
+import pytest
+
+from tests.factories import CAPACITY, filled_store, make_threats
+
+
+@pytest.mark.parametrize("count", [0, 1, CAPACITY, CAPACITY + 1, CAPACITY * 4 + 7])
+def test_store_keeps_the_newest_threats(count):
+    threats = make_threats(count)
+    store = filled_store(threats)
+    retained = threats[-CAPACITY:] if count else []
+
+    assert len(store.threats) == len(retained)
+    assert store.threats.oldest_seq == max(0, count - CAPACITY)
+    recent = asyncio.run(store.get_recent_threats(limit=CAPACITY * 10))
+    assert [t["id"] for t in recent] == [t["id"] for t in reversed(retained)]
+    assert [t["id"] for t in asyncio.run(store.get_recent_threats(limit=7))] == [t["id"] for t in reversed(retained)][:7]
+
+
+def test_lookup_by_id_follows_eviction():
+    threats = make_threats(CAPACITY * 2)
+    store = filled_store(threats)
+    for threat in threats[:CAPACITY]:
+        assert asyncio.run(store.get_threat(threat["id"])) is None
+    for threat in threats[CAPACITY:]:
+        assert asyncio.run(store.get_threat(threat["id"])) is threat
+
+
+def test_reused_id_points_at_the_newest_copy():
+    threats = make_threats(CAPACITY + 10)
+    store = filled_store(threats[:20])
+    updated = dict(threats[5], risk_score=-1)
+    store._cache_threat(updated)
+    for threat in threats[20:CAPACITY + 10]:
+        store._cache_threat(threat)
+
+    # The original threat-5 was evicted; the re-stored copy is still retained
+    assert asyncio.run(store.get_threat("threat-5")) is updated
+    assert "threat-5" in store.threats
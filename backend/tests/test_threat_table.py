@@ -0,0 +1,147 @@
+"""Tests for ThreatTable group-by aggregation against a brute-force grouping of the rows."""
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.services.threat_log import to_millis
+from app.services.threat_table import CATEGORICAL_FIELDS, TIME_BUCKETS, ThreatTable
+from tests.factories import START, make_threats
+
+
+def make_rows(count, seed=6):
+    """Factory threats spread over a few days, with zones and varied confidence."""
+    rng = random.Random(seed)
+    threats = make_threats(count, seed)
+    for i, threat in enumerate(threats):
+        threat["timestamp"] = START + timedelta(seconds=i * 97)
+        threat["source_zone"] = rng.choice(["HOSTILE_ZONE", "EXTERNAL_ZONE", None])
+        threat["confidence"] = rng.choice([0.25, 0.5, 0.75, 1.0])
+    return threats
+
+
+def dimension(threat, name):
+    if name in TIME_BUCKETS:
+        width = TIME_BUCKETS[name]
+        bucket_ms = to_millis(threat["timestamp"]) // width * width
+        return datetime.fromtimestamp(bucket_ms / 1000, tz=timezone.utc).isoformat()
+    return threat.get(CATEGORICAL_FIELDS[name])
+
+
+def reference(threats, group_by, since=None, until=None, filters=None):
+    groups = defaultdict(list)
+    for threat in threats:
+        if since is not None and threat["timestamp"] < since:
+            continue
+        if until is not None and threat["timestamp"] > until:
+            continue
+        if any(threat.get(CATEGORICAL_FIELDS[name]) != value for name, value in (filters or {}).items()):
+            continue
+        groups[tuple(dimension(threat, name) for name in dict.fromkeys(group_by))].append(threat)
+
+    result = {}
+    for key, members in groups.items():
+        risks = [t["risk_score"] for t in members]
+        result[key] = {
+            "count": len(members),
+            "avg_risk_score": round(sum(risks) / len(members), 2),
+            "max_risk_score": max(risks),
+            "avg_confidence": round(sum(t["confidence"] for t in members) / len(members), 3),
+        }
+    return result
+
+
+def as_mapping(aggregate, group_by):
+    names = list(dict.fromkeys(group_by))
+    return {
+        tuple(group[name] for name in names): {k: group[k] for k in ("count", "avg_risk_score", "max_risk_score", "avg_confidence")}
+        for group in aggregate["groups"]
+    }
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return make_rows(3000)
+
+
+@pytest.fixture(scope="module")
+def table(rows):
+    table = ThreatTable(capacity=10_000, chunk_rows=256)
+    for threat in rows:
+        table.append(threat)
+    return table
+
+
+GROUPINGS = [
+    [],
+    ["severity"],
+    ["hour"],
+    ["day", "severity", "country"],
+    ["threat_type", "zone"],
+    ["minute", "threat_type"],
+    ["country", "hour", "country"],
+]
+
+
+@pytest.mark.parametrize("group_by", GROUPINGS)
+def test_groups_match_brute_force(table, rows, group_by):
+    aggregate = table.aggregate(group_by, limit=100_000)
+    expected = reference(rows, group_by)
+    assert as_mapping(aggregate, group_by) == expected
+    assert aggregate["rows"] == len(rows) and not aggregate["truncated"]
+
+    counts = [group["count"] for group in aggregate["groups"]]
+    times = [name for name in group_by if name in TIME_BUCKETS]
+    if times:
+        keys = [group[times[0]] for group in aggregate["groups"]]
+        assert keys == sorted(keys)
+    else:
+        assert counts == sorted(counts, reverse=True)
+
+
+@pytest.mark.parametrize("filters", [{}, {"severity": "HIGH"}, {"country": "RU", "zone": "HOSTILE_ZONE"}, {"country": "ZZ"}])
+def test_filters_and_windows_match_brute_force(table, rows, filters):
+    since, until = rows[500]["timestamp"], rows[2200]["timestamp"]
+    for window in ({}, {"since": since}, {"since": since, "until": until}):
+        aggregate = table.aggregate(["hour", "severity"], filters=filters, limit=100_000, **window)
+        expected = reference(rows, ["hour", "severity"], filters=filters, **window)
+        assert as_mapping(aggregate, ["hour", "severity"]) == expected
+        assert aggregate["rows"] == sum(group["count"] for group in expected.values())
+
+
+def test_limit_truncates(table):
+    aggregate = table.aggregate(["minute"], limit=10)
+    assert len(aggregate["groups"]) == 10 and aggregate["truncated"]
+
+
+def test_unknown_dimensions_are_rejected(table):
+    with pytest.raises(ValueError, match="week"):
+        table.aggregate(["week"])
+    with pytest.raises(ValueError, match="hour"):
+        table.aggregate([], filters={"hour": "1"})
+
+
+def test_oldest_chunks_are_dropped_at_capacity(rows):
+    table = ThreatTable(capacity=1000, chunk_rows=300)
+    for threat in rows[:2500]:
+        table.append(threat)
+        assert len(table) <= 1000
+    stats = table.get_stats()
+    assert stats["appended"] == 2500 and stats["dropped"] + len(table) == 2500
+    live = rows[stats["dropped"]:2500]
+    assert as_mapping(table.aggregate(["severity"]), ["severity"]) == reference(live, ["severity"])
+
+
+def test_state_round_trip(table, rows):
+    restored = ThreatTable(capacity=10_000, chunk_rows=256)
+    restored.load_state(table.get_state())
+    for group_by in GROUPINGS:
+        assert restored.aggregate(group_by) == table.aggregate(group_by)
+
+    smaller = ThreatTable(capacity=512, chunk_rows=256)
+    smaller.load_state(table.get_state())
+    assert len(smaller) == 512
+    assert as_mapping(smaller.aggregate(["zone"]), ["zone"]) == reference(rows[-512:], ["zone"])
+    assert np.array_equal(smaller.get_state()["columns"]["timestamp"], table.get_state()["columns"]["timestamp"][-512:])